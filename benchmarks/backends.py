@@ -0,0 +1,45 @@
+"""
+Compare the run time of every execution engine.
+
+    python -m benchmarks.backends
+"""
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from pl0 import AST_BACKENDS, BACKENDS, Generator, Parser
+
+from .programs import counting, primes
+
+
+def measure(engine):
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        engine.interpret()
+    return time.perf_counter() - start
+
+
+def main():
+    programs = [
+        ("primes 2000", primes(2000)),
+        ("primes 5000", primes(5000)),
+        ("counting 200k", counting(200000)),
+    ]
+    names = sorted(BACKENDS) + sorted(AST_BACKENDS)
+    print(f"{'program':<16}" + "".join(f"{name:>11}" for name in names))
+    for name, program in programs:
+        ast = Parser.parse(program)
+        code = Generator.generate_code(ast)
+        times = []
+        for backend in names:
+            if backend in BACKENDS:
+                # every WRITE leaves its value on the stack, so leave room for them
+                engine = BACKENDS[backend](code, stack_size=10000)
+            else:
+                engine = AST_BACKENDS[backend].from_ast(ast)
+            times.append(measure(engine))
+        print(f"{name:<16}" + "".join(f"{elapsed:>10.2f}s" for elapsed in times))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Run a batch of programs on one process and on all of them.
+
+    python -m benchmarks.batch
+"""
+import os
+import time
+
+from pl0.batch import run_batch
+
+from .programs import counting, primes
+
+
+def measure(programs, jobs):
+    start = time.perf_counter()
+    results = list(run_batch(programs, jobs=jobs))
+    assert all(result.error is None for result in results)
+    return time.perf_counter() - start
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    programs = [(f"primes{n}", primes(500 + n)) for n in range(16)]
+    programs += [(f"counting{n}", counting(20000 + n)) for n in range(16)]
+    print(f"{'jobs':>6}{'time':>10}")
+    for jobs in sorted({1, 2, cpus}):
+        print(f"{jobs:>6}{measure(programs, jobs):>9.2f}s")
+
+
+if __name__ == "__main__":
+    main()
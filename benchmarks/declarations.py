@@ -0,0 +1,36 @@
+"""
+Measure how the time taken by `Generator.generate_code` grows with the
+number of variables declared per scope. The time per declaration should
+stay flat.
+
+    python -m benchmarks.declarations
+"""
+import time
+
+from pl0 import Generator, Parser
+
+from .programs import declarations
+
+
+def measure(ast, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        Generator.generate_code(ast)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    print(f"{'declarations':>12}{'codegen':>12}{'per declaration':>18}")
+    for count in (10, 100, 1000, 10000, 100000):
+        ast = Parser.parse(declarations(count))
+        elapsed = measure(ast)
+        # the globals and the locals of the procedure
+        total = count * 2
+        print(f"{total:>12}{elapsed * 1e3:>10.2f}ms{elapsed / total * 1e6:>16.2f}us")
+
+
+if __name__ == "__main__":
+    main()
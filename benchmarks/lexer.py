@@ -0,0 +1,45 @@
+"""
+Compare the tokens per second of the character by character Lexer, the
+regular expression Scanner and the BytesScanner lexing encoded source.
+
+    python -m benchmarks.lexer
+"""
+import time
+
+from pl0.parser import BytesScanner, Lexer, Scanner
+
+from .programs import primes
+
+
+def measure(lexer_class, source, repeat=3):
+    """
+    The best tokens per second out of `repeat` runs, and the number of tokens.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(1 for _ in lexer_class(source).tokens())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best, count
+
+
+def main():
+    print(
+        f"{'source':<16}{'tokens':>9}{'Lexer':>12}{'Scanner':>12}{'speedup':>9}"
+        f"{'Bytes':>12}{'speedup':>9}"
+    )
+    for copies in (1, 100, 1000):
+        source = primes() * copies
+        lexer, count = measure(Lexer, source)
+        scanner, _ = measure(Scanner, source)
+        scanned, _ = measure(BytesScanner, source.encode())
+        print(
+            f"{f'primes x{copies}':<16}{count:>9}"
+            f"{lexer:>11.0f}/s{scanner:>10.0f}/s{scanner / lexer:>8.1f}x"
+            f"{scanned:>10.0f}/s{scanned / lexer:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Compare the memory used by, and the time taken to walk, the AST as the
+node classes of `pl0.nodes` and as plain dicts.
+
+    python -m benchmarks.nodes
+"""
+import time
+import tracemalloc
+
+from pl0 import Parser
+
+from .programs import statements
+
+
+def to_dicts(tree):
+    if isinstance(tree, list):
+        return [to_dicts(item) for item in tree]
+    if hasattr(tree, "fields"):
+        return {key: to_dicts(value) for key, value in tree.items()}
+    return tree
+
+
+def walk_dicts(node):
+    """
+    Count the nodes of an AST, the way a visitor reaches them.
+    """
+    kind = node["type"]
+    if kind == "Binary":
+        return 1 + walk_dicts(node["left"]) + walk_dicts(node["right"])
+    if kind in ("Identifier", "Number", "Var", "Const"):
+        return 1
+    if kind in ("Assignment", "Output"):
+        return 1 + walk_dicts(node["value"])
+    if kind in ("If", "Loop"):
+        return 1 + walk_dicts(node["condition"]) + walk_dicts(node["body"])
+    if kind in ("Odd", "Grouping"):
+        return 1 + walk_dicts(node["expression"])
+    if kind == "Unary":
+        return 1 + walk_dicts(node["right"])
+    if kind == "Block":
+        return 1 + sum(walk_dicts(statement) for statement in node["statements"])
+    if kind == "Call":
+        return 1 + sum(walk_dicts(argument) for argument in node["arguments"])
+    if kind == "Procedure":
+        return 1 + sum(walk_dicts(block) for block in node["blocks"])
+    return 1
+
+
+def walk_nodes(node):
+    kind = node.type
+    if kind == "Binary":
+        return 1 + walk_nodes(node.left) + walk_nodes(node.right)
+    if kind in ("Identifier", "Number", "Var", "Const"):
+        return 1
+    if kind in ("Assignment", "Output"):
+        return 1 + walk_nodes(node.value)
+    if kind in ("If", "Loop"):
+        return 1 + walk_nodes(node.condition) + walk_nodes(node.body)
+    if kind in ("Odd", "Grouping"):
+        return 1 + walk_nodes(node.expression)
+    if kind == "Unary":
+        return 1 + walk_nodes(node.right)
+    if kind == "Block":
+        return 1 + sum(walk_nodes(statement) for statement in node.statements)
+    if kind == "Call":
+        return 1 + sum(walk_nodes(argument) for argument in node.arguments)
+    if kind == "Procedure":
+        return 1 + sum(walk_nodes(block) for block in node.blocks)
+    return 1
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    tree = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return tree, size
+
+
+def measure_walk(walk, tree, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(walk(node) for node in tree)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, count
+
+
+def main():
+    source = statements(20000)
+    ast = Parser.parse(source)
+    nodes, node_memory = measure_memory(lambda: Parser.parse(source))
+    dicts, dict_memory = measure_memory(lambda: to_dicts(ast))
+
+    node_time, count = measure_walk(walk_nodes, nodes)
+    dict_time, _ = measure_walk(walk_dicts, dicts)
+    # nodes through their dict compatible interface
+    compatible_time, _ = measure_walk(walk_dicts, nodes)
+
+    print(f"{count} nodes")
+    print(f"{'':<14}{'memory':>10}{'walk':>10}")
+    print(f"{'dicts':<14}{dict_memory / 1e6:>8.1f}MB{dict_time * 1e3:>8.0f}ms")
+    print(f"{'nodes':<14}{node_memory / 1e6:>8.1f}MB{node_time * 1e3:>8.0f}ms")
+    print(f"{'nodes as dicts':<14}{'':>10}{compatible_time * 1e3:>8.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
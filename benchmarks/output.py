@@ -0,0 +1,44 @@
+"""
+Compare the output sinks on programs writing many values, with the
+output going to /dev/null.
+
+    python -m benchmarks.output
+"""
+import os
+import sys
+import time
+
+from pl0 import BinarySink, BufferedTextSink, ClosureBackend, ListSink, Parser
+
+from .programs import writing
+
+
+def measure(ast, make_sink):
+    with open(os.devnull, "w") as text, open(os.devnull, "wb") as binary:
+        stdout = sys.stdout
+        sys.stdout = text
+        try:
+            backend = ClosureBackend.from_ast(ast, output=make_sink(text, binary))
+            start = time.perf_counter()
+            backend.interpret()
+            return time.perf_counter() - start
+        finally:
+            sys.stdout = stdout
+
+
+def main():
+    sinks = [
+        ("print", lambda text, binary: None),
+        ("buffered", lambda text, binary: BufferedTextSink(text)),
+        ("list", lambda text, binary: ListSink()),
+        ("binary", lambda text, binary: BinarySink(binary)),
+    ]
+    print(f"{'values':>10}" + "".join(f"{name:>12}" for name, _ in sinks))
+    for count in (100000, 1000000):
+        ast = Parser.parse(writing(count))
+        times = [measure(ast, make_sink) for _, make_sink in sinks]
+        print(f"{count:>10}" + "".join(f"{elapsed:>11.2f}s" for elapsed in times))
+
+
+if __name__ == "__main__":
+    main()
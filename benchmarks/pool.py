@@ -0,0 +1,57 @@
+"""
+Run a short program many times, on a new VM every time and on a
+`VMPool`.
+
+    python -m benchmarks.pool
+"""
+import time
+
+from pl0 import VM, CodeObject, Generator, ListSink, Parser, ThreadedVM, VMPool
+
+PROGRAM = """\
+var n, total;
+begin
+    total := n * (n + 1) / 2;
+    write total
+end.
+"""
+
+
+def fresh(engine, code, runs):
+    sink = ListSink()
+    for n in range(runs):
+        vm = engine(code, output=sink)
+        vm.datastore[3] = n
+        vm.interpret()
+    return sink.values
+
+
+def pooled(engine, code, runs):
+    sink = ListSink()
+    pool = VMPool(code, engine=engine, output=sink)
+    for n in range(runs):
+        pool.run({3: n})
+    return sink.values
+
+
+def main():
+    runs = 20000
+    code = Generator.generate_code(Parser.parse(PROGRAM))
+    engines = [
+        ("vm", VM, code),
+        ("vm compact", VM, CodeObject.from_instructions(code)),
+        ("threaded", ThreadedVM, code),
+    ]
+    print(f"{runs} runs{'new VM':>14}{'pool':>10}")
+    for name, engine, code in engines:
+        times = []
+        for run in (fresh, pooled):
+            start = time.perf_counter()
+            values = run(engine, code, runs)
+            times.append(time.perf_counter() - start)
+            assert values == [n * (n + 1) // 2 for n in range(runs)]
+        print(f"{name:<12}" + "".join(f"{elapsed:>9.3f}s" for elapsed in times))
+
+
+if __name__ == "__main__":
+    main()
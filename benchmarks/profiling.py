@@ -0,0 +1,49 @@
+"""
+The cost of profiling a program on the VM, exactly with a `Profiler`
+and statistically with a `Sampler`.
+
+    python -m benchmarks.profiling
+"""
+import time
+
+from pl0 import VM, Generator, ListSink, Parser, Profiler, SymbolTable, ThreadedVM
+from pl0.sampler import Sampler
+
+from .programs import primes
+
+
+def plain(vm, symbols):
+    vm.interpret()
+
+
+def profiled(vm, symbols):
+    vm.profiler = Profiler(symbols)
+    vm.interpret()
+
+
+def sampled(vm, symbols):
+    with Sampler(vm, symbols):
+        vm.interpret()
+
+
+def main():
+    symbols = SymbolTable()
+    code = Generator.generate_code(
+        Parser.parse(primes(2000), positions=True), symbols=symbols
+    )
+    runs = [("none", plain), ("profiler", profiled), ("sampler", sampled)]
+    print(f"{'engine':<10}" + "".join(f"{name:>11}" for name, _ in runs))
+    for engine in (VM, ThreadedVM):
+        times = []
+        for _, run in runs:
+            vm = engine(code, output=ListSink())
+            start = time.perf_counter()
+            run(vm, symbols)
+            times.append(time.perf_counter() - start)
+        print(
+            f"{engine.__name__:<10}" + "".join(f"{elapsed:>10.2f}s" for elapsed in times)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+PL/0 programs used by the benchmarks.
+"""
+from os import path
+
+EXAMPLES = path.join(path.dirname(path.dirname(path.realpath(__file__))), "examples")
+
+
+def primes(limit=2000):
+    """
+    examples/primes.pl0 searching for primes below `limit` instead of 100.
+    """
+    with open(path.join(EXAMPLES, "primes.pl0"), "r", encoding="utf8") as f:
+        return f.read().replace("const max = 100;", f"const max = {limit};")
+
+
+def counting(limit=100000):
+    """
+    A tight loop of arithmetic on global variables.
+    """
+    return f"""\
+var i, total;
+begin
+    i := 0;
+    total := 0;
+    while i < {limit} do
+    begin
+        total := total + i * 2;
+        i := i + 1
+    end;
+    write total
+end.
+"""
+
+
+def statements(count=10000):
+    """
+    A long statement of assignments and conditionals, making a big AST.
+    """
+    body = ";\n".join(
+        f"    if i < {n} then i := (i + {n}) * 2 - {n} / 3" for n in range(count)
+    )
+    return f"var i;\nbegin\n    i := 0;\n{body}\nend.\n"
+
+
+def declarations(count=1000):
+    """
+    A program declaring `count` global variables and a procedure
+    declaring as many, which uses the first and last of each.
+    """
+    names = ", ".join(f"v{n}" for n in range(count))
+    locals_ = ", ".join(f"l{n}" for n in range(count))
+    last = count - 1
+    return f"""\
+var {names};
+procedure p;
+var {locals_};
+begin
+    l0 := v0;
+    l{last} := l0 + 1;
+    v{last} := l{last}
+end;
+begin
+    v0 := 1;
+    call p;
+    write v{last}
+end.
+"""
+
+
+def writing(count=100000):
+    """
+    A loop writing `count` values.
+    """
+    return f"""\
+var i;
+begin
+    i := 0;
+    while i < {count} do
+    begin
+        write i;
+        i := i + 1
+    end
+end.
+"""
@@ -0,0 +1,45 @@
+"""
+Compare compiling programs to Python code objects through transpiled
+source text, through an `ast.Module`, and loading a marshalled code
+object as `run(..., backend="python", cache=...)` does on a cache hit.
+
+    python -m benchmarks.pyast
+"""
+import marshal
+import time
+
+from pl0 import Parser, PythonASTGenerator, PythonTranspiler
+
+from .programs import counting, primes
+
+
+def measure(function, argument, repeat=1000):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(argument)
+    return (time.perf_counter() - start) / repeat
+
+
+def through_source(ast):
+    return compile(PythonTranspiler.generate_code(ast), "<pl0>", "exec")
+
+
+def through_ast(ast):
+    return compile(PythonASTGenerator.generate_code(ast), "<pl0>", "exec")
+
+
+def main():
+    print(f"{'program':<16}{'source':>12}{'ast':>12}{'cached':>12}")
+    for name, program in [("primes", primes()), ("counting", counting())]:
+        ast = Parser.parse(program, positions=True)
+        source = measure(through_source, ast)
+        tree = measure(through_ast, ast)
+        cached = measure(marshal.loads, marshal.dumps(through_ast(ast)))
+        print(
+            f"{name:<16}{source * 1e6:>10.0f}us{tree * 1e6:>10.0f}us"
+            f"{cached * 1e6:>10.0f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
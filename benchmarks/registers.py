@@ -0,0 +1,60 @@
+"""
+Compare the number of instructions dispatched, and the run time, of the
+stack machine and the register machine.
+
+    python -m benchmarks.registers
+"""
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from pl0 import VM, Generator, Parser, RegisterVM
+
+from .programs import counting, primes
+
+
+class CountingCode(list):
+    """
+    A code store which counts how many instructions were fetched from it.
+    """
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.dispatched = 0
+
+    def __getitem__(self, index):
+        self.dispatched += 1
+        return super().__getitem__(index)
+
+
+def measure(vm):
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        vm.interpret()
+    elapsed = time.perf_counter() - start
+
+    vm.code = CountingCode(vm.code)
+    with redirect_stdout(StringIO()):
+        vm.interpret()
+    return vm.code.dispatched, elapsed
+
+
+def main():
+    print(f"{'program':<16}{'stack':>14}{'register':>14}{'saved':>8}{'time':>9}{'register':>9}")
+    for name, program in [
+        ("primes 2000", primes(2000)),
+        ("primes 5000", primes(5000)),
+        ("counting 200k", counting(200000)),
+    ]:
+        ast = Parser.parse(program)
+        # every WRITE leaves its value on the stack, so leave room for them
+        stack, stack_time = measure(VM(Generator.generate_code(ast), stack_size=10000))
+        register, register_time = measure(RegisterVM.from_ast(ast))
+        print(
+            f"{name:<16}{stack:>14,}{register:>14,}{1 - register / stack:>8.0%}"
+            f"{stack_time:>8.2f}s{register_time:>8.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compare the number of handlers dispatched, and the run time, of the
+threaded VM with and without superinstructions.
+
+    python -m benchmarks.superinstructions
+"""
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from pl0 import Generator, Parser, ThreadedVM
+
+from .programs import counting, primes
+
+
+class CountingHandlers(list):
+    """
+    A handler list which counts how many handlers were fetched from it.
+    """
+
+    def __init__(self, handlers):
+        super().__init__(handlers)
+        self.dispatched = 0
+
+    def __getitem__(self, index):
+        self.dispatched += 1
+        return super().__getitem__(index)
+
+
+def measure(code, superinstructions):
+    # every WRITE leaves its value on the stack, so leave room for them
+    vm = ThreadedVM(code, stack_size=10000, superinstructions=superinstructions)
+    vm.handlers = vm.decode()
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        vm.interpret()
+    elapsed = time.perf_counter() - start
+
+    vm.handlers = CountingHandlers(vm.handlers)
+    with redirect_stdout(StringIO()):
+        vm.interpret()
+    return vm.handlers.dispatched, elapsed
+
+
+def main():
+    print(f"{'program':<16}{'dispatched':>14}{'fused':>14}{'saved':>8}{'time':>9}{'fused':>9}")
+    for name, program in [
+        ("primes 2000", primes(2000)),
+        ("primes 5000", primes(5000)),
+        ("counting 200k", counting(200000)),
+    ]:
+        code = Generator.generate_code(Parser.parse(program))
+        plain, plain_time = measure(code, superinstructions=False)
+        fused, fused_time = measure(code, superinstructions=True)
+        print(
+            f"{name:<16}{plain:>14,}{fused:>14,}{1 - fused / plain:>8.0%}"
+            f"{plain_time:>8.2f}s{fused_time:>8.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Compare the run time of the Python generated by the transpiler with
+module globals and with fast locals.
+
+    python -m benchmarks.transpiler
+"""
+import time
+from io import StringIO
+
+from pl0 import Parser, PythonBackend, PythonTranspiler
+
+from .programs import counting, primes
+
+
+def measure(source, repeat=3):
+    """
+    The best time out of `repeat` runs.
+    """
+    backend = PythonBackend(source, output=StringIO())
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        backend.interpret()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    print(f"{'program':<16}{'globals':>10}{'locals':>10}{'speedup':>9}")
+    for name, program in [
+        ("primes 5000", primes(5000)),
+        ("primes 20000", primes(20000)),
+        ("counting 1M", counting(1000000)),
+    ]:
+        ast = Parser.parse(program)
+        plain = measure(PythonTranspiler.generate_code(ast))
+        fast = measure(PythonTranspiler.generate_code(ast, fast_locals=True))
+        print(f"{name:<16}{plain:>9.2f}s{fast:>9.2f}s{plain / fast:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
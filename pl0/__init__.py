@@ -1,15 +1,180 @@
-from pl0.generators.codegen import Generator
+import marshal
+from importlib.util import MAGIC_NUMBER
+from types import CodeType
+
+from pl0.bytecode import BytecodeException, CodeObject
+from pl0.cache import CompilationCache, default_cache
+from pl0.generators.closures import ClosureBackend, ClosureCompiler
+from pl0.generators.codegen import BytecodeGenerator, Generator
+from pl0.generators.optimizer import ASTOptimizer
 from pl0.generators.py3 import PythonTranspiler
+from pl0.generators.pyast import PythonASTGenerator, PythonBackend
+from pl0.generators.regcode import RegisterGenerator
+from pl0.jit import TracingVM
 from pl0.parser import Parser, ParserException
-from pl0.vm import VM
+from pl0.peephole import PeepholeOptimizer
+from pl0.pool import VMPool
+from pl0.profiler import Profiler
+from pl0.regvm import RegisterVM
+from pl0.sinks import SINKS, BinarySink, BufferedTextSink, ListSink, OutputSink
+from pl0.symbols import SymbolTable
+from pl0.vm import VM, ThreadedVM
+
+BACKENDS = {
+    "vm": VM,
+    "threaded": ThreadedVM,
+    "tracing": TracingVM,
+}
+
+# Backends which generate their own code from the AST rather than run the
+# stack machine code, created with `from_ast`.
+AST_BACKENDS = {
+    "closures": ClosureBackend,
+    "python": PythonBackend,
+    "register": RegisterVM,
+}
+
+
+# what decoding a corrupt compilation cache entry can raise
+_CORRUPT_ENTRY_ERRORS = (BytecodeException, ValueError, EOFError, TypeError)
+
 
+def _get_cache(cache):
+    return default_cache() if cache is True else cache
+
+
+def _get_optimizer(optimize):
+    if isinstance(optimize, PeepholeOptimizer):
+        return optimize
+    return PeepholeOptimizer.for_level(optimize) if optimize else None
+
+
+def compile_code(code, cache=None, optimize=0):
+    """
+    Compile PL/0 source into a compact `CodeObject`. Pass `cache=True`,
+    or a `CompilationCache`, to reuse previously compiled code.
+    `optimize` is either a peephole optimization level or a
+    `PeepholeOptimizer`, optimizing also folds constants in the AST
+    before generating code.
+    """
+    cache = _get_cache(cache)
+    optimizer = _get_optimizer(optimize)
+    if cache:
+        options = ["ast", optimizer.signature()] if optimizer else []
+        key = cache.key(code, "pl0c", *options)
+        data = cache.get(key)
+        if data is not None:
+            try:
+                return CodeObject.from_buffer(data)
+            except _CORRUPT_ENTRY_ERRORS:
+                # compiled again below, overwriting the entry
+                cache.reject(key)
 
-def run(code):
     ast = Parser.parse(code)
-    instructions = Generator.generate_code(ast)
-    VM(instructions).interpret()
+    if ast is None:
+        return None
+
+    if optimizer:
+        ast = ASTOptimizer.generate_code(ast)
+        instructions = optimizer.optimize(Generator.generate_code(ast))
+        code_object = CodeObject.from_instructions(instructions)
+    else:
+        code_object = BytecodeGenerator.generate_code(ast)
+
+    if cache:
+        cache.put(key, code_object.to_bytes())
+    return code_object
 
-def transpile(code, target):
+
+def _compile_python(code, cache=None, optimize=0):
+    """
+    Compile PL/0 source into a Python code object through an `ast.Module`,
+    with line numbers pointing into the PL/0 source. Cached code objects
+    are marshalled, so the key includes the interpreter's bytecode magic.
+    """
+    cache = _get_cache(cache)
+    if cache:
+        options = ["ast", "fast"] if optimize else []
+        key = cache.key(code, "pyc", MAGIC_NUMBER.hex(), *options)
+        data = cache.get(key)
+        if data is not None:
+            try:
+                code_object = marshal.loads(data)
+            except _CORRUPT_ENTRY_ERRORS:
+                code_object = None
+            if isinstance(code_object, CodeType):
+                return code_object
+            cache.reject(key)
+
+    ast = Parser.parse(code, positions=True)
+    if ast is None:
+        return None
+    if optimize:
+        ast = ASTOptimizer.generate_code(ast)
+    module = PythonASTGenerator.generate_code(ast, fast_locals=bool(optimize))
+    code_object = compile(module, "<pl0>", "exec")
+
+    if cache:
+        cache.put(key, marshal.dumps(code_object))
+    return code_object
+
+
+def run(code, backend="vm", compact=False, cache=None, optimize=0, output=None):
+    """
+    Run PL/0 source with `backend`. The values the program writes are
+    printed, or passed to `output` when it is an `OutputSink`.
+    """
+    if backend == "python":
+        code_object = _compile_python(code, cache=cache, optimize=optimize)
+        if code_object is not None:
+            PythonBackend(code_object, output=output).interpret()
+        return
+
+    if backend in AST_BACKENDS:
+        ast = Parser.parse(code)
+        if ast is None:
+            return
+        if optimize:
+            ast = ASTOptimizer.generate_code(ast)
+        AST_BACKENDS[backend].from_ast(ast, output=output).interpret()
+        return
+
+    if cache or optimize:
+        instructions = compile_code(code, cache=cache, optimize=optimize)
+        if instructions is None:
+            return
+    else:
+        ast = Parser.parse(code)
+        if ast is None:
+            return
+        generator = BytecodeGenerator if compact else Generator
+        instructions = generator.generate_code(ast)
+    BACKENDS[backend](instructions, output=output).interpret()
+
+
+def transpile(code, target, cache=None, optimize=0):
+    """
+    Transpile PL/0 source to `target`, only "python" is supported.
+    Optimizing folds constants in the AST and generates Python which
+    keeps the program's variables in fast locals.
+    """
     if target.lower() == 'python':
+        cache = _get_cache(cache)
+        if cache:
+            key = cache.key(code, "py", *(["ast", "fast"] if optimize else []))
+            data = cache.get(key)
+            if data is not None:
+                try:
+                    return data.decode("utf8")
+                except UnicodeDecodeError:
+                    cache.reject(key)
+
         ast = Parser.parse(code)
-        return PythonTranspiler.generate_code(ast)
+        if ast is None:
+            return None
+        if optimize:
+            ast = ASTOptimizer.generate_code(ast)
+        output = PythonTranspiler.generate_code(ast, fast_locals=bool(optimize))
+        if cache:
+            cache.put(key, output.encode("utf8"))
+        return output
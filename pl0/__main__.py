@@ -1,6 +1,29 @@
 import argparse
+import ast as python_ast
+import os
+import sys
 
-from pl0 import VM, Generator, Parser, transpile
+from pl0 import (
+    AST_BACKENDS,
+    ASTOptimizer,
+    BACKENDS,
+    CodeObject,
+    CompilationCache,
+    Generator,
+    Parser,
+    PeepholeOptimizer,
+    Profiler,
+    PythonASTGenerator,
+    SINKS,
+    SymbolTable,
+    compile_code,
+    run,
+    transpile,
+)
+from pl0.batch import read_programs, run_batch
+from pl0.profiler import SORT_KEYS
+from pl0.sampler import INTERVAL, Sampler
+from pl0.sinks import FLUSH_SIZE
 
 
 class Command:
@@ -10,7 +33,13 @@ class Command:
         self.handle(self.parser.parse_args())
 
     def add_arguments(self, parser):
-        parser.add_argument("src", type=str, help="Source file")
+        parser.add_argument(
+            "src",
+            type=str,
+            nargs="+",
+            help="Source file, or a compiled .pl0c object file to run. Several "
+            "source files are run as a batch.",
+        )
         parser.add_argument(
             "--parse",
             action="store_true",
@@ -31,27 +60,362 @@ class Command:
             default=None,
             help="Transpile to target",
         )
+        parser.add_argument(
+            "--backend",
+            action="store",
+            choices=sorted([*BACKENDS, *AST_BACKENDS]),
+            default="vm",
+            help="Execution engine used to run the generated code.",
+        )
+        parser.add_argument(
+            "--compact",
+            action="store_true",
+            default=False,
+            help="Generate compact integer encoded bytecode.",
+        )
+        parser.add_argument(
+            "--compile",
+            action="store_true",
+            default=False,
+            help="Compile the src file into a .pl0c object file instead of running it.",
+        )
+        parser.add_argument(
+            "-o",
+            "--output",
+            action="store",
+            type=str,
+            default=None,
+            help="Output path for --compile (defaults to the src file with a .pl0c suffix).",
+        )
+        parser.add_argument(
+            "--sink",
+            action="store",
+            choices=["print", *SINKS],
+            default="print",
+            help="Where written values go: printed one at a time, buffered text, "
+            "or packed 64 bit little endian integers on stdout.",
+        )
+        parser.add_argument(
+            "--flush-size",
+            action="store",
+            type=int,
+            default=FLUSH_SIZE,
+            help="Number of values the buffered and binary sinks hold before writing.",
+        )
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            default=False,
+            help="Profile the program on the vm or threaded backend and report "
+            "its procedures, hottest instructions and loops on stderr.",
+        )
+        parser.add_argument(
+            "--profile-sort",
+            action="store",
+            choices=SORT_KEYS,
+            default="time",
+            help="Column the procedures of the --profile report are sorted on.",
+        )
+        parser.add_argument(
+            "--sample",
+            action="store",
+            type=str,
+            default=None,
+            metavar="PATH",
+            help="Sample the program on the vm or threaded backend, writing "
+            "collapsed stacks for flame graph tools to PATH and a summary to stderr.",
+        )
+        parser.add_argument(
+            "--sample-interval",
+            action="store",
+            type=float,
+            default=INTERVAL,
+            help="Seconds between the samples of --sample.",
+        )
+        parser.add_argument(
+            "--jobs",
+            "-j",
+            action="store",
+            type=int,
+            default=None,
+            help="Run the src files as a batch on this many processes "
+            "(defaults to the number of CPUs when there are several src files).",
+        )
+        parser.add_argument(
+            "--unordered",
+            action="store_true",
+            default=False,
+            help="Show the output of a batch as each program finishes, not in order.",
+        )
+        parser.add_argument(
+            "--timings",
+            action="store_true",
+            default=False,
+            help="Report how long each program of a batch took on stderr.",
+        )
+        parser.add_argument(
+            "-O",
+            action="store",
+            dest="optimize",
+            type=int,
+            nargs="?",
+            const=1,
+            default=0,
+            help="Optimization level (-O is the same as -O1). Any level folds "
+            "constants in the AST, levels pick the peephole optimizations.",
+        )
+        parser.add_argument(
+            "--optimizer-stats",
+            action="store_true",
+            default=False,
+            help="Report how many instructions the optimizer removed on stderr.",
+        )
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            default=False,
+            help="Always compile from source instead of using the compilation cache.",
+        )
+        parser.add_argument(
+            "--cache-dir",
+            action="store",
+            type=str,
+            default=None,
+            help="Compilation cache directory (defaults to $PL0_CACHE_DIR or ~/.cache/pl0).",
+        )
+        parser.add_argument(
+            "--cache-stats",
+            action="store_true",
+            default=False,
+            help="Report compilation cache statistics on stderr.",
+        )
 
     def handle(self, args):
+        if len(args.src) > 1 or args.jobs is not None:
+            self.batch(args)
+            return
+        args.src = args.src[0]
+
+        if CodeObject.is_object_file(args.src):
+            if args.backend not in BACKENDS:
+                self.parser.error(f"{args.backend} can't run .pl0c object files")
+            for option in ("parse", "codegen", "compile"):
+                if getattr(args, option):
+                    self.parser.error(
+                        f"--{option} can't be used with .pl0c object files"
+                    )
+            if args.optimize:
+                self.parser.error("-O can't be used with .pl0c object files")
+            if args.transpile_target is not None:
+                self.parser.error("--transpile can't be used with .pl0c object files")
+            self.interpret(args, CodeObject.load(args.src))
+            return
+
         with open(args.src, "r", encoding="utf8") as f:
-            if args.transpile_target != None:
-                print(transpile(f.read(), target=args.transpile_target.lower()))
-                return
+            source = f.read()
+
+        cache = None
+        if not args.no_cache:
+            cache = CompilationCache(directory=args.cache_dir)
+
+        try:
+            self.execute(args, source, cache)
+        finally:
+            if cache is not None and args.cache_stats:
+                sys.stderr.write(
+                    "cache: {hits} hits, {misses} misses, {entries} entries, "
+                    "{size}/{max_size} bytes in {directory}\n".format(**cache.stats())
+                )
+
+    def batch(self, args):
+        """
+        Run every src file on a pool of processes, showing the output of
+        each under a header with its name.
+        """
+        for option in ("parse", "codegen", "compile", "profile", "sample"):
+            if getattr(args, option):
+                self.parser.error(f"--{option} can't be used with a batch")
+        if args.transpile_target is not None:
+            self.parser.error("--transpile can't be used with a batch")
+        for src in args.src:
+            if CodeObject.is_object_file(src):
+                self.parser.error(f"{src}: .pl0c object files can't be run in a batch")
+
+        cache = None
+        if not args.no_cache:
+            cache = CompilationCache(directory=args.cache_dir)
+
+        results = run_batch(
+            read_programs(args.src),
+            jobs=args.jobs,
+            backend=args.backend,
+            optimize=args.optimize,
+            cache=cache,
+            ordered=not args.unordered,
+        )
+        failed = False
+        for result in results:
+            sys.stdout.write(f"==> {result.name} <==\n{result.output}")
+            sys.stdout.flush()
+            if result.error is not None:
+                failed = True
+                sys.stderr.write(f"{result.name}: {result.error.rstrip()}\n")
+            if args.timings:
+                sys.stderr.write(f"{result.name}: {result.elapsed:.6f}s\n")
+        if failed:
+            sys.exit(1)
+
+    def execute(self, args, source, cache):
+        for option, enabled in (("profile", args.profile), ("sample", args.sample)):
+            if enabled and args.backend not in BACKENDS:
+                self.parser.error(
+                    f"--{option} isn't supported by the {args.backend} backend"
+                )
+
+        if args.transpile_target != None:
+            print(
+                transpile(
+                    source,
+                    target=args.transpile_target.lower(),
+                    cache=cache,
+                    optimize=args.optimize,
+                )
+            )
+            return
+
+        if args.compile and args.backend in AST_BACKENDS:
+            self.parser.error(f"--compile isn't supported by the {args.backend} backend")
+        if args.codegen and args.backend == "closures":
+            # the code is a tree of Python closures, there's nothing to show
+            self.parser.error("--codegen isn't supported by the closures backend")
+
+        if args.backend == "python" and not (args.parse or args.codegen):
+            # compiled to a Python code object, which is cached as well
+            run(
+                source,
+                backend="python",
+                cache=cache,
+                optimize=args.optimize,
+                output=self.sink(args),
+            )
+            return
+
+        if args.backend in AST_BACKENDS:
+            self.execute_ast(args, source)
+            return
 
-            ast = Parser.parse(f.read())
+        optimizer = PeepholeOptimizer.for_level(args.optimize) if args.optimize else None
+        # the names of the procedures and source lines, which cached code
+        # doesn't have
+        profiling = args.profile or args.sample is not None
+        symbols = SymbolTable() if profiling else None
+        if cache is not None and not (args.parse or args.codegen or profiling):
+            code = compile_code(source, cache=cache, optimize=optimizer)
+            if code is None:
+                return
+        else:
+            ast = Parser.parse(source, positions=args.sample is not None)
             if ast is None:
                 return
+            if optimizer:
+                ast = ASTOptimizer.generate_code(ast)
 
             if args.parse:
                 print(ast)
                 return
 
-            code = Generator.generate_code(ast)
+            code = Generator.generate_code(ast, symbols=symbols)
+            if optimizer:
+                code = optimizer.optimize(code, symbols)
+            if args.compact or args.compile:
+                code = CodeObject.from_instructions(code)
+
             if args.codegen:
-                print(code)
+                self.report_optimizer(args, optimizer)
+                print(code.listing() if args.compact else code)
                 return
 
-            VM(code).interpret()
+        self.report_optimizer(args, optimizer)
+        if args.compile:
+            code.dump(args.output or os.path.splitext(args.src)[0] + ".pl0c")
+            return
+
+        self.interpret(args, code, symbols)
+
+    def interpret(self, args, code, symbols=None):
+        """
+        Run stack machine code, profiling or sampling it if asked to.
+        """
+        profiler = Profiler(symbols) if args.profile else None
+        vm = BACKENDS[args.backend](code, output=self.sink(args), profiler=profiler)
+        if args.sample is None:
+            try:
+                vm.interpret()
+            finally:
+                self.report_profile(args, profiler)
+            return
+
+        sampler = Sampler(vm, symbols, interval=args.sample_interval)
+        try:
+            with sampler:
+                vm.interpret()
+        finally:
+            self.report_profile(args, profiler)
+            with open(args.sample, "w", encoding="utf8") as f:
+                sampler.write_collapsed(f)
+            sys.stderr.write(sampler.report())
+
+    def execute_ast(self, args, source):
+        """
+        Run the src file with one of the backends which generate their
+        own code from the AST.
+        """
+        ast = Parser.parse(source)
+        if ast is None:
+            return
+        if args.optimize:
+            ast = ASTOptimizer.generate_code(ast)
+
+        if args.parse:
+            print(ast)
+            return
+
+        if args.codegen and args.backend == "python":
+            # the Python module the program is compiled to, as it would run
+            module = PythonASTGenerator.generate_code(
+                ast, fast_locals=bool(args.optimize)
+            )
+            if hasattr(python_ast, "unparse"):
+                print(python_ast.unparse(module))
+            else:
+                print(python_ast.dump(module))
+            return
+
+        engine = AST_BACKENDS[args.backend].from_ast(ast, output=self.sink(args))
+        if args.codegen:
+            print(engine.code)
+            return
+        engine.interpret()
+
+    def sink(self, args):
+        if args.sink == "print":
+            return None
+        return SINKS[args.sink](flush_size=args.flush_size)
+
+    def report_profile(self, args, profiler):
+        if profiler is not None:
+            sys.stderr.write(profiler.report(sort=args.profile_sort))
+
+    def report_optimizer(self, args, optimizer):
+        if not (args.optimizer_stats and optimizer):
+            return
+        if optimizer.total:
+            sys.stderr.write(
+                f"optimizer: removed {optimizer.removed} of {optimizer.total} "
+                f"instructions\n"
+            )
+        else:
+            sys.stderr.write("optimizer: not run, the code was cached\n")
 
 
 Command()
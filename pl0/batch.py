@@ -0,0 +1,113 @@
+"""
+Batch Execution
+===============
+
+Compile and run many programs at once, spread over a pool of worker
+processes so every core is used. What each program writes is collected
+separately (see `pl0.sinks.ListSink`) along with how long it took to
+compile and run and any error, and returned as a `BatchResult`.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stderr
+from io import StringIO
+
+from pl0 import run
+from pl0.sinks import ListSink
+
+
+class BatchResult:
+    def __init__(self, index, name, values, error, elapsed):
+        # the position of the program in the batch
+        self.index = index
+        self.name = name
+        self.values = values
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def output(self):
+        """
+        The values as the program would have printed them.
+        """
+        return "".join(f"{value}\n" for value in self.values)
+
+    def __repr__(self):
+        status = "ok" if self.error is None else "error"
+        return f"<BatchResult {self.index} {self.name} {status} {self.elapsed:.6f}s>"
+
+
+def run_program(index, name, source, backend="vm", optimize=0, cache=None):
+    """
+    Compile and run a single program, capturing its output, errors and
+    timing in a `BatchResult`.
+    """
+    sink = ListSink()
+    errors = StringIO()
+    start = time.perf_counter()
+    try:
+        with redirect_stderr(errors):
+            run(source, backend=backend, optimize=optimize, cache=cache, output=sink)
+        error = errors.getvalue() or None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+    return BatchResult(index, name, sink.values, error, elapsed)
+
+
+def run_chunk(chunk, backend, optimize, cache):
+    return [
+        run_program(index, name, source, backend, optimize, cache)
+        for index, name, source in chunk
+    ]
+
+
+def read_programs(paths):
+    """
+    The (name, source) pairs of PL/0 source files, named by their path.
+    """
+    for path in paths:
+        with open(path, "r", encoding="utf8") as f:
+            yield path, f.read()
+
+
+def run_batch(
+    programs,
+    jobs=None,
+    backend="vm",
+    optimize=0,
+    cache=None,
+    ordered=True,
+    chunk_size=None,
+):
+    """
+    Run an iterable of (name, source) pairs on `jobs` worker processes,
+    all cores by default, yielding a `BatchResult` for every program.
+    Results are yielded in the order of `programs`, or as soon as they
+    are done when `ordered` is false. Programs are sent to the workers
+    `chunk_size` at a time. With a single job the programs are run in
+    this process.
+    """
+    programs = [(index, name, source) for index, (name, source) in enumerate(programs)]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(programs) <= 1:
+        for index, name, source in programs:
+            yield run_program(index, name, source, backend, optimize, cache)
+        return
+
+    if chunk_size is None:
+        # a few chunks per worker balances the load without much overhead
+        chunk_size = max(1, min(64, len(programs) // (jobs * 4)))
+    chunks = [
+        programs[start : start + chunk_size]
+        for start in range(0, len(programs), chunk_size)
+    ]
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(chunks))) as executor:
+        futures = [
+            executor.submit(run_chunk, chunk, backend, optimize, cache)
+            for chunk in chunks
+        ]
+        for future in futures if ordered else as_completed(futures):
+            yield from future.result()
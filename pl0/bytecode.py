@@ -0,0 +1,261 @@
+"""
+Compact Bytecode
+================
+
+A `CodeObject` is a compact alternative to the list of
+`[op_code, level, value]` lists produced by `Generator.generate_code`.
+
+Every instruction is stored as three machine integers in one flat
+`array('q')` (or a `memoryview` cast to the same format): the integer
+op code, the level and the value. The integer op codes are the indexes
+of the string op codes in `OPCODES`.
+
+The value of a LIT instruction is not the literal itself but an index
+into the code object's constant table, so literals of any size can be
+stored while the instruction stream stays fixed width.
+
+```
+code:      [7, 0, 2,  5, 0, 4,  0, 0, 0, ...]
+            JMP 0 2   INT 0 4   LIT 0 #0
+constants: [10, ...]
+```
+
+
+Object Files
+------------
+
+Code objects can be written to and loaded from binary `.pl0c` object
+files. All fields are little endian unless noted otherwise.
+
+Header (24 bytes):
+
+  magic - The bytes `PL0C`
+  version - u16, the `FORMAT_VERSION` the file was written with
+  byteorder - u8, 0 if the code section is little endian, 1 if big
+  reserved - u8
+  instructions - u64, the number of instructions
+  constants - u64, the number of constants
+
+Code section: `instructions * 3` signed 64 bit integers in the byte
+order given in the header.
+
+Constant section: for every constant a u32 length followed by that many
+bytes of a signed two's complement integer.
+
+The code section is 8 byte aligned so it can be used in place from a
+memory mapped file, loading does not need to copy the instructions.
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from pl0.constants import OP_CODE
+
+# The position of an op code in this tuple is its integer encoding
+OPCODES = (
+    OP_CODE.LIT,
+    OP_CODE.OPR,
+    OP_CODE.LOD,
+    OP_CODE.STO,
+    OP_CODE.CAL,
+    OP_CODE.INT,
+    OP_CODE.DET,
+    OP_CODE.JMP,
+    OP_CODE.JPC,
+)
+OPCODE_NUMBERS = {op_code: number for number, op_code in enumerate(OPCODES)}
+
+LIT, OPR, LOD, STO, CAL, INT, DET, JMP, JPC = range(len(OPCODES))
+
+MAGIC = b"PL0C"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHBBQQ")
+CONSTANT_LENGTH = struct.Struct("<I")
+BYTEORDERS = ("little", "big")
+
+
+class BytecodeException(Exception):
+    pass
+
+
+class CodeObject:
+    def __init__(self, code=None, constants=None):
+        self.code = array("q") if code is None else code
+        self.constants = [] if constants is None else constants
+        self.constant_index = {value: i for i, value in enumerate(self.constants)}
+
+    def __len__(self):
+        return len(self.code) // 3
+
+    def __getitem__(self, index):
+        """
+        Decode a single instruction into its `(op_code, level, value)`
+        listing form.
+        """
+        if index < 0:
+            index += len(self)
+        offset = index * 3
+        op_code, level, value = self.code[offset : offset + 3]
+        if op_code == LIT:
+            value = self.constants[value]
+        return (OPCODES[op_code], level, value)
+
+    def __iter__(self):
+        code = self.code
+        constants = self.constants
+        for offset in range(0, len(code), 3):
+            op_code = code[offset]
+            value = code[offset + 2]
+            if op_code == LIT:
+                value = constants[value]
+            yield (OPCODES[op_code], code[offset + 1], value)
+
+    def __eq__(self, other):
+        if isinstance(other, CodeObject):
+            return self.code == other.code and self.constants == other.constants
+        return NotImplemented
+
+    def __repr__(self):
+        return f"<CodeObject {len(self)} instructions, {len(self.constants)} constants>"
+
+    def append(self, instruction):
+        """
+        Encode and append a single `[op_code, level, value]` instruction.
+        """
+        op_code, level, value = instruction
+        number = OPCODE_NUMBERS[op_code]
+        if number == LIT:
+            value = self.add_constant(value)
+        self.code.extend((number, level, value))
+
+    def patch(self, index, value):
+        """
+        Replace the value of a (non LIT) instruction, used for fixing up
+        jump targets once they are known.
+        """
+        self.code[index * 3 + 2] = value
+
+    def add_constant(self, value):
+        index = self.constant_index.get(value)
+        if index is None:
+            index = len(self.constants)
+            self.constants.append(value)
+            self.constant_index[value] = index
+        return index
+
+    def disassemble(self):
+        """
+        Turn the code object back into a list of `[op_code, level, value]`
+        instructions, as produced by `Generator.generate_code`.
+        """
+        return [list(instruction) for instruction in self]
+
+    def listing(self):
+        """
+        A human readable listing of the instructions, one per line.
+        """
+        return "\n".join(
+            f"{i}: {op_code}, {level}, {value}"
+            for i, (op_code, level, value) in enumerate(self)
+        )
+
+    @classmethod
+    def from_instructions(cls, instructions):
+        code_object = cls()
+        for instruction in instructions:
+            code_object.append(instruction)
+        return code_object
+
+    def to_bytes(self):
+        """
+        Serialize the code object into the object file format.
+        """
+        header = HEADER.pack(
+            MAGIC,
+            FORMAT_VERSION,
+            BYTEORDERS.index(sys.byteorder),
+            0,
+            len(self),
+            len(self.constants),
+        )
+        constants = []
+        for value in self.constants:
+            value = int(value)
+            length = (value.bit_length() + 8) // 8
+            constants.append(CONSTANT_LENGTH.pack(length))
+            constants.append(value.to_bytes(length, "little", signed=True))
+        return header + self.code.tobytes() + b"".join(constants)
+
+    def dump(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        """
+        Build a code object on top of a buffer holding an object file.
+        The code section is used in place when its byte order matches
+        the machine's.
+        """
+        view = memoryview(buffer)
+        if len(view) < HEADER.size:
+            raise BytecodeException("Truncated object file header")
+
+        magic, version, byteorder, _, instructions, constant_count = HEADER.unpack(
+            view[: HEADER.size]
+        )
+        if magic != MAGIC:
+            raise BytecodeException("Not a PL/0 object file")
+        if version != FORMAT_VERSION:
+            raise BytecodeException(
+                f"Unsupported object file version {version}, "
+                f"expected {FORMAT_VERSION}"
+            )
+
+        start = HEADER.size
+        end = start + instructions * 3 * 8
+        if len(view) < end:
+            raise BytecodeException("Truncated object file code section")
+
+        if BYTEORDERS[byteorder] == sys.byteorder:
+            code = view[start:end].cast("q")
+        else:
+            code = array("q", view[start:end])
+            code.byteswap()
+
+        constants = []
+        offset = end
+        for _ in range(constant_count):
+            if len(view) < offset + CONSTANT_LENGTH.size:
+                raise BytecodeException("Truncated object file constant section")
+            (length,) = CONSTANT_LENGTH.unpack(
+                view[offset : offset + CONSTANT_LENGTH.size]
+            )
+            offset += CONSTANT_LENGTH.size
+            if len(view) < offset + length:
+                raise BytecodeException("Truncated object file constant section")
+            constants.append(
+                int.from_bytes(view[offset : offset + length], "little", signed=True)
+            )
+            offset += length
+
+        return cls(code, constants)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory map an object file and build a code object on top of it.
+        """
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # mmap can't map an empty file
+                raise BytecodeException("Truncated object file header")
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_buffer(buffer)
+
+    @staticmethod
+    def is_object_file(path):
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
@@ -0,0 +1,178 @@
+"""
+The Compilation Cache
+=====================
+
+A content addressed, on disk cache for compiled PL/0 programs.
+
+Entries are keyed by a hash of the compiler version, the kind of output
+(bytecode, a transpile target, ...), any options that affect the output
+and the source text itself. Each entry is a single file in the cache
+directory, written to a temporary file first and then atomically moved
+into place so processes can share a cache directory without locking.
+
+The cache is bounded in size. Reading an entry refreshes its
+modification time, and whenever the cache grows past `max_size` the
+least recently used entries are removed.
+"""
+import hashlib
+import os
+import tempfile
+
+from pl0.constants import COMPILER_VERSION
+
+TEMP_PREFIX = ".tmp-"
+
+
+def default_directory():
+    directory = os.environ.get("PL0_CACHE_DIR")
+    if directory:
+        return directory
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "pl0")
+
+
+class CompilationCache:
+    def __init__(self, directory=None, max_size=64 * 1024 * 1024):
+        self.directory = directory or default_directory()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, source, kind, *options):
+        """
+        The cache key for compiling `source` into `kind` of output.
+        """
+        digest = hashlib.sha256()
+        for part in (COMPILER_VERSION, kind, *options):
+            digest.update(f"{part}\0".encode("utf8"))
+        digest.update(source.encode("utf8"))
+        return f"{digest.hexdigest()}.{kind}"
+
+    def path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """
+        Return the bytes stored under `key`, or None on a miss. An entry
+        which can't be read is a miss as well, and so is one the caller
+        can't decode once it `reject`s it.
+        """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # evicted by another process in the mean time
+        self.hits += 1
+        return data
+
+    def reject(self, key):
+        """
+        Count the hit `get` returned for `key` as a miss, its entry is
+        corrupt. The caller compiles the source again and `put`s the
+        output over the entry.
+        """
+        self.hits -= 1
+        self.misses += 1
+
+    def put(self, key, data):
+        """
+        Atomically store `data` under `key` and evict old entries if the
+        cache has grown too large. Nothing is stored when the cache
+        directory can't be written to, the entry is compiled again the
+        next time instead.
+        """
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=TEMP_PREFIX)
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self.path(key))
+        except BaseException as e:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            if isinstance(e, OSError):
+                return
+            raise
+        self.evict()
+
+    def entries(self):
+        """
+        A list of `(mtime, size, path)` for every entry in the cache.
+        """
+        entries = []
+        try:
+            scanner = os.scandir(self.directory)
+        except OSError:
+            return entries
+
+        with scanner:
+            for entry in scanner:
+                if entry.name.startswith(TEMP_PREFIX) or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache fits
+        in `max_size` bytes.
+        """
+        entries = self.entries()
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            size -= entry_size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        entries = self.entries()
+        return {
+            "directory": self.directory,
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "size": sum(entry[1] for entry in entries),
+            "max_size": self.max_size,
+        }
+
+
+_default_cache = None
+
+
+def default_cache():
+    """
+    The shared cache instance used when a caller asks for `cache=True`.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CompilationCache()
+    return _default_cache
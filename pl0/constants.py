@@ -26,3 +26,38 @@ class OPERATION:
     LESS_EQUAL = 13
     WRITE = 14
     DEBUG = 15
+
+
+class REG_OP_CODE:
+    """
+    Op codes of the register machine (see pl0.regvm). Operands name
+    registers of the current frame unless noted otherwise.
+    """
+
+    MOV = "MOV"  # a := b
+    ADD = "ADD"  # a := b + c
+    SUB = "SUB"  # a := b - c
+    MUL = "MUL"  # a := b * c
+    DIV = "DIV"  # a := b / c
+    NEG = "NEG"  # a := -b
+    GET = "GET"  # a := register c of the frame b levels out
+    SET = "SET"  # register b of the frame a levels out := c
+    JMP = "JMP"  # jump to c
+    JEQ = "JEQ"  # jump to c if a = b
+    JNE = "JNE"  # jump to c if a # b
+    JLT = "JLT"  # jump to c if a < b
+    JLE = "JLE"  # jump to c if a <= b
+    JGT = "JGT"  # jump to c if a > b
+    JGE = "JGE"  # jump to c if a >= b
+    JODD = "JODD"  # jump to c if a is odd
+    JEVEN = "JEVEN"  # jump to c if a is even
+    CAL = "CAL"  # call the procedure at address b, a levels out, with arguments c
+    ENT = "ENT"  # enter a procedure, extending the frame with the registers a
+    RET = "RET"  # return from a procedure
+    WRT = "WRT"  # write a
+    DBG = "DBG"  # start debugging
+
+
+# Bumped whenever a change to the compiler can change its output, it is
+# part of the key of every compilation cache entry.
+COMPILER_VERSION = "3"
@@ -0,0 +1,343 @@
+from collections import ChainMap
+
+from pl0.generators.optimizer import OPERATIONS
+from pl0.generators.visitor import Visitor
+from pl0.nodes import from_dicts
+
+
+class ClosureCompiler(Visitor):
+    """
+    Compile the AST into a tree of Python closures, one per node, which
+    are run by calling the closure of the program with its global frame.
+
+    Statements compile to closures taking the current frame, expressions
+    to closures taking the current frame and returning their value.
+    Frames are laid out like the stack frames of the VM, but as a list
+    per invocation: the static link (the frame of the enclosing
+    procedure) in slot 0, followed by the arguments and then the
+    variables. Every slot is resolved at compile time, so a variable of
+    an enclosing procedure is found by following a known number of
+    static links.
+
+    Leaf operands are folded into the closure of the operator using them
+    (`i < 10` is one closure reading `frame[i]`, not three closures), so
+    the closure tree is a lot shallower than the AST.
+    """
+
+    def __init__(self, write=print):
+        # called with every value the program writes
+        self.write = write
+        self.scope = ChainMap()
+        # the next free slot in the frame being compiled, 0 is the static link
+        self.slots = 1
+
+    def visit_const(self, node):
+        self.scope[node.name] = {"type": node.type, "value": node.value}
+
+    def visit_var(self, node):
+        self.scope[node.name] = {
+            "type": node.type,
+            "level": len(self.scope.maps) - 1,
+            "slot": self.slots,
+        }
+        self.slots += 1
+
+    def visit_procedure(self, node):
+        # `body` is filled in once the procedure is compiled, calls look it
+        # up when they are made so procedures can call themselves
+        proc_declaration = {
+            "type": node.type,
+            "level": len(self.scope.maps) - 1,
+            "body": None,
+        }
+        self.scope[node.name] = proc_declaration
+
+        slots = self.slots
+        self.push_scope()
+        self.slots = 1
+        for parameter in node.parameters:
+            self.visit_var(parameter)
+        parameters = self.slots
+
+        body = self.sequence(node.blocks)
+        variables = [0] * (self.slots - parameters)
+
+        def procedure(frame):
+            frame.extend(variables)
+            body(frame)
+
+        proc_declaration["body"] = procedure
+        self.pop_scope()
+        self.slots = slots
+
+    def visit_assignment(self, node):
+        level, slot = self.resolve(node.name)
+        value = self.visit(node.value)
+
+        if level == 0:
+
+            def assignment(frame):
+                frame[slot] = value(frame)
+
+        elif level == 1:
+
+            def assignment(frame):
+                frame[0][slot] = value(frame)
+
+        else:
+            outer = self.outer(level)
+
+            def assignment(frame):
+                outer(frame)[slot] = value(frame)
+
+        return assignment
+
+    def visit_call(self, node):
+        level = len(self.scope.maps) - 1
+        procedure = self.scope[node.name]
+        arguments = [self.visit(argument) for argument in node.arguments]
+        outer = self.outer(level - procedure["level"])
+
+        def call(frame):
+            callee = [outer(frame)]
+            for argument in arguments:
+                callee.append(argument(frame))
+            procedure["body"](callee)
+
+        return call
+
+    def visit_block(self, node):
+        return self.sequence(node.statements)
+
+    def visit_if(self, node):
+        condition = self.visit(node.condition)
+        body = self.visit(node.body)
+
+        def if_(frame):
+            if condition(frame):
+                body(frame)
+
+        return if_
+
+    def visit_loop(self, node):
+        condition = self.visit(node.condition)
+        body = self.visit(node.body)
+
+        def loop(frame):
+            while condition(frame):
+                body(frame)
+
+        return loop
+
+    def visit_output(self, node):
+        value = self.visit(node.value)
+        write = self.write
+
+        def output(frame):
+            write(value(frame))
+
+        return output
+
+    def visit_debug(self, node):
+        # there are no instructions to step through
+        def debug(frame):
+            pass
+
+        return debug
+
+    def visit_odd(self, node):
+        expression = self.visit(node.expression)
+
+        def odd(frame):
+            return expression(frame) % 2
+
+        return odd
+
+    def visit_binary(self, node):
+        operation = OPERATIONS[str(node.operator)]
+        left = self.operand(node.left)
+        right = self.operand(node.right)
+
+        if left[0] == "slot" and right[0] == "value":
+            lhs, rhs = left[1], right[1]
+
+            def binary(frame):
+                return operation(frame[lhs], rhs)
+
+        elif left[0] == "slot" and right[0] == "slot":
+            lhs, rhs = left[1], right[1]
+
+            def binary(frame):
+                return operation(frame[lhs], frame[rhs])
+
+        elif right[0] == "value":
+            lhs, rhs = self.visit(node.left), right[1]
+
+            def binary(frame):
+                return operation(lhs(frame), rhs)
+
+        elif left[0] == "slot":
+            lhs, rhs = left[1], self.visit(node.right)
+
+            def binary(frame):
+                return operation(frame[lhs], rhs(frame))
+
+        else:
+            lhs, rhs = self.visit(node.left), self.visit(node.right)
+
+            def binary(frame):
+                return operation(lhs(frame), rhs(frame))
+
+        return binary
+
+    def visit_unary(self, node):
+        right = self.visit(node.right)
+
+        def unary(frame):
+            return -right(frame)
+
+        return unary
+
+    def visit_identifier(self, node):
+        referenced = self.scope[node.name]
+        if referenced["type"] == "Const":
+            return self.constant(referenced["value"])
+
+        level, slot = self.resolve(node.name)
+        if level == 0:
+
+            def identifier(frame):
+                return frame[slot]
+
+        elif level == 1:
+
+            def identifier(frame):
+                return frame[0][slot]
+
+        else:
+            outer = self.outer(level)
+
+            def identifier(frame):
+                return outer(frame)[slot]
+
+        return identifier
+
+    def visit_number(self, node):
+        return self.constant(node.value)
+
+    def visit_grouping(self, node):
+        return self.visit(node.expression)
+
+    def constant(self, value):
+        def constant(frame):
+            return value
+
+        return constant
+
+    def operand(self, node):
+        """
+        Classify an operand as ("value", constant value), ("slot", slot
+        of a local variable) or ("node", node) for anything else.
+        """
+        while node.type == "Grouping":
+            node = node.expression
+
+        if node.type == "Number":
+            return "value", node.value
+        if node.type == "Identifier":
+            referenced = self.scope[node.name]
+            if referenced["type"] == "Const":
+                return "value", referenced["value"]
+            level, slot = self.resolve(node.name)
+            if level == 0:
+                return "slot", slot
+        return "node", node
+
+    def resolve(self, name):
+        """
+        Get the number of static links to follow and the slot of a variable.
+        """
+        referenced = self.scope[name]
+        return len(self.scope.maps) - 1 - referenced["level"], referenced["slot"]
+
+    def outer(self, level):
+        """
+        Get a function returning the frame `level` static links out.
+        """
+        if level == 0:
+            return lambda frame: frame
+        if level == 1:
+            return lambda frame: frame[0]
+
+        def outer(frame):
+            for _ in range(level):
+                frame = frame[0]
+            return frame
+
+        return outer
+
+    def sequence(self, nodes):
+        """
+        Compile a list of declarations and statements into one closure
+        running the statements in order.
+        """
+        statements = [self.visit(node) for node in nodes if node is not None]
+        statements = [statement for statement in statements if statement is not None]
+
+        if len(statements) == 1:
+            return statements[0]
+
+        def sequence(frame):
+            for statement in statements:
+                statement(frame)
+
+        return sequence
+
+    def push_scope(self):
+        self.scope = self.scope.new_child()
+
+    def pop_scope(self):
+        self.scope = self.scope.parents
+
+    @classmethod
+    def generate_code(cls, ast, write=print):
+        """
+        Returns the closure of the program, which runs it in the global
+        frame it is passed. Written values are passed to `write`.
+        """
+        visitor = cls(write=write)
+        body = visitor.sequence(from_dicts(ast))
+        variables = [0] * (visitor.slots - 1)
+
+        def program(frame):
+            frame.extend(variables)
+            body(frame)
+
+        return program
+
+
+class ClosureBackend:
+    """
+    Runs a program compiled by `ClosureCompiler`. The global frame is
+    kept as `frame` once the program has run. `output` is the sink the
+    code was compiled to write to, it is flushed when the program stops.
+    """
+
+    def __init__(self, code, output=None):
+        self.code = code
+        self.output = output
+        self.frame = None
+
+    @classmethod
+    def from_ast(cls, ast, output=None, **kwargs):
+        write = print if output is None else output.write
+        code = ClosureCompiler.generate_code(ast, write=write)
+        return cls(code, output=output, **kwargs)
+
+    def interpret(self):
+        self.frame = [0]
+        try:
+            self.code(self.frame)
+        finally:
+            if self.output is not None:
+                self.output.flush()
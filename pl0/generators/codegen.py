@@ -1,106 +1,141 @@
 from collections import ChainMap
 
+from pl0.bytecode import CodeObject
 from pl0.constants import OP_CODE, OPERATION
 from pl0.generators.visitor import Visitor
+from pl0.nodes import from_dicts
+from pl0.symbols import MAIN
 
 
 class Generator(Visitor):
-    def __init__(self):
+    """
+    Generate code for the stack machine in pl0.vm. The methods visiting
+    the children of a node are generators, so any depth of AST is
+    walked without recursing (see `Visitor.trampoline`).
+    """
+
+    def __init__(self, symbols=None):
         self.scope = ChainMap()
+        # a `SymbolTable` to add the procedures to, and the names of the
+        # procedures enclosing the code being generated
+        self.symbols = symbols
+        self.path = []
+        # the source line of the statement being generated
+        self.line = None
+        # the number of variables, parameters included, declared in each
+        # scope, kept alongside `scope`
+        self.declarations = [0]
         self.code = []
 
     def visit_const(self, node):
-        self.scope[node["name"]] = {"type": node["type"], "value": node["value"]}
+        self.scope[node.name] = {"type": node.type, "value": node.value}
 
     def visit_var(self, node):
         # 0 based. First 3 are for some stack frame book keeping (SL, DL, RA)
         addr_offset = self.declaration_count() + 3
-        self.scope[node["name"]] = {
-            "type": node["type"],
+        self.scope[node.name] = {
+            "type": node.type,
             "level": len(self.scope.maps) - 1,
             "offset": addr_offset,
         }
+        self.declarations[-1] += 1
 
     def visit_procedure(self, node):
-        proc_declaration = {"type": node["type"], "level": len(self.scope.maps) - 1}
-        self.scope[node["name"]] = proc_declaration
+        proc_declaration = {"type": node.type, "level": len(self.scope.maps) - 1}
+        self.scope[node.name] = proc_declaration
 
+        self.locate(node)
         # create a new scope for the procedure declarations to live in
         self.push_scope()
+        self.path.append(node.name)
         jmp_idx = self.generate(OP_CODE.JMP, 0, 0)
 
-        for i, parameter in enumerate(node["parameters"], start=1):
-            self.scope[parameter["name"]] = {
-                "type": parameter["type"],
+        for i, parameter in enumerate(node.parameters, start=1):
+            self.scope[parameter.name] = {
+                "type": parameter.type,
                 "level": len(self.scope.maps) - 1,
                 "offset": -i,  # parameters are found just below the base pointer.
             }                  # the caller will take care of removing them when the
                                # procedure returns
+        # parameters take up frame slots like variables do
+        self.declarations[-1] = len(node.parameters)
 
-        for block in node["blocks"]:
+        for block in node.blocks:
             if self.should_fixup(block):
-                self.fixup(jmp_idx)
-                proc_declaration["address"] = self.code[jmp_idx][2]
-            self.visit(block)
-
+                proc_declaration["address"] = self.fixup(jmp_idx)
+                if self.symbols is not None:
+                    self.symbols.add_procedure(
+                        proc_declaration["address"], ".".join(self.path)
+                    )
+            yield block
+
+        self.locate(node)
         self.generate(OP_CODE.OPR, 0, OPERATION.RETURN)
+        self.path.pop()
         self.pop_scope()
 
     def visit_assignment(self, node):
+        self.locate(node)
         level = len(self.scope.maps) - 1
-        var = self.scope[node["name"]]
-        self.visit(node["value"])
+        var = self.scope[node.name]
+        yield node.value
         self.generate(OP_CODE.STO, level - var["level"], var["offset"])
 
     def visit_call(self, node):
+        self.locate(node)
         # This will push the parameters onto the stack in reverse order.
         # then they can be accessed by base_pointer - 1 for first arg, etc.
-        for argument in node["arguments"][::-1]:
-            self.visit(argument)
+        for argument in node.arguments[::-1]:
+            yield argument
 
         level = len(self.scope.maps) - 1
-        procedure = self.scope[node["name"]]
+        procedure = self.scope[node.name]
         self.generate(OP_CODE.CAL, level - procedure["level"], procedure["address"])
 
         # "Pop off" any parameters by decrementing the stack pointer
-        for argument in node["arguments"]:
-            self.generate(OP_CODE.DET, 0, 0)
+        for argument in node.arguments:
+            self.generate(OP_CODE.DET, 0, 1)
 
     def visit_block(self, node):
-        for statement in node["statements"]:
-            self.visit(statement)
+        for statement in node.statements:
+            yield statement
 
     def visit_if(self, node):
-        self.visit(node["condition"])
+        self.locate(node)
+        yield node.condition
         jpc_idx = self.generate(OP_CODE.JPC, 0, 0)
-        self.visit(node["body"])
+        yield node.body
         # fixup
-        self.code[jpc_idx][2] = len(self.code)
+        self.patch(jpc_idx, len(self.code))
 
     def visit_loop(self, node):
+        self.locate(node)
         cond_idx = len(self.code)
-        self.visit(node["condition"])
+        yield node.condition
         jpc_idx = self.generate(OP_CODE.JPC, 0, 0)
-        self.visit(node["body"])
+        yield node.body
+        self.locate(node)
         self.generate(OP_CODE.JMP, 0, cond_idx)
         # fixup
-        self.code[jpc_idx][2] = len(self.code)
+        self.patch(jpc_idx, len(self.code))
 
     def visit_output(self, node):
-        self.visit(node["value"])
+        self.locate(node)
+        yield node.value
         self.generate(OP_CODE.OPR, 0, OPERATION.WRITE)
 
     def visit_debug(self, node):
+        self.locate(node)
         self.generate(OP_CODE.OPR, 0, OPERATION.DEBUG)
 
     def visit_odd(self, node):
-        self.visit(node["expression"])
+        yield node.expression
         self.generate(OP_CODE.OPR, 0, OPERATION.ODD)
 
     def visit_binary(self, node):
-        operator = node["operator"]
-        self.visit(node["left"])
-        self.visit(node["right"])
+        operator = node.operator
+        yield node.left
+        yield node.right
 
         if operator == "PLUS":
             self.generate(OP_CODE.OPR, 0, OPERATION.ADD)
@@ -124,12 +159,12 @@ class Generator(Visitor):
             self.generate(OP_CODE.OPR, 0, OPERATION.LESS_EQUAL)
 
     def visit_unary(self, node):
-        self.visit(node["right"])
+        yield node.right
         self.generate(OP_CODE.OPR, 0, OPERATION.NEGATE)
 
     def visit_identifier(self, node):
         level = len(self.scope.maps) - 1
-        referenced = self.scope[node["name"]]
+        referenced = self.scope[node.name]
         if referenced["type"] == "Const":
             self.generate(OP_CODE.LIT, 0, referenced["value"])
         elif referenced["type"] == "Var":
@@ -138,52 +173,89 @@ class Generator(Visitor):
             )
 
     def visit_number(self, node):
-        self.generate(OP_CODE.LIT, 0, node["value"])
+        self.generate(OP_CODE.LIT, 0, node.value)
 
     def visit_grouping(self, node):
-        self.visit(node["expression"])
+        yield node.expression
 
     def generate(self, instruction, level, value):
         self.code.append([instruction, level, value])
+        if self.symbols is not None:
+            self.symbols.lines.append(self.line)
         return len(self.code) - 1
 
+    def locate(self, node):
+        """
+        Attribute the instructions generated from now on to the source
+        line of a declaration or statement, if the parser recorded it.
+        """
+        if node.line is not None:
+            self.line = node.line
+
+    def patch(self, index, value):
+        """
+        Set the value of an already generated instruction. Used to fixup
+        jump targets once they are known.
+        """
+        self.code[index][2] = value
+
     def should_fixup(self, node):
-        return node["type"] not in ["Const", "Var", "Procedure"]
+        return node.type not in ["Const", "Var", "Procedure"]
 
     def fixup(self, jmp_idx):
         """
         Fixup a JMP instruction, and allocate space on the stack
         for static link, dynamic link, return address, and all variable
-        declarations.
+        declarations. Returns the address the JMP now points to.
         """
         # 3 for SL, DL, RA
         var_declarations = self.declaration_count() + 3
-        self.code[jmp_idx][2] = len(self.code)
+        address = len(self.code)
+        self.patch(jmp_idx, address)
         self.generate(OP_CODE.INT, 0, var_declarations)
+        return address
 
     def push_scope(self):
         self.scope = self.scope.new_child()
+        self.declarations.append(0)
 
     def pop_scope(self):
         self.scope = self.scope.parents
+        self.declarations.pop()
 
     def declaration_count(self):
         """
         Get the number of variable declarations in the current scope.
         """
-        count = 0
-        for declaration in self.scope.maps[0].values():
-            if declaration["type"] == "Var":
-                count += 1
-        return count
+        return self.declarations[-1]
 
     @classmethod
-    def generate_code(cls, ast):
-        visitor = cls()
+    def generate_code(cls, ast, symbols=None):
+        """
+        Generate the code of a program, adding its procedures to the
+        `SymbolTable` `symbols` if one is given.
+        """
+        visitor = cls(symbols=symbols)
         jmp_idx = visitor.generate(OP_CODE.JMP, 0, 0)
-        for node in ast:
+        for node in from_dicts(ast):
             if visitor.should_fixup(node):
-                visitor.fixup(jmp_idx)
+                address = visitor.fixup(jmp_idx)
+                if symbols is not None:
+                    symbols.add_procedure(address, MAIN)
             visitor.visit(node)
         visitor.generate(OP_CODE.OPR, 0, OPERATION.RETURN)
         return visitor.code
+
+
+class BytecodeGenerator(Generator):
+    """
+    A `Generator` which emits a compact `CodeObject` instead of a list
+    of instructions.
+    """
+
+    def __init__(self, symbols=None):
+        super().__init__(symbols=symbols)
+        self.code = CodeObject()
+
+    def patch(self, index, value):
+        self.code.patch(index, value)
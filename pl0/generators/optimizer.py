@@ -0,0 +1,237 @@
+from collections import ChainMap
+
+from pl0 import nodes
+from pl0.constants import OPERATION
+from pl0.generators.visitor import Visitor
+from pl0.vm import VM
+
+# Evaluate operators the same way the VM does
+OPERATIONS = {
+    "PLUS": VM.OPERATION_MAP[OPERATION.ADD],
+    "MINUS": VM.OPERATION_MAP[OPERATION.SUB],
+    "TIMES": VM.OPERATION_MAP[OPERATION.MULT],
+    "SLASH": VM.OPERATION_MAP[OPERATION.DIV],
+    "EQL": VM.OPERATION_MAP[OPERATION.EQUAL],
+    "NEQ": VM.OPERATION_MAP[OPERATION.NOT_EQUAL],
+    "LESS": VM.OPERATION_MAP[OPERATION.LESS],
+    "GEQ": VM.OPERATION_MAP[OPERATION.GREATER_EQUAL],
+    "GTR": VM.OPERATION_MAP[OPERATION.GREATER],
+    "LEQ": VM.OPERATION_MAP[OPERATION.LESS_EQUAL],
+}
+
+# How tightly an operator binds, used to decide whether a Grouping
+# is needed to preserve the meaning of an expression.
+PRECEDENCE = {
+    "EQL": 0,
+    "NEQ": 0,
+    "LESS": 0,
+    "GEQ": 0,
+    "GTR": 0,
+    "LEQ": 0,
+    "PLUS": 1,
+    "MINUS": 1,
+    "TIMES": 2,
+    "SLASH": 2,
+}
+
+
+class ASTOptimizer(Visitor):
+    """
+    Rewrites an AST into an equivalent, simpler one before it is handed
+    to a code generator or transpiler.
+
+    - Expressions on numbers and named constants are evaluated.
+    - `if` statements and `while` loops whose condition is constant
+      false are removed, `if` statements whose condition is constant
+      true are replaced by their body.
+    - Grouping nodes which don't change the meaning of an expression
+      are stripped.
+
+    The input AST is left untouched, changed nodes are copied.
+    """
+
+    def __init__(self):
+        # maps names to their constant value, or None for anything else
+        self.scope = ChainMap()
+
+    def visit_const(self, node):
+        self.scope[node.name] = node.value
+        return node
+
+    def visit_var(self, node):
+        self.scope[node.name] = None
+        return node
+
+    def visit_procedure(self, node):
+        self.scope[node.name] = None
+        self.scope = self.scope.new_child()
+        for parameter in node.parameters:
+            self.scope[parameter.name] = None
+        blocks = yield from self.visit_blocks(node.blocks)
+        self.scope = self.scope.parents
+        return self.node(
+            "Procedure",
+            name=node.name,
+            parameters=node.parameters,
+            blocks=blocks,
+            **self.position(node),
+        )
+
+    def visit_assignment(self, node):
+        return self.node(
+            "Assignment",
+            name=node.name,
+            value=self.unwrap((yield node.value)),
+            **self.position(node),
+        )
+
+    def visit_call(self, node):
+        arguments = []
+        for argument in node.arguments:
+            arguments.append(self.unwrap((yield argument)))
+        return self.node(
+            "Call", name=node.name, arguments=arguments, **self.position(node)
+        )
+
+    def visit_block(self, node):
+        statements = []
+        for statement in node.statements:
+            statement = yield statement
+            if statement is not None:
+                statements.append(statement)
+        return self.node("Block", statements=statements, **self.position(node))
+
+    def visit_if(self, node):
+        condition = yield node.condition
+        if condition.type == "Number":
+            return (yield node.body) if condition.value else None
+
+        body = yield node.body
+        if body is None or self.is_empty(body):
+            # conditions have no side effects
+            return None
+        return self.node("If", condition=condition, body=body, **self.position(node))
+
+    def visit_loop(self, node):
+        condition = yield node.condition
+        if condition.type == "Number" and not condition.value:
+            return None
+
+        body = yield node.body
+        if body is None:
+            body = self.node("Block", statements=[])
+        return self.node(
+            "Loop", condition=condition, body=body, **self.position(node)
+        )
+
+    def visit_output(self, node):
+        return self.node(
+            "Output", value=self.unwrap((yield node.value)), **self.position(node)
+        )
+
+    def visit_debug(self, node):
+        return node
+
+    def visit_odd(self, node):
+        expression = yield node.expression
+        if expression.type == "Number":
+            return self.node("Number", value=expression.value % 2)
+        return self.node("Odd", expression=expression)
+
+    def visit_binary(self, node):
+        # operators are Tokens when they come straight from the parser
+        operator = str(node.operator)
+        left = yield node.left
+        right = yield node.right
+
+        if left.type == "Number" and right.type == "Number":
+            if not (operator == "SLASH" and right.value == 0):
+                value = OPERATIONS[operator](left.value, right.value)
+                return self.node("Number", value=int(value))
+
+        if PRECEDENCE[operator] == 0:
+            left = self.unwrap(left)
+            right = self.unwrap(right)
+        else:
+            left = self.strip_grouping(left, operator, is_left=True)
+            right = self.strip_grouping(right, operator, is_left=False)
+        return self.node("Binary", left=left, right=right, operator=node.operator)
+
+    def visit_unary(self, node):
+        right = yield node.right
+        if right.type == "Number":
+            return self.node("Number", value=-right.value)
+        return self.node("Unary", operator=node.operator, right=right)
+
+    def visit_identifier(self, node):
+        value = self.scope.get(node.name)
+        if value is not None:
+            return self.node("Number", value=value)
+        return node
+
+    def visit_number(self, node):
+        return node
+
+    def visit_grouping(self, node):
+        expression = yield node.expression
+        if expression.type in ("Number", "Identifier", "Grouping"):
+            return expression
+        return self.node("Grouping", expression=expression)
+
+    def visit_blocks(self, blocks):
+        """
+        Visit the declarations and statement of a program or procedure.
+        A removed statement is replaced with an empty block, code
+        generators rely on every procedure having a statement. A
+        generator, like the `visit_*` methods.
+        """
+        visited = []
+        for block in blocks:
+            optimized = yield block
+            if optimized is None:
+                optimized = self.node("Block", statements=[])
+            visited.append(optimized)
+        return visited
+
+    def unwrap(self, node):
+        """
+        Strip the Grouping from an expression which stands on its own.
+        """
+        while node.type == "Grouping":
+            node = node.expression
+        return node
+
+    def strip_grouping(self, node, operator, is_left):
+        """
+        Strip the Grouping from an operand of `operator` if the operand
+        binds at least as tightly as the operator itself.
+        """
+        if node.type != "Grouping":
+            return node
+
+        expression = node.expression
+        if expression.type != "Binary":
+            return node
+
+        inner = PRECEDENCE[str(expression.operator)]
+        outer = PRECEDENCE[operator]
+        if inner > outer or (inner == outer and is_left):
+            return expression
+        return node
+
+    def is_empty(self, node):
+        return node.type == "Block" and not node.statements
+
+    def node(self, type, **kwargs):
+        return nodes.node(type, **kwargs)
+
+    def position(self, node):
+        """
+        The source position of a statement, when the parser recorded it.
+        """
+        return {"line": node.line}
+
+    @classmethod
+    def generate_code(cls, ast):
+        visitor = cls()
+        return visitor.trampoline(visitor.visit_blocks(nodes.from_dicts(ast)))
@@ -1,96 +1,195 @@
 from pl0.generators.visitor import Visitor
+from pl0.nodes import from_dicts
 
 from io import StringIO
 
 
-class PythonTranspiler(Visitor):
+class PythonScopes:
+    """
+    Tracks the variables and constants of the Python functions
+    procedures become, shared by the code generators targeting Python.
+    Each scope is a dict of the function name, its variables (including
+    parameters) and, with `fast_locals`, its inlined constants.
+    """
+
+    def __init__(self, fast_locals=False):
+        self.scope = [{"name": "global", "vars": [], "consts": {}}]
+        self.fast_locals = fast_locals
+
+    def push_scope(self, name):
+        self.scope.append({"name": name, "vars": [], "consts": {}})
+
+    def pop_scope(self):
+        self.scope.pop()
+
+    def constant(self, name):
+        """
+        The value to inline for `name`, or None if it's a variable or
+        constants aren't inlined.
+        """
+        if self.fast_locals:
+            for scope in reversed(self.scope):
+                if name in scope["vars"]:
+                    return None
+                if name in scope["consts"]:
+                    return scope["consts"][name]
+        return None
+
+    def outer_declarations(self, node):
+        """
+        The `global` or `nonlocal` declarations needed for the variables
+        of enclosing scopes a procedure assigns to, as (keyword, name)
+        pairs. They have to be made before the names are used anywhere
+        in the function.
+        """
+        local = {parameter.name for parameter in node.parameters}
+        local.update(
+            block.name for block in node.blocks if block.type == "Var"
+        )
+
+        declarations = []
+        for name in self.assigned(node.blocks):
+            if name in local or name in [name for _, name in declarations]:
+                continue
+            # the innermost enclosing scope declaring the variable
+            owner = next(
+                i for i in range(len(self.scope) - 2, -1, -1)
+                if name in self.scope[i]["vars"]
+            )
+            if owner == 0 and not self.fast_locals:
+                declarations.append(("global", name))
+            else:
+                declarations.append(("nonlocal", name))
+        return declarations
+
+    def assigned(self, nodes):
+        """
+        Yield the names assigned to by a list of statements, not
+        including those of nested procedures.
+        """
+        for node in nodes:
+            if node is None:
+                continue
+            if node.type == "Assignment":
+                yield node.name
+            elif node.type == "Block":
+                yield from self.assigned(node.statements)
+            elif node.type in ("If", "Loop"):
+                yield from self.assigned([node.body])
+
+
+class PythonTranspiler(PythonScopes, Visitor):
+    """
+    Transpile the AST into Python source.
+
+    With `fast_locals` the whole program is wrapped in a `main` function
+    so that its variables are function locals (or cells when procedures
+    use them) instead of module globals, which CPython looks up in a
+    dict on every access. Procedures assign to them through `nonlocal`,
+    constants are inlined, `print` is bound as a default argument and
+    `odd` conditions test the remainder directly.
+    """
+
     INDENT = "    "
 
-    def __init__(self):
+    def __init__(self, fast_locals=False):
+        super().__init__(fast_locals=fast_locals)
         self._output = StringIO()
-        self.scope = [{"name": "global", "vars": []}]
         self.depth = 0
 
     def visit_const(self, node):
+        if self.fast_locals:
+            self.scope[-1]["consts"][node.name] = node.value
+            return
+
         self.indent()
-        self.output(f"{node['name']} = {node['value']}\n")
+        self.output(f"{node.name} = {node.value}\n")
 
     def visit_var(self, node):
         self.indent()
-        self.output(f"{node['name']} = None\n")
-        self.scope[-1]["vars"].append(node["name"])
+        self.output(f"{node.name} = 0\n")
+        self.scope[-1]["vars"].append(node.name)
 
     def visit_procedure(self, node):
+        self.output("\n")
         self.indent()
-        self.output(f"\ndef {node['name']}(")
+        self.output(f"def {node.name}(")
 
-        self.scope.append({"name": node["name"], "vars": []})
-        for i, parameter in enumerate(node["parameters"]):
-            self.scope[-1]["vars"].append(parameter["name"])
-            self.output(parameter["name"])
-            if len(node["parameters"]) > 1 and i < len(node["parameters"]) - 1:
+        self.push_scope(node.name)
+        for i, parameter in enumerate(node.parameters):
+            self.scope[-1]["vars"].append(parameter.name)
+            self.output(parameter.name)
+            if len(node.parameters) > 1 and i < len(node.parameters) - 1:
                 self.output(", ")
 
         self.output("):\n")
 
         self.depth += 1
-        for block in node["blocks"]:
+        self.declare_outer(node)
+        for block in node.blocks:
             self.visit(block)
+        if not node.blocks:
+            self.indent()
+            self.output("pass\n")
         self.depth -= 1
-        self.scope.pop()
+        self.pop_scope()
         self.output("\n")
 
-    def visit_assignment(self, node):
-        if node["name"] not in self.scope[-1]["vars"]:
+    def declare_outer(self, node):
+        for keyword, name in self.outer_declarations(node):
             self.indent()
-            self.output(f"global {node['name']}\n")
-            self.scope[-1]["vars"].append(node["name"])
+            self.output(f"{keyword} {name}\n")
 
+    def visit_assignment(self, node):
         self.indent()
-        self.output(f"{node['name']} = ")
+        self.output(f"{node.name} = ")
 
-        self.visit(node["value"])
+        self.visit(node.value)
         self.output("\n")
 
     def visit_call(self, node):
         self.indent()
-        self.output(f"{node['name']}(")
+        self.output(f"{node.name}(")
 
-        for i, argument in enumerate(node["arguments"]):
+        for i, argument in enumerate(node.arguments):
             self.visit(argument)
-            if len(node["arguments"]) > 1 and i < len(node["arguments"]) - 1:
+            if len(node.arguments) > 1 and i < len(node.arguments) - 1:
                 self.output(", ")
 
         self.output(")\n")
 
     def visit_block(self, node):
-        for statement in node["statements"]:
+        if not node.statements:
+            self.indent()
+            self.output("pass\n")
+
+        for statement in node.statements:
             self.visit(statement)
 
     def visit_if(self, node):
         self.indent()
         self.output("if ")
-        self.visit(node["condition"])
+        self.visit(node.condition)
         self.output(":\n")
 
         self.depth += 1
-        self.visit(node["body"])
+        self.visit(node.body)
         self.depth -= 1
 
     def visit_loop(self, node):
         self.indent()
         self.output("while ")
-        self.visit(node["condition"])
+        self.visit(node.condition)
         self.output(":\n")
 
         self.depth += 1
-        self.visit(node["body"])
+        self.visit(node.body)
         self.depth -= 1
 
     def visit_output(self, node):
         self.indent()
         self.output("print(")
-        self.visit(node["value"])
+        self.visit(node.value)
         self.output(")\n")
 
     def visit_debug(self, node):
@@ -98,12 +197,13 @@ class PythonTranspiler(Visitor):
         self.output("breakpoint()\n")
 
     def visit_odd(self, node):
-        self.visit(node["expression"])
-        self.output(f" % 2 == 1")
+        self.operand(node.expression)
+        # a condition, so the remainder is as good as a bool
+        self.output(" % 2" if self.fast_locals else " % 2 == 1")
 
     def visit_binary(self, node):
-        operator = node["operator"]
-        self.visit(node["left"])
+        operator = node.operator
+        self.visit(node.left)
 
         if operator == "PLUS":
             self.output(" + ")
@@ -124,25 +224,39 @@ class PythonTranspiler(Visitor):
         elif operator == "GTR":
             self.output(" > ")
         elif operator == "LEQ":
-            self.output(" >= ")
+            self.output(" <= ")
 
-        self.visit(node["right"])
+        self.visit(node.right)
 
     def visit_unary(self, node):
+        # the VM negates the whole term, -a // b is -(a // b) and not (-a) // b
         self.output("-")
-        self.visit(node["right"])
+        self.operand(node.right)
 
     def visit_identifier(self, node):
-        self.output(node["name"])
+        value = self.constant(node.name)
+        self.output(node.name if value is None else value)
 
     def visit_number(self, node):
-        self.output(node["value"])
+        self.output(node.value)
 
     def visit_grouping(self, node):
         self.output("(")
-        self.visit(node["expression"])
+        self.visit(node.expression)
         self.output(")")
 
+    def operand(self, node):
+        """
+        Output an expression, in parentheses unless it's a single
+        identifier, number or grouping.
+        """
+        if node.type in ("Identifier", "Number", "Grouping"):
+            self.visit(node)
+        else:
+            self.output("(")
+            self.visit(node)
+            self.output(")")
+
     def output(self, code):
         self._output.write(f"{code}")
 
@@ -150,8 +264,20 @@ class PythonTranspiler(Visitor):
         self._output.write(f"{self.INDENT * self.depth}")
 
     @classmethod
-    def generate_code(cls, ast):
-        visitor = cls()
+    def generate_code(cls, ast, fast_locals=False):
+        ast = from_dicts(ast)
+        visitor = cls(fast_locals=fast_locals)
+        if fast_locals:
+            visitor.output("def main(print=print):\n")
+            visitor.depth += 1
+
         for node in ast:
             visitor.visit(node)
+
+        if fast_locals:
+            if not ast:
+                visitor.indent()
+                visitor.output("pass\n")
+            visitor.output("\nmain()\n")
         return visitor._output.getvalue()
+
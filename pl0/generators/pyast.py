@@ -0,0 +1,254 @@
+import ast
+import sys
+from functools import lru_cache, partial
+
+from pl0.generators.py3 import PythonScopes
+from pl0.generators.visitor import Visitor
+from pl0.nodes import from_dicts
+from pl0.sinks import OutputSink
+
+# ast nodes without fields or attributes can be shared, like CPython does
+LOAD = ast.Load()
+STORE = ast.Store()
+
+OPERATORS = {
+    "PLUS": ast.Add(),
+    "MINUS": ast.Sub(),
+    "TIMES": ast.Mult(),
+    "SLASH": ast.FloorDiv(),
+}
+
+COMPARISONS = {
+    "EQL": ast.Eq(),
+    "NEQ": ast.NotEq(),
+    "LESS": ast.Lt(),
+    "GEQ": ast.GtE(),
+    "GTR": ast.Gt(),
+    "LEQ": ast.LtE(),
+}
+
+
+class PythonASTGenerator(PythonScopes, Visitor):
+    """
+    Build a Python `ast.Module` straight from the AST, equivalent to the
+    source `PythonTranspiler` generates but without writing and then
+    re-parsing any text. The module can be passed to `compile()`.
+
+    Every node is given the line number the parser recorded for the
+    statement it is part of (see `Parser.parse(..., positions=True)`),
+    or line 1 without positions, so tracebacks point into the PL/0
+    source. Setting them while building the tree saves a second pass
+    with `ast.fix_missing_locations`. Statement visitors return a list
+    of Python statements, expression visitors a single expression.
+    """
+
+    def __init__(self, fast_locals=False):
+        super().__init__(fast_locals=fast_locals)
+        self.location = self.line(1)
+
+    def visit_const(self, node):
+        if self.fast_locals:
+            self.scope[-1]["consts"][node.name] = node.value
+            return []
+        self.locate(node)
+        return [self.assign(node.name, self.constant_node(node.value))]
+
+    def visit_var(self, node):
+        self.locate(node)
+        self.scope[-1]["vars"].append(node.name)
+        return [self.assign(node.name, self.constant_node(0))]
+
+    def visit_procedure(self, node):
+        location = self.locate(node)
+        self.push_scope(node.name)
+        for parameter in node.parameters:
+            self.scope[-1]["vars"].append(parameter.name)
+
+        body = []
+        for keyword, name in self.outer_declarations(node):
+            declaration = ast.Global if keyword == "global" else ast.Nonlocal
+            body.append(declaration([name], **location))
+        body += self.statements(node.blocks)
+        self.pop_scope()
+
+        self.location = location
+        parameters = [parameter.name for parameter in node.parameters]
+        return [self.function(node.name, parameters, body)]
+
+    def visit_assignment(self, node):
+        self.locate(node)
+        return [self.assign(node.name, self.visit(node.value))]
+
+    def visit_call(self, node):
+        location = self.locate(node)
+        arguments = [self.visit(argument) for argument in node.arguments]
+        return [ast.Expr(self.call(node.name, arguments), **location)]
+
+    def visit_block(self, node):
+        self.locate(node)
+        return self.statements(node.statements)
+
+    def visit_if(self, node):
+        location = self.locate(node)
+        condition = self.visit(node.condition)
+        return [ast.If(condition, self.body(node.body), [], **location)]
+
+    def visit_loop(self, node):
+        location = self.locate(node)
+        condition = self.visit(node.condition)
+        return [ast.While(condition, self.body(node.body), [], **location)]
+
+    def visit_output(self, node):
+        location = self.locate(node)
+        value = self.visit(node.value)
+        return [ast.Expr(self.call("print", [value]), **location)]
+
+    def visit_debug(self, node):
+        location = self.locate(node)
+        return [ast.Expr(self.call("breakpoint", []), **location)]
+
+    def visit_odd(self, node):
+        remainder = ast.BinOp(
+            self.visit(node.expression),
+            ast.Mod(),
+            self.constant_node(2),
+            **self.location,
+        )
+        if self.fast_locals:
+            # a condition, so the remainder is as good as a bool
+            return remainder
+        return ast.Compare(
+            remainder, [ast.Eq()], [self.constant_node(1)], **self.location
+        )
+
+    def visit_binary(self, node):
+        operator = str(node.operator)
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        if operator in OPERATORS:
+            return ast.BinOp(left, OPERATORS[operator], right, **self.location)
+        return ast.Compare(left, [COMPARISONS[operator]], [right], **self.location)
+
+    def visit_unary(self, node):
+        return ast.UnaryOp(ast.USub(), self.visit(node.right), **self.location)
+
+    def visit_identifier(self, node):
+        value = self.constant(node.name)
+        if value is not None:
+            return self.constant_node(value)
+        return ast.Name(node.name, LOAD, **self.location)
+
+    def visit_number(self, node):
+        return self.constant_node(node.value)
+
+    def visit_grouping(self, node):
+        return self.visit(node.expression)
+
+    def statements(self, nodes):
+        """
+        The Python statements of a list of PL/0 declarations and
+        statements.
+        """
+        statements = []
+        for node in nodes:
+            statements += self.visit(node)
+        return statements or [ast.Pass(**self.location)]
+
+    def body(self, node):
+        return self.statements([node])
+
+    def assign(self, name, value):
+        target = ast.Name(name, STORE, **self.location)
+        return ast.Assign([target], value, **self.location)
+
+    def call(self, name, arguments):
+        function = ast.Name(name, LOAD, **self.location)
+        return ast.Call(function, arguments, [], **self.location)
+
+    def constant_node(self, value):
+        return ast.Constant(value, **self.location)
+
+    def function(self, name, parameters, body, defaults=()):
+        arguments = ast.arguments(
+            posonlyargs=[],
+            args=[ast.arg(parameter, **self.location) for parameter in parameters],
+            vararg=None,
+            kwonlyargs=[],
+            kw_defaults=[],
+            kwarg=None,
+            defaults=list(defaults),
+        )
+        extra = {"type_params": []} if sys.version_info >= (3, 12) else {}
+        return ast.FunctionDef(name, arguments, body, [], None, **extra, **self.location)
+
+    def line(self, line):
+        return {"lineno": line, "col_offset": 0, "end_lineno": line, "end_col_offset": 0}
+
+    def locate(self, node):
+        """
+        Move to the source line of a declaration or statement, if the
+        parser recorded it. Returns the location nodes are given.
+        """
+        if node.line is not None and node.line != self.location["lineno"]:
+            self.location = self.line(node.line)
+        return self.location
+
+    @classmethod
+    def generate_code(cls, ast_, fast_locals=False):
+        visitor = cls(fast_locals=fast_locals)
+        body = visitor.statements(from_dicts(ast_))
+        if fast_locals:
+            visitor.location = visitor.line(1)
+            main = visitor.function(
+                "main",
+                ["print"],
+                body,
+                defaults=[ast.Name("print", LOAD, **visitor.location)],
+            )
+            body = [main, ast.Expr(visitor.call("main", []), **visitor.location)]
+        return ast.Module(body, [])
+
+
+@lru_cache(maxsize=128)
+def compile_source(source):
+    """
+    Compile transpiled Python source into a code object. The code
+    objects of the most recently used sources are cached, keyed by the
+    hash of the source.
+    """
+    return compile(source, "<pl0>", "exec")
+
+
+class PythonBackend:
+    """
+    Runs a program compiled to Python in this interpreter. `code` is
+    either Python source, as generated by `PythonTranspiler`, or a code
+    object. What the program writes goes to `output`, an `OutputSink` or
+    a text stream, or to stdout by default. The module namespace the
+    program ran in is kept as `namespace`.
+    """
+
+    def __init__(self, code, output=None):
+        self.code = compile_source(code) if isinstance(code, str) else code
+        self.output = output
+        self.namespace = None
+
+    @classmethod
+    def from_ast(cls, ast_, fast_locals=False, filename="<pl0>", **kwargs):
+        module = PythonASTGenerator.generate_code(ast_, fast_locals=fast_locals)
+        return cls(compile(module, filename, "exec"), **kwargs)
+
+    def interpret(self):
+        self.namespace = {"__name__": "__pl0__"}
+        if isinstance(self.output, OutputSink):
+            # the program only ever prints a single value
+            self.namespace["print"] = self.output.write
+            try:
+                exec(self.code, self.namespace)
+            finally:
+                self.output.flush()
+            return
+
+        if self.output is not None:
+            self.namespace["print"] = partial(print, file=self.output)
+        exec(self.code, self.namespace)
@@ -0,0 +1,294 @@
+from collections import ChainMap
+
+from pl0.constants import REG_OP_CODE
+from pl0.generators.visitor import Visitor
+from pl0.nodes import from_dicts
+
+ARITHMETIC = {
+    "PLUS": REG_OP_CODE.ADD,
+    "MINUS": REG_OP_CODE.SUB,
+    "TIMES": REG_OP_CODE.MUL,
+    "SLASH": REG_OP_CODE.DIV,
+}
+
+BRANCHES = {
+    "EQL": REG_OP_CODE.JEQ,
+    "NEQ": REG_OP_CODE.JNE,
+    "LESS": REG_OP_CODE.JLT,
+    "LEQ": REG_OP_CODE.JLE,
+    "GTR": REG_OP_CODE.JGT,
+    "GEQ": REG_OP_CODE.JGE,
+}
+
+# the branch taken when a condition does not hold
+NEGATED = {
+    REG_OP_CODE.JEQ: REG_OP_CODE.JNE,
+    REG_OP_CODE.JNE: REG_OP_CODE.JEQ,
+    REG_OP_CODE.JLT: REG_OP_CODE.JGE,
+    REG_OP_CODE.JGE: REG_OP_CODE.JLT,
+    REG_OP_CODE.JGT: REG_OP_CODE.JLE,
+    REG_OP_CODE.JLE: REG_OP_CODE.JGT,
+    REG_OP_CODE.JODD: REG_OP_CODE.JEVEN,
+    REG_OP_CODE.JEVEN: REG_OP_CODE.JODD,
+}
+
+
+class Registers:
+    """
+    Allocates the registers of a procedure's frame. Register 0 holds the
+    static link and is followed by the parameters, the variables, and
+    then the constants and temporaries in the order they are needed.
+    """
+
+    def __init__(self, parameters=0):
+        self.parameters = parameters
+        self.size = parameters + 1
+        self.constants = {}
+        self.temporaries = []
+        self.free = []
+
+    def allocate(self):
+        self.size += 1
+        return self.size - 1
+
+    def constant(self, value):
+        if value not in self.constants:
+            self.constants[value] = self.allocate()
+        return self.constants[value]
+
+    def temporary(self):
+        if self.free:
+            return self.free.pop()
+        register = self.allocate()
+        self.temporaries.append(register)
+        return register
+
+    def release(self):
+        """
+        Make all of the temporaries available again. No temporary lives
+        longer than the statement it was allocated for.
+        """
+        self.free = self.temporaries[::-1]
+
+    def template(self):
+        """
+        The initial values of the registers following the parameters,
+        ENT extends the frame of a call with these.
+        """
+        template = [0] * (self.size - self.parameters - 1)
+        for value, register in self.constants.items():
+            template[register - self.parameters - 1] = value
+        return tuple(template)
+
+
+class RegisterGenerator(Visitor):
+    """
+    Generate three-address code for the register machine in pl0.regvm.
+
+    Local variables, parameters and constants all live in registers of
+    the current frame, so they are used as operands directly rather than
+    being loaded first. Only variables of enclosing procedures need a
+    GET/SET. An expression assigned to a local variable is computed
+    straight into that variable's register, conditions compile to a
+    single compare-and-branch and loops test their condition at the
+    bottom, so an iteration only takes one branch.
+    """
+
+    def __init__(self):
+        self.scope = ChainMap()
+        self.registers = Registers()
+        self.code = []
+
+    def visit_const(self, node):
+        self.scope[node.name] = {"type": node.type, "value": node.value}
+
+    def visit_var(self, node):
+        self.scope[node.name] = {
+            "type": node.type,
+            "level": len(self.scope.maps) - 1,
+            "register": self.registers.allocate(),
+        }
+
+    def visit_procedure(self, node):
+        proc_declaration = {"type": node.type, "level": len(self.scope.maps) - 1}
+        self.scope[node.name] = proc_declaration
+
+        registers = self.registers
+        self.registers = Registers(len(node.parameters))
+        self.push_scope()
+        jmp_idx = self.generate(REG_OP_CODE.JMP, 0, 0, 0)
+
+        # the arguments are copied into the registers following the static link
+        for i, parameter in enumerate(node.parameters, start=1):
+            self.scope[parameter.name] = {
+                "type": parameter.type,
+                "level": len(self.scope.maps) - 1,
+                "register": i,
+            }
+
+        self.generate_body(node.blocks, jmp_idx, proc_declaration)
+        self.pop_scope()
+        self.registers = registers
+
+    def visit_assignment(self, node):
+        level = len(self.scope.maps) - 1
+        var = self.scope[node.name]
+        value = node.value
+        while value.type == "Grouping":
+            value = value.expression
+
+        if level == var["level"] and value.type in ("Binary", "Unary"):
+            self.operation(value, var["register"])
+            return
+
+        register = self.visit(value)
+        if level != var["level"]:
+            self.generate(
+                REG_OP_CODE.SET, level - var["level"], var["register"], register
+            )
+        elif register != var["register"]:
+            self.generate(REG_OP_CODE.MOV, var["register"], register, 0)
+
+    def visit_call(self, node):
+        arguments = tuple(self.visit(argument) for argument in node.arguments)
+        level = len(self.scope.maps) - 1
+        procedure = self.scope[node.name]
+        self.generate(
+            REG_OP_CODE.CAL,
+            level - procedure["level"],
+            procedure["address"],
+            arguments,
+        )
+
+    def visit_block(self, node):
+        for statement in node.statements:
+            self.visit(statement)
+            self.registers.release()
+
+    def visit_if(self, node):
+        jump = self.branch(node.condition, negate=True)
+        self.visit(node.body)
+        self.patch(jump, len(self.code))
+
+    def visit_loop(self, node):
+        jmp_idx = self.generate(REG_OP_CODE.JMP, 0, 0, 0)
+        body = len(self.code)
+        self.visit(node.body)
+        self.patch(jmp_idx, len(self.code))
+        self.patch(self.branch(node.condition), body)
+
+    def visit_output(self, node):
+        self.generate(REG_OP_CODE.WRT, self.visit(node.value), 0, 0)
+
+    def visit_debug(self, node):
+        self.generate(REG_OP_CODE.DBG, 0, 0, 0)
+
+    def visit_binary(self, node):
+        return self.operation(node, self.registers.temporary())
+
+    def visit_unary(self, node):
+        return self.operation(node, self.registers.temporary())
+
+    def visit_identifier(self, node):
+        level = len(self.scope.maps) - 1
+        referenced = self.scope[node.name]
+        if referenced["type"] == "Const":
+            return self.registers.constant(referenced["value"])
+        if level == referenced["level"]:
+            return referenced["register"]
+
+        register = self.registers.temporary()
+        self.generate(
+            REG_OP_CODE.GET, register, level - referenced["level"], referenced["register"]
+        )
+        return register
+
+    def visit_number(self, node):
+        return self.registers.constant(node.value)
+
+    def visit_grouping(self, node):
+        return self.visit(node.expression)
+
+    def operation(self, node, target):
+        """
+        Generate the arithmetic of a Binary or Unary node, leaving the
+        result in the `target` register.
+        """
+        if node.type == "Unary":
+            self.generate(REG_OP_CODE.NEG, target, self.visit(node.right), 0)
+        else:
+            left = self.visit(node.left)
+            right = self.visit(node.right)
+            operation = ARITHMETIC[str(node.operator)]
+            self.generate(operation, target, left, right)
+        return target
+
+    def branch(self, condition, negate=False):
+        """
+        Generate a branch which is taken when `condition` holds (or does
+        not hold when `negate` is set). Returns the index of the branch
+        so its target can be patched.
+        """
+        if condition.type == "Odd":
+            op_code = REG_OP_CODE.JODD
+            operands = (self.visit(condition.expression), 0)
+        elif condition.type == "Binary" and str(condition.operator) in BRANCHES:
+            op_code = BRANCHES[str(condition.operator)]
+            operands = (self.visit(condition.left), self.visit(condition.right))
+        else:
+            # a condition folded into a plain value
+            op_code = REG_OP_CODE.JNE
+            operands = (self.visit(condition), self.registers.constant(0))
+
+        if negate:
+            op_code = NEGATED[op_code]
+        return self.generate(op_code, *operands, 0)
+
+    def generate_body(self, blocks, jmp_idx, proc_declaration=None):
+        """
+        Generate the declarations and statement of a program or
+        procedure. The statement is entered through an ENT instruction
+        whose register template is filled in once every register the
+        body uses is known.
+        """
+        enter = None
+        for block in blocks + [None]:
+            if enter is None and (block is None or self.should_enter(block)):
+                address = len(self.code)
+                self.patch(jmp_idx, address)
+                enter = self.generate(REG_OP_CODE.ENT, (), 0, 0)
+                if proc_declaration is not None:
+                    proc_declaration["address"] = address
+            if block is not None:
+                self.visit(block)
+                self.registers.release()
+
+        self.generate(REG_OP_CODE.RET, 0, 0, 0)
+        self.code[enter][1] = self.registers.template()
+
+    def generate(self, instruction, a, b, c):
+        self.code.append([instruction, a, b, c])
+        return len(self.code) - 1
+
+    def patch(self, index, target):
+        """
+        Set the target of an already generated jump or branch, which is
+        always its last operand.
+        """
+        self.code[index][3] = target
+
+    def should_enter(self, node):
+        return node.type not in ["Const", "Var", "Procedure"]
+
+    def push_scope(self):
+        self.scope = self.scope.new_child()
+
+    def pop_scope(self):
+        self.scope = self.scope.parents
+
+    @classmethod
+    def generate_code(cls, ast):
+        visitor = cls()
+        jmp_idx = visitor.generate(REG_OP_CODE.JMP, 0, 0, 0)
+        visitor.generate_body(from_dicts(ast), jmp_idx)
+        return visitor.code
@@ -1,6 +1,35 @@
 from abc import ABC
+from types import GeneratorType
+
+from pl0.nodes import NODE_TYPES, from_dicts
+
 
 class Visitor(ABC):
+    """
+    Walks the AST, calling the `visit_<type>` method of every node it is
+    asked to visit. The methods are looked up once per class, in
+    `__init_subclass__`, into the `dispatch` table indexed by the
+    `kind` of a node.
+
+    A `visit_*` method can also be a generator, which visits a child by
+    yielding it and is sent the child's result back (`value = yield
+    node.value`), then returns its own result. Generator methods are run
+    from a stack by `trampoline` rather than by recursing, so walking a
+    deep tree, like a long chain of additions, doesn't hit the
+    recursion limit.
+
+    An AST of plain dicts, as the parser used to build, is converted to
+    nodes (see `pl0.nodes.from_dicts`) when its root is visited.
+    """
+
+    dispatch = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.dispatch = tuple(
+            getattr(cls, f"visit_{node_type.type.lower()}") for node_type in NODE_TYPES
+        )
+
     def visit_const(self, node):
         raise NotImplemented
         raise NotImplementedError("visit_const must be implemented")
@@ -51,8 +80,37 @@ class Visitor(ABC):
         raise NotImplementedError("visit_grouping must be implemented")
 
     def visit(self, node):
-        node_type = node['type'].lower()
-        getattr(self, f"visit_{node_type}")(node)
+        try:
+            kind = node.kind
+        except AttributeError:
+            node = from_dicts(node)
+            kind = node.kind
+        result = self.dispatch[kind](self, node)
+        if type(result) is GeneratorType:
+            return self.trampoline(result)
+        return result
+
+    def trampoline(self, generator):
+        """
+        Run the generator of a `visit_*` method to completion, visiting
+        the nodes it yields, and those their methods yield, iteratively.
+        Returns the result of the method.
+        """
+        dispatch = self.dispatch
+        stack = [generator]
+        result = None
+        while stack:
+            try:
+                node = stack[-1].send(result)
+            except StopIteration as stop:
+                stack.pop()
+                result = stop.value
+                continue
+            result = dispatch[node.kind](self, node)
+            if type(result) is GeneratorType:
+                stack.append(result)
+                result = None
+        return result
 
     @classmethod
     def generate_code(cls, ast):
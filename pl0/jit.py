@@ -0,0 +1,327 @@
+"""
+The Tracing JIT
+===============
+
+`TracingVM` is a `VM` which compiles the hot loops of a program to
+Python functions while it runs.
+
+Every backward JMP closes a loop, the instruction it jumps to being the
+head of the loop. Once the JMP of a loop has been taken `threshold`
+times, the next iteration is recorded: it is executed one instruction
+at a time, as usual, while the instructions and the direction of every
+conditional jump are written down. The recorded trace is then compiled
+into a function (see `TraceCompiler`), which runs the loop until the
+path it takes differs from the trace, at which point the interpreter
+takes over again from the instruction the trace left off at.
+
+In the compiled function the variables of the loop and the slots of the
+stack it uses are Python locals, read from the data store when the
+function starts and written back when it returns, so the data store
+ends up exactly as the interpreter would have left it. Every JPC is a
+guard, checking the condition goes the way it did while recording.
+
+Only loops of straight line code are traced. A loop which calls a
+procedure, writes a value (which is left on the stack, so the stack
+grows every iteration) or contains another loop is never compiled, and
+keeps being interpreted, but a loop nested in it can be compiled on its
+own.
+"""
+from pl0.constants import OP_CODE, OPERATION
+from pl0.vm import VM
+
+# the number of times the JMP closing a loop is taken before it's traced
+THRESHOLD = 50
+
+# the most instructions a trace is recorded for
+MAX_TRACE = 1000
+
+OPERATORS = {
+    OPERATION.ADD: "+",
+    OPERATION.SUB: "-",
+    OPERATION.MULT: "*",
+    OPERATION.DIV: "//",
+    OPERATION.EQUAL: "==",
+    OPERATION.NOT_EQUAL: "!=",
+    OPERATION.LESS: "<",
+    OPERATION.LESS_EQUAL: "<=",
+    OPERATION.GREATER: ">",
+    OPERATION.GREATER_EQUAL: ">=",
+}
+
+# the operations a trace can contain
+TRACEABLE = (*OPERATORS, OPERATION.NEGATE, OPERATION.ODD)
+
+
+class Trace:
+    """
+    A compiled loop. `levels` are the static levels of the stack frames
+    the loop uses variables of, the bases of which are passed to the
+    function after the data store and the `topstack` register. The
+    function returns the new `program` and `topstack` registers.
+    """
+
+    def __init__(self, head, steps, source, function, levels):
+        self.head = head
+        self.steps = steps
+        self.source = source
+        self.function = function
+        self.levels = levels
+
+    def run(self, vm):
+        bases = [vm.find_base(level) for level in self.levels]
+        vm.program, vm.topstack = self.function(vm.datastore, vm.topstack, *bases)
+
+
+class TraceCompiler:
+    """
+    Compiles a trace, a list of `(index, op_code, level, value, taken)`
+    steps, `taken` telling whether a JPC jumped, into the source of a
+    Python function running the loop.
+
+    The stack is kept in the locals `s0`, `s1`, ..., one per slot above
+    the `topstack` the loop started at, and the variables in locals
+    named after their level and offset. An operation like `LOD 0 4;
+    LIT 1; OPR ADD` becomes `s0 = v0_4`, `s1 = 1`, `s0 = s0 + s1`,
+    leaving `s1` behind just like the interpreter leaves the value above
+    the top of the stack.
+    """
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.height = 0
+        self.slots = 0
+        # (level, offset) -> local name
+        self.variables = {}
+        self.body = []
+
+    def variable(self, level, offset):
+        if (level, offset) not in self.variables:
+            self.variables[level, offset] = f"v{level}_{offset}".replace("-", "m")
+        return self.variables[level, offset]
+
+    def push(self, value):
+        self.emit(f"s{self.height} = {value}")
+        self.height += 1
+        self.slots = max(self.slots, self.height)
+
+    def pop(self):
+        self.height -= 1
+        if self.height < 0:
+            raise ValueError("the trace pops below the stack it started with")
+        return f"s{self.height}"
+
+    def emit(self, line):
+        self.body.append(f"            {line}")
+
+    def compile(self):
+        """
+        The source of the function and the levels of the frames it
+        uses, or None when the trace can't be compiled.
+        """
+        try:
+            for step in self.steps:
+                self.step(*step)
+        except ValueError:
+            return None
+        if self.height != 0:
+            # every iteration has to leave the stack where it found it
+            return None
+
+        levels = sorted({level for level, _ in self.variables})
+        variables = [
+            (name, f"datastore[b{level} {'-' if offset < 0 else '+'} {abs(offset)}]")
+            for (level, offset), name in self.variables.items()
+        ]
+        variables += [
+            (f"s{slot}", f"datastore[top + {slot + 1}]") for slot in range(self.slots)
+        ]
+
+        arguments = ", ".join(["datastore", "top", *(f"b{level}" for level in levels)])
+        lines = [f"def trace({arguments}):"]
+        lines += [f"    {name} = {address}" for name, address in variables]
+        lines += ["    try:", "        while True:", *self.body, "    finally:"]
+        lines += [f"        {address} = {name}" for name, address in variables]
+        if not variables:
+            lines.append("        pass")
+        return "\n".join(lines) + "\n", levels
+
+    def step(self, index, op_code, level, value, taken):
+        if op_code == OP_CODE.LIT:
+            self.push(repr(value))
+        elif op_code == OP_CODE.LOD:
+            self.push(self.variable(level, value))
+        elif op_code == OP_CODE.STO:
+            self.emit(f"{self.variable(level, value)} = {self.pop()}")
+        elif op_code == OP_CODE.OPR and value in OPERATORS:
+            rhs = self.pop()
+            lhs = self.pop()
+            self.push(f"{lhs} {OPERATORS[value]} {rhs}")
+        elif op_code == OP_CODE.OPR and value == OPERATION.NEGATE:
+            operand = self.pop()
+            self.push(f"-{operand}")
+        elif op_code == OP_CODE.OPR and value == OPERATION.ODD:
+            operand = self.pop()
+            self.push(f"{operand} % 2")
+        elif op_code == OP_CODE.JPC:
+            condition = self.pop()
+            # the guard leaves the loop where the interpreter would go on
+            if taken:
+                self.emit(f"if {condition}:")
+                self.emit(f"    return {index + 1}, top + {self.height}")
+            else:
+                self.emit(f"if not {condition}:")
+                self.emit(f"    return {value}, top + {self.height}")
+        elif op_code != OP_CODE.JMP:
+            raise ValueError(f"can't compile {op_code} {level}, {value}")
+
+
+class TracingVM(VM):
+    """
+    A `VM` compiling its hot loops, see `pl0.jit`. The compiled loops
+    are kept as `traces`, by the index of their head. Profiling or
+    debugging a program runs it on the plain `VM` loop.
+
+    Like `ThreadedVM`, the code is decoded once up front into
+    `instructions`, so fetching from a `CodeObject` doesn't decode every
+    instruction it executes.
+    """
+
+    def __init__(self, code, threshold=THRESHOLD, **kwargs):
+        super().__init__(code, **kwargs)
+        self.instructions = [tuple(instruction) for instruction in code]
+        self.threshold = threshold
+        # loop head -> `Trace`, or None for a loop which isn't compiled
+        self.traces = {}
+        # loop head -> the number of times its JMP was taken
+        self.counters = {}
+
+    def run(self):
+        if self.debug or self.profiler is not None:
+            return super().run()
+
+        instructions = self.instructions
+        while True:
+            op_code, level, value = instructions[self.program]
+            self.program += 1
+
+            if self.debug:
+                self.print_debug()
+
+            if op_code == OP_CODE.LIT:
+                self.push(value)
+            elif op_code == OP_CODE.OPR:
+                self.perform_operation(value)
+            elif op_code == OP_CODE.LOD:
+                self.push(self.datastore[self.find_base(level) + value])
+            elif op_code == OP_CODE.STO:
+                self.datastore[self.find_base(level) + value] = self.pop()
+            elif op_code == OP_CODE.CAL:
+                self.datastore[self.topstack + 1] = self.find_base(level)
+                self.datastore[self.topstack + 2] = self.base
+                self.datastore[self.topstack + 3] = self.program
+                if self.topstack > self.peak:
+                    self.peak = self.topstack
+                self.base = self.topstack + 1
+                self.program = value
+            elif op_code == OP_CODE.INT:
+                self.topstack += value
+            elif op_code == OP_CODE.DET:
+                self.topstack -= value
+            elif op_code == OP_CODE.JMP:
+                if value < self.program:
+                    self.loop(value, self.program - 1)
+                else:
+                    self.program = value
+            elif op_code == OP_CODE.JPC:
+                if self.datastore[self.topstack] == 0:
+                    self.program = value
+                self.topstack -= 1
+
+            if self.program == 0:
+                break
+
+    def loop(self, head, end):
+        """
+        Take the JMP at `end` back to the `head` of a loop, running the
+        loop's trace if it has one, or tracing it once it is hot.
+        """
+        self.program = head
+        if head in self.traces:
+            trace = self.traces[head]
+            if trace is not None:
+                trace.run(self)
+            return
+
+        count = self.counters.get(head, 0) + 1
+        self.counters[head] = count
+        if count < self.threshold:
+            return
+
+        steps = self.record(head, end)
+        if steps is None:
+            # the iteration left the loop, try again the next time it's hot
+            self.counters[head] = 0
+        elif not steps:
+            self.traces[head] = None
+        else:
+            self.traces[head] = self.compile_trace(head, steps)
+            if self.traces[head] is not None:
+                self.traces[head].run(self)
+
+    def record(self, head, end):
+        """
+        Run an iteration of the loop from its `head` to the JMP at `end`,
+        recording the instructions. Returns the trace, an empty list if
+        the loop can't be traced or None if the iteration didn't make it
+        back to the head. Recording stops before any instruction which
+        can't be traced, so the interpreter can carry on from there.
+        """
+        steps = []
+        while len(steps) < MAX_TRACE:
+            index = self.program
+            op_code, level, value = self.instructions[index]
+            if op_code not in (
+                OP_CODE.LIT,
+                OP_CODE.LOD,
+                OP_CODE.STO,
+                OP_CODE.JPC,
+                OP_CODE.JMP,
+            ) and not (op_code == OP_CODE.OPR and value in TRACEABLE):
+                return []
+            if op_code == OP_CODE.JMP and value < index and index != end:
+                # an inner loop
+                return []
+            self.program += 1
+
+            taken = False
+            if op_code == OP_CODE.LIT:
+                self.push(value)
+            elif op_code == OP_CODE.OPR:
+                self.perform_operation(value)
+            elif op_code == OP_CODE.LOD:
+                self.push(self.datastore[self.find_base(level) + value])
+            elif op_code == OP_CODE.STO:
+                self.datastore[self.find_base(level) + value] = self.pop()
+            elif op_code == OP_CODE.JMP:
+                self.program = value
+            elif op_code == OP_CODE.JPC:
+                taken = self.datastore[self.topstack] == 0
+                if taken:
+                    self.program = value
+                self.topstack -= 1
+
+            steps.append((index, op_code, level, value, taken))
+            if index == end:
+                return steps
+            if not head <= self.program <= end:
+                return None
+        return []
+
+    def compile_trace(self, head, steps):
+        compiled = TraceCompiler(steps).compile()
+        if compiled is None:
+            return None
+        source, levels = compiled
+        namespace = {}
+        exec(compile(source, f"<trace {head}>", "exec"), namespace)
+        return Trace(head, steps, source, namespace["trace"], levels)
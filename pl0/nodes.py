@@ -0,0 +1,194 @@
+"""
+The nodes of the AST.
+
+Every kind of node is a class with a slot per field, which takes a lot
+less memory than a dict and whose fields are quicker to get at. Nodes
+are read as attributes (`node.name`), but also behave like the dicts
+the parser used to build, `node["name"]`, `"line" in node`,
+`dict(node)` and comparing equal to a dict with the same items all
+work. `line` is None unless the parser records positions.
+"""
+from collections.abc import Mapping
+
+
+class Node(Mapping):
+    __slots__ = ("line",)
+    type = None
+    # a small integer identifying the type, the index into `NODE_TYPES`
+    kind = None
+    fields = ()
+
+    def __init__(self, line=None, **fields):
+        self.line = line
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def keys(self):
+        keys = ["type", *self.fields]
+        if self.line is not None:
+            keys.append("line")
+        return keys
+
+    def __contains__(self, key):
+        if key == "line":
+            return self.line is not None
+        return key == "type" or key in self.fields
+
+    def __getitem__(self, key):
+        if key in self:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self.fields and key != "line":
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class Const(Node):
+    __slots__ = fields = ("name", "value")
+    type = "Const"
+    kind = 0
+
+
+class Var(Node):
+    __slots__ = fields = ("name",)
+    type = "Var"
+    kind = 1
+
+
+class Procedure(Node):
+    __slots__ = fields = ("name", "parameters", "blocks")
+    type = "Procedure"
+    kind = 2
+
+
+class Assignment(Node):
+    __slots__ = fields = ("name", "value")
+    type = "Assignment"
+    kind = 3
+
+
+class Call(Node):
+    __slots__ = fields = ("name", "arguments")
+    type = "Call"
+    kind = 4
+
+
+class Block(Node):
+    __slots__ = fields = ("statements",)
+    type = "Block"
+    kind = 5
+
+
+class If(Node):
+    __slots__ = fields = ("condition", "body")
+    type = "If"
+    kind = 6
+
+
+class Loop(Node):
+    __slots__ = fields = ("condition", "body")
+    type = "Loop"
+    kind = 7
+
+
+class Output(Node):
+    __slots__ = fields = ("value",)
+    type = "Output"
+    kind = 8
+
+
+class Debug(Node):
+    __slots__ = fields = ()
+    type = "Debug"
+    kind = 9
+
+
+class Odd(Node):
+    __slots__ = fields = ("expression",)
+    type = "Odd"
+    kind = 10
+
+
+class Binary(Node):
+    __slots__ = fields = ("left", "right", "operator")
+    type = "Binary"
+    kind = 11
+
+
+class Unary(Node):
+    __slots__ = fields = ("operator", "right")
+    type = "Unary"
+    kind = 12
+
+
+class Identifier(Node):
+    __slots__ = fields = ("name",)
+    type = "Identifier"
+    kind = 13
+
+
+class Number(Node):
+    __slots__ = fields = ("value",)
+    type = "Number"
+    kind = 14
+
+
+class Grouping(Node):
+    __slots__ = fields = ("expression",)
+    type = "Grouping"
+    kind = 15
+
+
+NODE_TYPES = (
+    Const,
+    Var,
+    Procedure,
+    Assignment,
+    Call,
+    Block,
+    If,
+    Loop,
+    Output,
+    Debug,
+    Odd,
+    Binary,
+    Unary,
+    Identifier,
+    Number,
+    Grouping,
+)
+
+NODES = {cls.type: cls for cls in NODE_TYPES}
+
+
+def node(type, **fields):
+    """
+    Create a node of the named type.
+    """
+    return NODES[type](**fields)
+
+
+def from_dicts(tree):
+    """
+    Convert an AST of dicts, or a list of them, into nodes. Nodes are
+    returned as they are, so converting an AST of nodes is cheap.
+    """
+    if isinstance(tree, Node):
+        return tree
+    if isinstance(tree, list):
+        return [from_dicts(item) for item in tree]
+    if isinstance(tree, Mapping) and "type" in tree:
+        fields = {key: from_dicts(value) for key, value in tree.items()}
+        return node(**fields)
+    return tree
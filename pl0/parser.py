@@ -24,9 +24,13 @@ factor = ident | number | "(" expression ")";
 ident = ascii_letter {ascii_letter | ascii_digit};
 number = ascii_digit {ascii_digit};
 """
+import mmap
+import re
 import string
 import sys
 
+from pl0.nodes import NODES
+
 ERROR_CODES = {
     1: "Use = instead of :=",
     2: "= must be followed by a number",
@@ -120,6 +124,30 @@ class Token:
         return self.symbol == other
 
 
+class SourceToken(Token):
+    """
+    A token which refers to its text in the source by offset instead of
+    holding a copy of it. The value of an identifier is only decoded,
+    and interned, when it is asked for.
+    """
+
+    def __init__(self, symbol, source, start, end, line=0, column=0):
+        self.symbol = symbol
+        self.source = source
+        self.start = start
+        self.end = end
+        self.line = line
+        self.column = column
+
+    @property
+    def value(self):
+        if self.symbol == Symbol.IDENT:
+            return sys.intern(str(self.source[self.start : self.end], "ascii"))
+        if self.symbol == Symbol.NUMBER:
+            return int(bytes(self.source[self.start : self.end]))
+        return None
+
+
 class Lexer:
     KEYWORDS = {
         "BEGIN": Symbol.BEGIN,
@@ -137,8 +165,31 @@ class Lexer:
         "DEBUG": Symbol.DEBUG,
     }
 
-    def __init__(self, input):
-        self.input = input
+    CHUNK_SIZE = 64 * 1024
+    # the most characters before the cursor held for error messages
+    CONTEXT_SIZE = 1024
+
+    def __init__(self, input, chunk_size=CHUNK_SIZE):
+        """
+        `input` is the source as a string, a text stream (anything with a
+        `read` method, like an open file) or an iterable of chunks of
+        text. Streams and chunks are read as the lexer gets to them, only
+        the current chunk and the lines of the source the lexer is on,
+        up to `CONTEXT_SIZE` characters of them, are held in memory.
+        """
+        if isinstance(input, str):
+            self.input = input
+            self.chunks = iter(())
+        else:
+            self.input = ""
+            if hasattr(input, "read"):
+                self.chunks = iter(lambda: input.read(chunk_size), "")
+            else:
+                self.chunks = iter(input)
+
+        # the line and column numbers of the first character held in `input`
+        self.first_line = 1
+        self.first_column = 1
         self.cursor = -1
         self.line = 1
         self.column = 0
@@ -149,14 +200,76 @@ class Lexer:
         try:
             return self.input[self.cursor]
         except IndexError:
+            if self.read():
+                return self.input[self.cursor]
             return "\0"
 
     def peek_next(self):
         try:
             return self.input[self.cursor + 1]
         except IndexError:
+            if self.read():
+                return self.input[self.cursor + 1]
             return "\0"
 
+    def read(self):
+        """
+        Replace the consumed part of the input with the next chunk,
+        keeping the previous and current line for error messages, but no
+        more than `CONTEXT_SIZE` characters of them. Returns False at the
+        end of the input.
+        """
+        for chunk in self.chunks:
+            if chunk:
+                break
+        else:
+            return False
+
+        keep = 0
+        current = self.input.rfind("\n", 0, self.cursor)
+        if current > 0:
+            keep = self.input.rfind("\n", 0, current) + 1
+        # only the end of a long line is kept
+        keep = max(keep, self.cursor - self.CONTEXT_SIZE)
+
+        newline = self.input.rfind("\n", 0, keep)
+        if newline >= 0:
+            self.first_column = keep - newline
+        else:
+            self.first_column += keep
+        self.first_line += self.input.count("\n", 0, keep)
+        self.input = self.input[keep:] + chunk
+        self.cursor -= keep
+        return True
+
+    def tokens(self):
+        """
+        Yield the tokens of the input, reading it as needed.
+        """
+        while True:
+            token = self.get_token()
+            if token == Symbol.NULL and self.cursor >= len(self.input):
+                return
+            yield token
+
+    def lines(self):
+        """
+        The lines of the input the lexer holds, starting with the line
+        before the current one, and the line after it. Returns the
+        number of the first line and the lines. The first line starts at
+        `first_column` when the start of a long line was dropped, and
+        no more than `CONTEXT_SIZE` characters after the cursor are read.
+        """
+        while (
+            self.input.count("\n", max(self.cursor, 0)) < 2
+            and len(self.input) - self.cursor < self.CONTEXT_SIZE
+        ):
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.input += chunk
+        return self.first_line, self.input.split("\n")
+
     def get_token(self):
         char = self.get_char()
         while char in " \t\n":
@@ -225,21 +338,230 @@ class Lexer:
             return Token(Symbol.NULL, line=self.line, column=self.column)
 
 
-class Parser:
+class Scanner(Lexer):
+    """
+    A `Lexer` which scans with one compiled regular expression instead
+    of character by character, producing the same tokens with the same
+    line and column numbers.
+
+    Every match is the whitespace before a token and the token, and
+    every kind of token has its own group named after its symbol, so
+    most tokens are recognised by the name of the group that matched.
+    """
+
+    TOKENS = (
+        r"(?P<IDENT>[A-Za-z][A-Za-z0-9]*)"
+        r"|(?P<NUMBER>[0-9]+)"
+        r"|(?P<BECOMES>:=)|(?P<LEQ><=)|(?P<GEQ>>=)|(?P<NEQ>!=)"
+        r"|(?P<PLUS>\+)|(?P<MINUS>-)|(?P<TIMES>\*)|(?P<SLASH>/)"
+        r"|(?P<LPAREN>\()|(?P<RPAREN>\))|(?P<EQL>=)|(?P<COMMA>,)"
+        r"|(?P<PERIOD>\.)|(?P<SEMICOLON>;)|(?P<LESS><)|(?P<GTR>>)"
+        # like the Lexer, ":" and "!" swallow the character following them
+        r"|(?P<NULL>[:!].?|[^ \t\n])"
+    )
+    PATTERN = re.compile(r"[ \t\n]*(?:" + TOKENS + ")", re.DOTALL)
+
+    def __init__(self, input, chunk_size=Lexer.CHUNK_SIZE):
+        super().__init__(input, chunk_size=chunk_size)
+        self.scanned = None
+
+    def get_token(self):
+        if self.scanned is None:
+            self.scanned = self.tokens()
+        token = next(self.scanned, None)
+        if token is None:
+            return Token(Symbol.NULL, line=self.line, column=self.column)
+        return token
+
+    def tokens(self):
+        match = self.PATTERN.match
+        keywords = self.KEYWORDS
+        input = self.input
+        size = len(input)
+        line = self.line
+        # index of the first character of the current line
+        line_start = self.cursor + 1 - self.column
+        position = self.cursor + 1
+
+        while True:
+            m = match(input, position)
+            if m is None or m.end() == size:
+                # the whitespace or token may continue in the next chunk
+                self.cursor = position
+                if self.read():
+                    line_start -= position - self.cursor
+                    position = self.cursor
+                    input = self.input
+                    size = len(input)
+                    continue
+                if m is None:
+                    break
+
+            kind = m.lastgroup
+            start, end = m.span(kind)
+            newline = input.rfind("\n", position, start)
+            if newline >= 0:
+                line += input.count("\n", position, newline + 1)
+                line_start = newline + 1
+            position = end
+
+            # a token's column is that of its last character
+            column = end - line_start
+            self.cursor = end - 1
+            self.line = line
+            self.column = column
+            if kind == "IDENT":
+                word = input[start:end]
+                keyword = keywords.get(word.upper())
+                if keyword is not None:
+                    yield Token(keyword, line=line, column=column)
+                else:
+                    yield Token(Symbol.IDENT, word, line=line, column=column)
+            elif kind == "NUMBER":
+                yield Token(Symbol.NUMBER, int(input[start:end]), line=line, column=column)
+            elif kind != "NULL":
+                yield Token(kind, line=line, column=column)
+            elif end == size and input[start] in ":!" and end - start == 1:
+                # nothing left for them to swallow, the Lexer reads past the end
+                break
+            else:
+                yield Token(Symbol.NULL, line=line, column=column)
+
+        # where the Lexer ends up after reading past the end
+        newline = input.rfind("\n", position)
+        if newline >= 0:
+            line += input.count("\n", position)
+            line_start = newline + 1
+        self.cursor = size
+        self.line = line
+        self.column = size - line_start + 1
+
+
+class BytesScanner(Scanner):
+    """
+    A `Scanner` working directly on the bytes of the source, like a
+    memory mapped file (see `Parser.parse_file`), a `memoryview` or
+    `bytes`, without ever decoding it as a whole. Tokens are
+    `SourceToken`s, so no text is copied until the value of a token is
+    needed, and only the lines around an error are decoded for its
+    message. Columns count bytes.
+    """
+
+    PATTERN = re.compile(
+        b"[ \t]*(?P<newline>\n[ \t\n]*)?(?:" + Scanner.TOKENS.encode() + b")",
+        re.DOTALL,
+    )
+    KEYWORDS = {word.encode(): symbol for word, symbol in Lexer.KEYWORDS.items()}
+    # identifiers longer than this can't be keywords and are never copied
+    KEYWORD_LENGTH = max(len(word) for word in Lexer.KEYWORDS)
+    NEWLINE = re.compile(b"\n")
+
     def __init__(self, input):
-        self.lexer = Lexer(input.strip())
-        self.token = self.lexer.get_token()
+        # there are no chunks to read, all of the source is in `input`
+        super().__init__(())
+        self.input = input
+        # the offsets of the current line and the line before it
+        self.line_start = 0
+        self.previous_line_start = 0
+
+    def tokens(self):
+        match = self.PATTERN.match
+        newlines = self.NEWLINE.finditer
+        keywords = self.KEYWORDS
+        keyword_length = self.KEYWORD_LENGTH
+        input = self.input
+        size = len(input)
+        line = self.line
+        line_start = self.line_start
+        position = self.cursor + 1
+
+        while True:
+            m = match(input, position)
+            if m is None:
+                break
+
+            kind = m.lastgroup
+            start, end = m.span(kind)
+            if m.start(1) >= 0:
+                for newline in newlines(input, m.start(1), start):
+                    line += 1
+                    self.previous_line_start = line_start
+                    line_start = newline.end()
+                self.line_start = line_start
+            position = end
+
+            # a token's column is that of its last character
+            column = end - line_start
+            self.cursor = end - 1
+            self.line = line
+            self.column = column
+            if kind == "IDENT" and end - start <= keyword_length:
+                kind = keywords.get(bytes(input[start:end]).upper(), kind)
+            elif kind == "NULL" and end == size and end - start == 1:
+                if input[start] in b":!":
+                    # nothing left for them to swallow, the Lexer reads past the end
+                    break
+            yield SourceToken(kind, input, start, end, line=line, column=column)
+
+        # where the Lexer ends up after reading past the end
+        for newline in newlines(input, position):
+            line += 1
+            self.previous_line_start = line_start
+            line_start = newline.end()
+        self.line_start = line_start
+        self.cursor = size
+        self.line = line
+        self.column = size - line_start + 1
+
+    def lines(self):
+        first_line = self.line - 1 if self.line > 1 else 1
+        start = self.previous_line_start if self.line > 1 else 0
+        end = len(self.input)
+        for count, newline in enumerate(self.NEWLINE.finditer(self.input, self.cursor)):
+            if count == 1:
+                end = newline.end()
+                break
+        text = str(self.input[start:end], "utf8", "replace")
+        return first_line, text.split("\n")
+
+
+class Parser:
+    def __init__(self, input, positions=False):
+        """
+        `input` is anything `Lexer` accepts. With `positions`, the
+        declaration and statement nodes record the line of the source
+        they start on.
+        """
+        self.lexer = input if isinstance(input, Lexer) else Scanner(input)
+        self.tokens = self.lexer.tokens()
+        self.get_token()
         self.declarations = {}
         self.code = []
+        self.positions = positions
 
     @classmethod
-    def parse(cls, input):
+    def parse(cls, input, positions=False):
         try:
-            return cls(input).program()
+            return cls(input, positions=positions).program()
         except ParserException as e:
             sys.stderr.write(str(e))
             sys.stderr.flush()
 
+    @classmethod
+    def parse_file(cls, path, positions=False):
+        """
+        Parse a source file without reading it into memory, the file is
+        memory mapped and lexed as bytes.
+        """
+        with open(path, "rb") as f:
+            try:
+                source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty files can't be mapped
+                return cls.parse(BytesScanner(b""), positions=positions)
+            with source:
+                return cls.parse(BytesScanner(source), positions=positions)
+
     def program(self):
         program = self.block()
         self.match(Symbol.PERIOD, 9)
@@ -264,6 +586,7 @@ class Parser:
             self.match(Symbol.SEMICOLON, 5)
 
         while self.token == Symbol.PROC:
+            line = self.token.line
             self.get_token()
             ident = self.match(Symbol.IDENT, 4)
             self.declarations[ident] = Symbol.PROC
@@ -283,7 +606,8 @@ class Parser:
                     "Procedure",
                     name=ident,
                     parameters=parameters,
-                    blocks=self.block()
+                    blocks=self.block(),
+                    line=line,
                 )
             )
             self.match(Symbol.SEMICOLON, 5)
@@ -294,18 +618,21 @@ class Parser:
         return blocks
 
     def const_declaration(self):
+        line = self.token.line
         ident = self.match(Symbol.IDENT, 4)
         self.match(Symbol.EQL, 3)
         value = self.match(Symbol.NUMBER, 2)
         self.declarations[ident] = Symbol.CONST
-        return self.node("Const", name=ident, value=value)
+        return self.node("Const", name=ident, value=value, line=line)
 
     def var_declaration(self):
+        line = self.token.line
         ident = self.match(Symbol.IDENT, 4)
         self.declarations[ident] = Symbol.VAR
-        return self.node("Var", name=ident)
+        return self.node("Var", name=ident, line=line)
 
     def statement(self):
+        line = self.token.line
         if self.token == Symbol.IDENT:
             ident = self.token.value
             declaration_type = self.declarations.get(ident)
@@ -315,7 +642,9 @@ class Parser:
                 self.error(12)
             self.get_token()
             self.match(Symbol.BECOMES, 13)
-            return self.node("Assignment", name=ident, value=self.expression())
+            return self.node(
+                "Assignment", name=ident, value=self.expression(), line=line
+            )
 
         if self.token == Symbol.CALL:
             self.get_token()
@@ -335,13 +664,15 @@ class Parser:
                     self.get_token()
                     arguments.append(self.expression())
                 self.match(Symbol.RPAREN, 31)
-            return self.node("Call", name=ident, arguments=arguments)
+            return self.node("Call", name=ident, arguments=arguments, line=line)
 
         if self.token == Symbol.IF:
             self.get_token()
             condition = self.condition()
             self.match(Symbol.THEN, 16)
-            return self.node("If", condition=condition, body=self.statement())
+            return self.node(
+                "If", condition=condition, body=self.statement(), line=line
+            )
 
         if self.token == Symbol.BEGIN:
             self.get_token()
@@ -352,21 +683,23 @@ class Parser:
                 if statement:
                     statements.append(statement)
             self.match(Symbol.END, 17)
-            return self.node("Block", statements=statements)
+            return self.node("Block", statements=statements, line=line)
 
         if self.token == Symbol.WHILE:
             self.get_token()
             condition = self.condition()
             self.match(Symbol.DO, 18)
-            return self.node("Loop", condition=condition, body=self.statement())
+            return self.node(
+                "Loop", condition=condition, body=self.statement(), line=line
+            )
 
         if self.token == Symbol.WRITE:
             self.get_token()
-            return self.node("Output", value=self.expression())
+            return self.node("Output", value=self.expression(), line=line)
 
         if self.token == Symbol.DEBUG:
             self.get_token()
-            return self.node("Debug")
+            return self.node("Debug", line=line)
 
         return None
 
@@ -444,24 +777,34 @@ class Parser:
         self.error(23)
 
     def error(self, error_num):
-        lines = self.lexer.input.split("\n")
+        first_line, lines = self.lexer.lines()
+        # index of the token's line in `lines`
+        index = self.token.line - first_line
         start_context = ""
         after_context = ""
 
-        if self.token.line - 1 > 1:
-            start_context = f"{lines[self.token.line - 2]}\n"
+        if self.token.line - 1 > 1 and index > 0:
+            start_context = f"{lines[index - 1]}\n"
 
-        line = self.lexer.input.split("\n")[self.token.line - 1]
-        line += "\n" + (" " * (self.token.column - 1)) + "^"
+        line = lines[index]
+        column = self.token.column
+        if index == 0:
+            # the start of the line may not be held by the lexer
+            column -= self.lexer.first_column - 1
+        line += "\n" + (" " * (column - 1)) + "^"
 
-        if len(lines) - 1 > self.token.line:
-            after_context = f"\n{lines[self.token.line]}"
+        if len(lines) - 1 > index + 1:
+            after_context = f"\n{lines[index + 1]}"
 
         line = f"{start_context}{line}{after_context}"
         raise ParserException(error_num, line, self.token)
 
     def get_token(self):
-        self.token = self.lexer.get_token()
+        self.token = next(self.tokens, None)
+        if self.token is None:
+            self.token = Token(
+                Symbol.NULL, line=self.lexer.line, column=self.lexer.column
+            )
         return self.token
 
     def match(self, symbol, error_code):
@@ -472,5 +815,7 @@ class Parser:
             self.error(error_code)
         return value
 
-    def node(self, type, **kwargs):
-        return dict(type=type, **kwargs)
+    def node(self, type, line=None, **kwargs):
+        if self.positions:
+            kwargs["line"] = line
+        return NODES[type](**kwargs)
@@ -0,0 +1,294 @@
+"""
+The Peephole Optimizer
+======================
+
+Rewrites the instructions produced by `Generator.generate_code` into an
+equivalent, shorter sequence.
+
+An optimization pass is a function taking the list of instructions and
+the set of indexes which are the target of a JMP, JPC or CAL. A pass
+rewrites instructions in place and marks the ones it removes by
+replacing them with None, returning True if it changed anything. After
+every pass the removed instructions are dropped and all jump and call
+targets are fixed up to point at the new indexes. An instruction
+which jumped to a removed instruction will now jump to the first
+instruction following it that was kept.
+
+Passes must never remove an instruction that is a jump target unless
+it has no effect, and must not merge an instruction with one that
+follows it if the latter is a jump target.
+
+The passes are repeated until none of them changes the code any more.
+"""
+from pl0.constants import OP_CODE, OPERATION
+from pl0.vm import VM
+
+JUMPS = (OP_CODE.JMP, OP_CODE.JPC, OP_CODE.CAL)
+
+
+def jump_targets(code):
+    return {value for op_code, _, value in code if op_code in JUMPS}
+
+
+def fold_constants(code, targets):
+    """
+    Evaluate operations on literals at compile time, e.g. `LIT 2; LIT 3;
+    OPR ADD` becomes `LIT 5` and `LIT 2; OPR NEGATE` becomes `LIT -2`.
+    """
+    changed = False
+    # indexes of the kept instructions since the last jump target
+    live = []
+    for i, instruction in enumerate(code):
+        if instruction is None:
+            continue
+        if i in targets:
+            live = []
+
+        op_code, _, value = instruction
+        if op_code != OP_CODE.OPR or not live or code[live[-1]][0] != OP_CODE.LIT:
+            live.append(i)
+            continue
+
+        rhs = code[live[-1]][2]
+        if value == OPERATION.NEGATE:
+            operands = live[-1:]
+            result = -rhs
+        elif value == OPERATION.ODD:
+            operands = live[-1:]
+            result = rhs % 2
+        elif (
+            value in VM.OPERATION_MAP
+            and len(live) > 1
+            and code[live[-2]][0] == OP_CODE.LIT
+            and not (value == OPERATION.DIV and rhs == 0)
+        ):
+            operands = live[-2:]
+            result = VM.OPERATION_MAP[value](code[live[-2]][2], rhs)
+        else:
+            live.append(i)
+            continue
+
+        # the folded literal takes the place of the first operand, so a
+        # jump to the start of the sequence still pushes the same value
+        code[operands[0]] = [OP_CODE.LIT, 0, int(result)]
+        for j in operands[1:] + [i]:
+            code[j] = None
+        del live[-len(operands) :]
+        live.append(operands[0])
+        changed = True
+    return changed
+
+
+def stack_adjustment(instruction):
+    op_code, _, value = instruction
+    return value if op_code == OP_CODE.INT else -value
+
+
+def merge_stack_adjustments(code, targets):
+    """
+    Merge runs of INT and DET instructions, e.g. the `DET 0 1` emitted
+    for every argument of a call, and drop the ones which adjust the
+    stack by 0.
+    """
+    changed = False
+    previous = None
+    for i, instruction in enumerate(code):
+        if instruction is None:
+            continue
+
+        op_code, _, value = instruction
+        if op_code in (OP_CODE.INT, OP_CODE.DET) and value == 0:
+            code[i] = None
+            changed = True
+            continue
+
+        if (
+            previous is not None
+            and i not in targets
+            and op_code in (OP_CODE.INT, OP_CODE.DET)
+            and code[previous][0] in (OP_CODE.INT, OP_CODE.DET)
+        ):
+            adjustment = stack_adjustment(code[previous]) + stack_adjustment(instruction)
+            code[previous] = (
+                [OP_CODE.INT, 0, adjustment]
+                if adjustment >= 0
+                else [OP_CODE.DET, 0, -adjustment]
+            )
+            code[i] = None
+            changed = True
+            continue
+
+        previous = i
+    return changed
+
+
+def constant_branches(code, targets):
+    """
+    Resolve conditional jumps on a literal, `LIT 0; JPC x` becomes
+    `JMP x` and `LIT 1; JPC x` is removed entirely.
+    """
+    changed = False
+    previous = None
+    for i, instruction in enumerate(code):
+        if instruction is None:
+            continue
+
+        if (
+            instruction[0] == OP_CODE.JPC
+            and previous is not None
+            and i not in targets
+            and code[previous][0] == OP_CODE.LIT
+        ):
+            if code[previous][2] == 0:
+                code[i] = [OP_CODE.JMP, 0, instruction[2]]
+            else:
+                code[i] = None
+            code[previous] = None
+            changed = True
+            previous = None
+            continue
+
+        previous = i
+    return changed
+
+
+def thread_jumps(code, targets):
+    """
+    Point jumps which land on an unconditional JMP straight at its
+    destination, and remove jumps to the instruction that follows them.
+    """
+    changed = False
+    for i, instruction in enumerate(code):
+        if instruction is None or instruction[0] not in JUMPS:
+            continue
+
+        op_code, _, target = instruction
+        seen = {i}
+        while (
+            target < len(code)
+            and target not in seen
+            and code[target] is not None
+            and code[target][0] == OP_CODE.JMP
+        ):
+            seen.add(target)
+            target = code[target][2]
+
+        if target != instruction[2]:
+            instruction[2] = target
+            changed = True
+
+        next_index = next(
+            (j for j in range(i + 1, len(code)) if code[j] is not None), len(code)
+        )
+        # instruction 0 is the entry point so it is always kept
+        if op_code == OP_CODE.JMP and i > 0 and target == next_index:
+            code[i] = None
+            changed = True
+        elif op_code == OP_CODE.JPC and target == next_index:
+            # the condition still needs popping off the stack
+            code[i] = [OP_CODE.DET, 0, 1]
+            changed = True
+    return changed
+
+
+def remove_unreachable(code, targets):
+    """
+    Remove instructions which can never be executed, such as the JMP at
+    the start of every procedure and code following a constant false
+    branch.
+    """
+    reachable = set()
+    pending = [0]
+    while pending:
+        i = pending.pop()
+        while i < len(code) and i not in reachable:
+            reachable.add(i)
+            op_code, _, value = code[i]
+            if op_code in JUMPS:
+                pending.append(value)
+            if op_code == OP_CODE.JMP or (
+                op_code == OP_CODE.OPR and value == OPERATION.RETURN
+            ):
+                break
+            i += 1
+
+    changed = False
+    for i in range(len(code)):
+        if i not in reachable and code[i] is not None:
+            code[i] = None
+            changed = True
+    return changed
+
+
+class PeepholeOptimizer:
+    LEVELS = {
+        0: [],
+        1: [fold_constants, merge_stack_adjustments, constant_branches, thread_jumps],
+        2: [
+            fold_constants,
+            merge_stack_adjustments,
+            constant_branches,
+            thread_jumps,
+            remove_unreachable,
+        ],
+    }
+
+    def __init__(self, passes=(), level=None):
+        self.passes = list(passes)
+        self.level = level
+        self.total = 0
+        self.removed = 0
+
+    @classmethod
+    def for_level(cls, level):
+        level = min(level, max(cls.LEVELS))
+        return cls(cls.LEVELS[level], level=level)
+
+    def signature(self):
+        """
+        Identifies the passes in use, for keying cached output.
+        """
+        return "O:" + ",".join(optimization.__name__ for optimization in self.passes)
+
+    def optimize(self, code, symbols=None):
+        """
+        Return an optimized copy of a list of instructions. The entry
+        addresses in the `SymbolTable` `symbols` are moved along with
+        the code.
+        """
+        code = [list(instruction) for instruction in code]
+        self.total = len(code)
+
+        changed = bool(self.passes)
+        while changed:
+            changed = False
+            for optimization in self.passes:
+                if optimization(code, jump_targets(code)):
+                    code = self.compact(code, symbols)
+                    changed = True
+
+        self.removed = self.total - len(code)
+        return code
+
+    def compact(self, code, symbols=None):
+        """
+        Drop removed instructions and fix up jump and call targets.
+        """
+        new_index = [0] * (len(code) + 1)
+        count = 0
+        for i, instruction in enumerate(code):
+            new_index[i] = count
+            if instruction is not None:
+                count += 1
+        new_index[len(code)] = count
+        if symbols is not None:
+            symbols.relocate(new_index)
+
+        compacted = []
+        for instruction in code:
+            if instruction is None:
+                continue
+            if instruction[0] in JUMPS:
+                instruction[2] = new_index[instruction[2]]
+            compacted.append(instruction)
+        return compacted
@@ -0,0 +1,72 @@
+"""
+VM Pools
+========
+
+Running the same program over and over, each time with a new VM, spends
+much of the time of a short program allocating data stores (and, for
+the `ThreadedVM`, decoding the code into handlers again). A `VMPool`
+keeps the VMs it has run the code on and resets them for the next run
+instead, so each VM only pays for that once.
+"""
+from contextlib import contextmanager
+
+from pl0.vm import VM
+
+
+class VMPool:
+    """
+    A pool of VMs of the `engine` class sharing one read only copy of
+    `code`, a list of instructions or a `CodeObject`. The keyword
+    arguments are passed on to every VM the pool creates, including the
+    `output` sink they all write to. VMs are created as they are needed
+    and kept once released, it's safe to acquire them from several
+    threads.
+    """
+
+    def __init__(self, code, engine=VM, **kwargs):
+        self.code = code
+        self.engine = engine
+        self.kwargs = kwargs
+        self.extent = engine.stack_extent(code)
+        self.idle = []
+
+    def acquire(self, globals=None):
+        """
+        Take a VM out of the pool, ready to interpret the code from the
+        start. `globals` maps addresses in the global stack frame to the
+        values its variables start with (see `VM.reset`).
+        """
+        try:
+            vm = self.idle.pop()
+        except IndexError:
+            vm = self.engine(self.code, **self.kwargs)
+            vm.extent = self.extent
+        vm.reset(globals)
+        return vm
+
+    def release(self, vm):
+        """
+        Put a VM taken with `acquire` back in the pool.
+        """
+        self.idle.append(vm)
+
+    @contextmanager
+    def vm(self, globals=None):
+        """
+        Acquire a VM for the duration of a with block.
+        """
+        vm = self.acquire(globals)
+        try:
+            yield vm
+        finally:
+            self.release(vm)
+
+    def run(self, globals=None):
+        """
+        Run the code once on a VM from the pool.
+        """
+        vm = self.acquire(globals)
+        try:
+            vm.interpret()
+        finally:
+            self.idle.append(vm)
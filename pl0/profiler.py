@@ -0,0 +1,182 @@
+"""
+The Profiler
+============
+
+Where a program running on the `VM` spends its time. Pass a `Profiler`
+to a VM (`VM(code, profiler=Profiler(symbols))`) and once the program
+has run `report` shows:
+
+- every procedure, with how often it was called, the time spent in it
+  and in the procedures it called, and the instructions it executed,
+- the instructions executed most often,
+- the backward jumps, which close loops, taken most often.
+
+A VM with a profiler fetches its instructions through `ProfiledCode`,
+which does the counting, instead of from the code directly. A VM
+without one runs exactly as it always does, so profiling costs nothing
+unless it is used. Procedures are told apart by the addresses they are
+called at and named with the `SymbolTable` the code was generated with.
+"""
+import time
+
+from pl0.constants import OP_CODE, OPERATION
+from pl0.symbols import MAIN, SymbolTable
+
+# the columns procedures can be sorted on, see `Profiler.report`
+SORT_KEYS = ("time", "own", "calls", "instructions", "name")
+
+
+class ProcedureStats:
+    __slots__ = ("name", "calls", "time", "own", "instructions", "active")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        # the time spent in the procedure, including the procedures it
+        # called, and `own` time excluding them
+        self.time = 0.0
+        self.own = 0.0
+        # the number of instructions executed by the procedure itself
+        self.instructions = 0
+        # the number of running invocations, a recursive call's time is
+        # already part of the outermost invocation's
+        self.active = 0
+
+
+class ProfiledCode:
+    """
+    A code store recording every instruction the VM fetches from it.
+    """
+
+    def __init__(self, code, profiler):
+        self.code = code
+        self.profiler = profiler
+
+    def __len__(self):
+        return len(self.code)
+
+    def __iter__(self):
+        return iter(self.code)
+
+    def __getitem__(self, index):
+        instruction = self.code[index]
+        profiler = self.profiler
+        profiler.counts[index] = profiler.counts.get(index, 0) + 1
+        profiler.executed += 1
+        op_code, _, value = instruction
+        if op_code == OP_CODE.CAL:
+            profiler.enter(value)
+        elif op_code == OP_CODE.OPR and value == OPERATION.RETURN:
+            profiler.leave()
+        elif op_code == OP_CODE.JMP and value <= index:
+            edge = (index, value)
+            profiler.back_edges[edge] = profiler.back_edges.get(edge, 0) + 1
+        return instruction
+
+
+class Profiler:
+    def __init__(self, symbols=None, clock=time.perf_counter):
+        self.symbols = SymbolTable() if symbols is None else symbols
+        self.clock = clock
+        # instruction index -> times executed, and their total
+        self.counts = {}
+        self.executed = 0
+        # (index of a JMP, the earlier index it jumps to) -> times taken
+        self.back_edges = {}
+        # procedure entry address -> `ProcedureStats`, main is None
+        self.procedures = {}
+        # the running invocations, lists of the procedure's stats, the
+        # time and instruction count when it was called and the time and
+        # instructions of the procedures it called
+        self.stack = []
+        self.code = None
+
+    def instrument(self, code):
+        """
+        The code store for a VM to fetch instructions from while
+        profiling.
+        """
+        self.code = code
+        return ProfiledCode(code, self)
+
+    def start(self):
+        """
+        Called by the VM when it starts running the program.
+        """
+        self.enter(None)
+
+    def stop(self):
+        """
+        Called by the VM when it stops, finishing the invocations still
+        running if the program failed.
+        """
+        while self.stack:
+            self.leave()
+
+    def enter(self, address):
+        stats = self.procedures.get(address)
+        if stats is None:
+            name = MAIN if address is None else self.symbols.name(address)
+            stats = self.procedures[address] = ProcedureStats(name)
+        stats.calls += 1
+        stats.active += 1
+        self.stack.append([stats, self.clock(), self.executed, 0.0, 0])
+
+    def leave(self):
+        if not self.stack:
+            return
+        stats, start, executed, child_time, child_executed = self.stack.pop()
+        elapsed = self.clock() - start
+        instructions = self.executed - executed
+
+        stats.own += elapsed - child_time
+        stats.instructions += instructions - child_executed
+        stats.active -= 1
+        if not stats.active:
+            stats.time += elapsed
+
+        if self.stack:
+            self.stack[-1][3] += elapsed
+            self.stack[-1][4] += instructions
+
+    def report(self, sort="time", limit=10):
+        """
+        A text report of the procedures, sorted by one of `SORT_KEYS`,
+        and of the `limit` hottest instructions and loops.
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"can't sort by {sort}, use one of {', '.join(SORT_KEYS)}")
+        procedures = sorted(
+            self.procedures.values(),
+            key=lambda stats: getattr(stats, sort),
+            reverse=sort != "name",
+        )
+
+        lines = [
+            f"{self.executed} instructions executed",
+            "",
+            f"{'calls':>10} {'time':>10} {'own':>10} {'instructions':>14}  procedure",
+        ]
+        for stats in procedures:
+            lines.append(
+                f"{stats.calls:>10} {stats.time:>10.6f} {stats.own:>10.6f} "
+                f"{stats.instructions:>14}  {stats.name}"
+            )
+
+        lines += ["", f"{'count':>10} {'index':>6}  instruction"]
+        hottest = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+        for index, count in hottest[:limit]:
+            op_code, level, value = self.code[index]
+            lines.append(
+                f"{count:>10} {index:>6}  {op_code} {level}, {value}"
+                f"  ({self.symbols.procedure_at(index)})"
+            )
+
+        lines += ["", f"{'count':>10} {'loop':>13}"]
+        loops = sorted(self.back_edges.items(), key=lambda item: (-item[1], item[0]))
+        for (index, target), count in loops[:limit]:
+            lines.append(
+                f"{count:>10} {f'{target}..{index}':>13}"
+                f"  ({self.symbols.procedure_at(index)})"
+            )
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,196 @@
+"""
+The PL/0 Register Machine
+=========================
+
+An alternative to the stack based `pl0.vm.VM` which executes the
+three-address code generated by `pl0.generators.regcode`.
+
+Frames
+------
+
+Every procedure invocation has its own frame, a list of registers:
+
+0 - Static Link, the frame of the lexically enclosing procedure.
+
+1..n - The arguments the procedure was called with.
+
+n+1.. - The variables, constants and temporaries of the procedure.
+
+A CAL instruction creates the frame with the static link and the
+arguments and the ENT instruction at the start of the procedure extends
+it with the rest of its registers, including the values of its
+constants. The return address and the caller's frame are kept on a
+separate call stack.
+
+
+Instructions
+------------
+
+An instruction is a sequence of an op code and three operands, most of
+which are register numbers (see `pl0.constants.REG_OP_CODE`). Because
+operands are read from and results written to registers directly there
+is no pushing and popping of temporaries, which lets an expression like
+`a := b + c` execute as a single instruction instead of the four of the
+stack machine (LOD, LOD, OPR, STO).
+"""
+import operator
+
+from pl0.constants import REG_OP_CODE
+from pl0.generators.regcode import RegisterGenerator
+
+MOV = REG_OP_CODE.MOV
+ADD = REG_OP_CODE.ADD
+SUB = REG_OP_CODE.SUB
+MUL = REG_OP_CODE.MUL
+DIV = REG_OP_CODE.DIV
+NEG = REG_OP_CODE.NEG
+GET = REG_OP_CODE.GET
+SET = REG_OP_CODE.SET
+JMP = REG_OP_CODE.JMP
+CAL = REG_OP_CODE.CAL
+ENT = REG_OP_CODE.ENT
+RET = REG_OP_CODE.RET
+JODD = REG_OP_CODE.JODD
+JEVEN = REG_OP_CODE.JEVEN
+WRT = REG_OP_CODE.WRT
+DBG = REG_OP_CODE.DBG
+
+
+class RegisterVM:
+    BRANCH_MAP = {
+        REG_OP_CODE.JEQ: operator.eq,
+        REG_OP_CODE.JNE: operator.ne,
+        REG_OP_CODE.JLT: operator.lt,
+        REG_OP_CODE.JLE: operator.le,
+        REG_OP_CODE.JGT: operator.gt,
+        REG_OP_CODE.JGE: operator.ge,
+    }
+
+    def __init__(self, code, debug=False, output=None):
+        self.code = code
+        self.debug = debug
+        self.program = 0
+        self.frame = None
+        self.frames = []
+        # an `OutputSink` for the written values, they're printed without one
+        self.output = output
+
+    @property
+    def output(self):
+        return self._output
+
+    @output.setter
+    def output(self, output):
+        self._output = output
+        self.write = print if output is None else output.write
+
+    @classmethod
+    def from_ast(cls, ast, **kwargs):
+        return cls(RegisterGenerator.generate_code(ast), **kwargs)
+
+    def interpret(self):
+        # the global frame only has a static link until it is entered
+        self.program = 0
+        self.frame = [0]
+        self.frames = []
+        try:
+            self.run()
+        finally:
+            if self.output is not None:
+                self.output.flush()
+
+    def run(self):
+        """
+        Fetch, decode and execute instructions until the program
+        returns from its global frame.
+        """
+        code = self.code
+        frames = self.frames
+        frame = self.frame
+        program = self.program
+        branches = self.BRANCH_MAP
+        write = self.write
+
+        while True:
+            op_code, a, b, c = code[program]
+            program += 1
+
+            if self.debug:
+                self.program, self.frame = program, frame
+                self.print_debug()
+
+            if op_code == MOV:
+                frame[a] = frame[b]
+            elif op_code == ADD:
+                frame[a] = frame[b] + frame[c]
+            elif op_code == SUB:
+                frame[a] = frame[b] - frame[c]
+            elif op_code == MUL:
+                frame[a] = frame[b] * frame[c]
+            elif op_code == DIV:
+                frame[a] = frame[b] // frame[c]
+            elif op_code in branches:
+                if branches[op_code](frame[a], frame[b]):
+                    program = c
+            elif op_code == JMP:
+                program = c
+            elif op_code == JODD:
+                if frame[a] % 2:
+                    program = c
+            elif op_code == JEVEN:
+                if not frame[a] % 2:
+                    program = c
+            elif op_code == GET:
+                outer = frame
+                for _ in range(b):
+                    outer = outer[0]
+                frame[a] = outer[c]
+            elif op_code == SET:
+                outer = frame
+                for _ in range(a):
+                    outer = outer[0]
+                outer[b] = frame[c]
+            elif op_code == CAL:
+                link = frame
+                for _ in range(a):
+                    link = link[0]
+                frames.append((frame, program))
+                frame = [link] + [frame[register] for register in c]
+                program = b
+            elif op_code == ENT:
+                frame.extend(a)
+            elif op_code == RET:
+                if not frames:
+                    break
+                frame, program = frames.pop()
+            elif op_code == NEG:
+                frame[a] = -frame[b]
+            elif op_code == WRT:
+                write(frame[a])
+            elif op_code == DBG:
+                self.debug = True
+
+        self.program = program
+        self.frame = frame
+
+    def print_debug(self):
+        """
+        Debugging output about the state of execution for when the
+        debugging flag is set.
+        """
+        code = ""
+        for i, c in enumerate(self.code):
+            marker = " <--" if i == self.program - 1 else ""
+            code += f"{i}: {c[0]}, {c[1]}, {c[2]}, {c[3]}{marker}\n"
+
+        output = f"""\
+Registers:
+    program: {self.program - 1}
+    depth: {len(self.frames)}
+
+{code}
+{self.frame[1:]}
+        """
+        print(output)
+        if input("> ").lower() == "q":
+            self.debug = False
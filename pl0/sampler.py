@@ -0,0 +1,209 @@
+"""
+The Sampling Profiler
+=====================
+
+A statistical alternative to `pl0.profiler.Profiler` for long runs.
+Instead of counting every instruction, a sample of the VM is taken
+every `interval` seconds of CPU time: the instruction it is executing
+and the stack of procedure invocations that led there. The program runs
+at full speed in between, so sampling only slows it down by a few
+percent.
+
+On the main thread the samples are taken by a SIGPROF handler, set off
+by `signal.setitimer(signal.ITIMER_PROF)`. Python runs the handler on
+the main thread in between two bytecodes, with the frame it interrupted,
+so the samples fall wherever the VM spends its time. Elsewhere, or
+where there is no `setitimer`, a background thread wakes up every
+`interval` seconds instead. It can only take a sample once the VM's
+thread lets go of the GIL, which it mostly does while writing output,
+so these samples are skewed towards WRITE unless the output is buffered.
+
+The running instruction is the `program` register of the `VM`, or, for
+a `ThreadedVM`, which keeps it in a local variable, read from the frame
+of its interpreter loop (see `sys._current_frames`). The calls are found
+by following the dynamic links and return addresses of the stack frames
+in the data store. Samples are named with a `SymbolTable`, as
+`procedure:line` where the code was generated with source lines, and
+can be written as collapsed stacks for flame graph tools:
+
+    <main>:20;fib:12;fib:9 42
+
+Python only switches threads every few milliseconds (see
+`sys.getswitchinterval`), so that is the shortest interval the thread
+achieves while the VM is busy.
+"""
+import signal
+import sys
+import threading
+from collections import Counter
+
+from pl0.symbols import SymbolTable
+from pl0.vm import ThreadedVM
+
+# the default time between samples, in seconds
+INTERVAL = 0.005
+
+
+class Sampler:
+    """
+    Samples a VM while it runs, used as a context manager around running
+    it:
+
+        with Sampler(vm, symbols) as sampler:
+            vm.interpret()
+        sampler.write_collapsed(stream)
+    """
+
+    def __init__(self, vm, symbols=None, interval=INTERVAL):
+        self.vm = vm
+        self.symbols = SymbolTable() if symbols is None else symbols
+        self.interval = interval
+        # the call stacks sampled, tuples of instruction indexes from the
+        # main program to the running instruction, and how often
+        self.samples = Counter()
+        # the thread the VM runs on
+        self.thread_id = threading.get_ident()
+        # the SIGPROF handler replaced while sampling with the timer
+        self.previous_handler = None
+        self.timer = False
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """
+        Start sampling the VM, which has to run on the calling thread,
+        with the profiling timer on the main thread and a background
+        thread on any other.
+        """
+        self.thread_id = threading.get_ident()
+        self.timer = (
+            hasattr(signal, "setitimer")
+            and threading.current_thread() is threading.main_thread()
+        )
+        if self.timer:
+            self.previous_handler = signal.signal(signal.SIGPROF, self.handle)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+            return
+
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.timer:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self.previous_handler or signal.SIG_DFL)
+            self.timer = False
+            return
+
+        self.stopped.set()
+        self.thread.join()
+        self.thread = None
+
+    def handle(self, signum, frame):
+        self.take(frame)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.take()
+
+    def take(self, frame=None):
+        """
+        Take a sample of the VM and count it, unless it isn't running.
+        """
+        stack = self.sample(frame)
+        if stack:
+            self.samples[stack] += 1
+
+    def registers(self, frame=None):
+        """
+        The index of the instruction the VM is executing and the base of
+        its stack frame, or None when it isn't running. The VM's thread
+        is looked at from the Python `frame` it's running, by default
+        its current one.
+        """
+        if frame is None:
+            frame = sys._current_frames().get(self.thread_id)
+        while frame is not None:
+            if frame.f_code is ThreadedVM.interpret.__code__:
+                program = frame.f_locals.get("program")
+                if program is None or self.vm.get_registers is None:
+                    return None
+                return program, self.vm.get_registers()[1]
+            if frame.f_code in (self.vm.run.__code__, self.vm.run_bytecode.__code__):
+                # the program register already points at the next instruction
+                return self.vm.program - 1, self.vm.base
+            frame = frame.f_back
+        return None
+
+    def sample(self, frame=None):
+        """
+        The call stack of the VM as a tuple of instruction indexes, the
+        call sites of the procedures followed by the running instruction.
+        """
+        registers = self.registers(frame)
+        if registers is None:
+            return ()
+        program, base = registers
+        datastore = self.vm.datastore
+        stack = [program]
+        # the registers are read while the VM runs, so stop at anything
+        # which doesn't look like a frame rather than trust the links
+        while 0 < base < len(datastore) - 2:
+            caller = datastore[base + 1]
+            if not 0 <= caller < base:
+                break
+            stack.append(datastore[base + 2] - 1)
+            base = caller
+        return tuple(reversed(stack))
+
+    def frame_name(self, index):
+        name = self.symbols.procedure_at(index)
+        line = self.symbols.line_at(index)
+        return name if line is None else f"{name}:{line}"
+
+    def collapsed(self):
+        """
+        The samples as collapsed stacks, `frame;frame;frame` strings, and
+        how often they were sampled.
+        """
+        stacks = Counter()
+        for stack, count in self.samples.items():
+            stacks[";".join(self.frame_name(index) for index in stack)] += count
+        return stacks
+
+    def write_collapsed(self, stream):
+        """
+        Write the collapsed stacks to a text stream, one per line
+        followed by its count, for flamegraph.pl, speedscope and the
+        like.
+        """
+        for stack, count in sorted(self.collapsed().items()):
+            stream.write(f"{stack} {count}\n")
+
+    def report(self, limit=10):
+        """
+        A text report of the procedures and lines the most samples were
+        taken in.
+        """
+        total = sum(self.samples.values())
+        procedures = Counter()
+        lines = Counter()
+        for stack, count in self.samples.items():
+            procedures[self.symbols.procedure_at(stack[-1])] += count
+            lines[self.frame_name(stack[-1])] += count
+
+        report = [f"{total} samples", "", f"{'samples':>10} {'%':>6}  procedure"]
+        for name, count in procedures.most_common(limit):
+            report.append(f"{count:>10} {100 * count / total:>6.1f}  {name}")
+        report += ["", f"{'samples':>10} {'%':>6}  line"]
+        for name, count in lines.most_common(limit):
+            report.append(f"{count:>10} {100 * count / total:>6.1f}  {name}")
+        return "\n".join(report) + "\n"
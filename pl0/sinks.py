@@ -0,0 +1,101 @@
+"""
+Output Sinks
+============
+
+Where the values written by a program's `write` statements go. Every
+engine takes an `output` sink, without one each value is printed on a
+line of its own as it is written. A sink is sent every value with
+`write`, and `flush` is called once the program stops running.
+"""
+import sys
+from array import array
+
+# the number of values buffered before they are written out
+FLUSH_SIZE = 4096
+
+
+class OutputSink:
+    def write(self, value):
+        raise NotImplementedError("write must be implemented")
+
+    def flush(self):
+        pass
+
+
+class ListSink(OutputSink):
+    """
+    Collects the values in the `values` list.
+    """
+
+    def __init__(self):
+        self.values = []
+        self.write = self.values.append
+
+
+class BufferedTextSink(OutputSink):
+    """
+    Writes the values as lines of text, like printing them, but only
+    every `flush_size` values. `stream` defaults to `sys.stdout`.
+    """
+
+    def __init__(self, stream=None, flush_size=FLUSH_SIZE):
+        self.stream = stream
+        self.flush_size = flush_size
+        self.buffer = []
+
+    def write(self, value):
+        self.buffer.append(value)
+        if len(self.buffer) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        stream = self.stream or sys.stdout
+        if self.buffer:
+            stream.write("\n".join(map(str, self.buffer)) + "\n")
+            self.buffer.clear()
+        stream.flush()
+
+
+class BinarySink(OutputSink):
+    """
+    Writes the values to a binary stream as packed signed 64 bit little
+    endian integers, every `flush_size` values. `stream` defaults to
+    the binary buffer of `sys.stdout`. Writing a value out of range
+    raises an `OverflowError`.
+    """
+
+    def __init__(self, stream=None, flush_size=FLUSH_SIZE):
+        self.stream = stream
+        self.flush_size = flush_size
+        self.buffer = array("q")
+
+    def write(self, value):
+        self.buffer.append(value)
+        if len(self.buffer) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        stream = self.stream or sys.stdout.buffer
+        if self.buffer:
+            if sys.byteorder == "big":
+                self.buffer.byteswap()
+            stream.write(self.buffer.tobytes())
+            del self.buffer[:]
+        stream.flush()
+
+
+def read_binary(data):
+    """
+    The values in the output of a `BinarySink`.
+    """
+    values = array("q")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+
+SINKS = {
+    "buffered": BufferedTextSink,
+    "binary": BinarySink,
+}
@@ -0,0 +1,75 @@
+"""
+Symbol Tables
+=============
+
+The names of the procedures in the stack machine code, and the source
+lines of its instructions, for reporting where a program spends its
+time. The `Generator` fills a `SymbolTable` in with the entry address of
+every procedure (its INT instruction) and the line of every instruction
+and the `PeepholeOptimizer` moves them along with the code. Lines are
+only known when the parser recorded them (`Parser.parse(...,
+positions=True)`).
+
+The body of a procedure is generated after the procedures nested in
+it, so the code from the entry address of a procedure up to the next
+entry address belongs to it, the entry of the main program being the
+last.
+"""
+from bisect import bisect_right
+
+MAIN = "<main>"
+
+
+class SymbolTable:
+    def __init__(self):
+        # the entry address of every procedure, main included, and its
+        # name, nested procedures are named `outer.inner`
+        self.procedures = {}
+        self.addresses = None
+        # the source line of every instruction, None where it's unknown
+        self.lines = []
+
+    def add_procedure(self, address, name):
+        self.procedures[address] = name
+        self.addresses = None
+
+    def relocate(self, new_index):
+        """
+        Move the entry addresses to their new indexes after code has
+        been removed (see `PeepholeOptimizer.compact`).
+        """
+        self.procedures = {
+            new_index[address]: name for address, name in self.procedures.items()
+        }
+        self.addresses = None
+        # the instructions which were kept have a new index of their own
+        self.lines = [
+            line
+            for index, line in enumerate(self.lines)
+            if new_index[index] != new_index[index + 1]
+        ]
+
+    def name(self, address):
+        """
+        The name of the procedure with the entry address.
+        """
+        return self.procedures.get(address, f"<{address}>")
+
+    def procedure_at(self, index):
+        """
+        The name of the procedure the instruction at `index` is part of.
+        """
+        if self.addresses is None:
+            self.addresses = sorted(self.procedures)
+        position = bisect_right(self.addresses, index)
+        if position == 0:
+            return MAIN
+        return self.procedures[self.addresses[position - 1]]
+
+    def line_at(self, index):
+        """
+        The source line of the instruction at `index`, or None.
+        """
+        if 0 <= index < len(self.lines):
+            return self.lines[index]
+        return None
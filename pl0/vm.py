@@ -102,6 +102,7 @@ Code Store:                               Data Store:
 """
 import operator
 
+from pl0.bytecode import CAL, DET, INT, JMP, JPC, LIT, LOD, OPR, STO, CodeObject
 from pl0.constants import OP_CODE, OPERATION
 
 
@@ -119,14 +120,33 @@ class VM:
         OPERATION.GREATER_EQUAL: operator.ge,
     }
 
-    def __init__(self, code, stack_size=500, debug=False):
+    def __init__(self, code, stack_size=500, debug=False, output=None, profiler=None):
         self.code = code
         self.stack_size = stack_size
         self.program = 0
         self.base = 0
         self.topstack = -1
         self.datastore = [0] * self.stack_size
+        # the highest `topstack` a CAL or WRITE was executed at since the
+        # last reset, which bounds the used part of the data store
+        self.peak = 0
+        # see `stack_extent`, found when the VM is first reset
+        self.extent = None
         self.debug = debug
+        # an `OutputSink` for the written values, they're printed without one
+        self.output = output
+        # a `pl0.profiler.Profiler` recording the execution
+        self.profiler = profiler
+
+    @property
+    def output(self):
+        return self._output
+
+    @output.setter
+    def output(self, output):
+        # WRITE calls `write` rather than looking the sink up every time
+        self._output = output
+        self.write = print if output is None else output.write
 
     def interpret(self):
         # initialize the registers and the global stack frame
@@ -136,9 +156,99 @@ class VM:
         self.datastore[0] = 0
         self.datastore[1] = 0
         self.datastore[2] = 0
+        if self.profiler is not None:
+            self.profiler.start()
+        try:
+            self.run()
+        finally:
+            if self.profiler is not None:
+                self.profiler.stop()
+            self.flush()
+
+    def reset(self, globals=None):
+        """
+        Put the VM back in the state of a new one, so the same code can
+        be run again without allocating another data store. Only the
+        part of the data store which can have been used since the last
+        reset is cleared. `globals` maps addresses in the global stack
+        frame to the values its variables start with.
+        """
+        if self.extent is None:
+            self.extent = self.stack_extent(self.code)
+        used = min(self.stack_size, self.peak + 1 + self.extent)
+        self.datastore[:used] = [0] * used
+        self.peak = 0
+        self.topstack = -1
+        self.base = 0
+        self.program = 0
+        if globals:
+            for address, value in globals.items():
+                self.datastore[address] = value
+
+    @staticmethod
+    def stack_extent(code):
+        """
+        The most slots above the base of a stack frame the code can use,
+        found by following the control flow like `ThreadedVM.static_depths`
+        and keeping track of the height of the stack. WRITE leaves its
+        value on the stack, which piles up in a loop, so it is counted as
+        popping it and the VM records the `peak` of the stack whenever it
+        writes instead.
+        """
+        heights = [None] * len(code)
+        extent = 3
+        pending = [(0, 0)]
+        while pending:
+            index, height = pending.pop()
+            while index < len(code) and heights[index] is None:
+                heights[index] = height
+                op_code, level, value = code[index]
+                if op_code in (OP_CODE.LIT, OP_CODE.LOD):
+                    height += 1
+                elif op_code == OP_CODE.STO:
+                    height -= 1
+                elif op_code == OP_CODE.INT:
+                    height += value
+                elif op_code == OP_CODE.DET:
+                    height -= value
+                elif op_code == OP_CODE.JPC:
+                    height -= 1
+                    pending.append((value, height))
+                elif op_code == OP_CODE.CAL:
+                    # the links of the new frame are written above the stack
+                    extent = max(extent, height + 3)
+                    pending.append((value, 0))
+                elif op_code == OP_CODE.JMP:
+                    pending.append((value, height))
+                    break
+                elif op_code == OP_CODE.OPR:
+                    if value == OPERATION.RETURN:
+                        break
+                    if value in VM.OPERATION_MAP or value == OPERATION.WRITE:
+                        height -= 1
+                extent = max(extent, height)
+                index += 1
+        return extent
+
+    def flush(self):
+        if self.output is not None:
+            self.output.flush()
+
+    def run(self):
+        """
+        Fetch, decode and execute instructions starting from the
+        current register state until the program register returns to 0.
+        """
+        if self.profiler is not None:
+            # fetching the instructions through the profiler counts them
+            code = self.profiler.instrument(self.code)
+        elif isinstance(self.code, CodeObject):
+            return self.run_bytecode()
+        else:
+            code = self.code
 
         while True:
-            op_code, level, value = self.code[self.program]
+            op_code, level, value = code[self.program]
             self.program += 1
 
             if self.debug:
@@ -163,6 +273,8 @@ class VM:
                 self.datastore[self.topstack + 2] = self.base
                 # store the return address for setting the program register when returning
                 self.datastore[self.topstack + 3] = self.program
+                if self.topstack > self.peak:
+                    self.peak = self.topstack
                 self.base = self.topstack + 1
                 self.program = value
             elif op_code == OP_CODE.INT:
@@ -180,6 +292,56 @@ class VM:
             if self.program == 0:
                 break
 
+    def run_bytecode(self):
+        """
+        The same loop as `run`, for a compact `CodeObject` whose
+        instructions are dispatched on their integer op codes.
+        """
+        code = self.code.code
+        constants = self.code.constants
+
+        while True:
+            index = self.program * 3
+            op_code = code[index]
+            level = code[index + 1]
+            value = code[index + 2]
+            self.program += 1
+
+            if self.debug:
+                self.print_debug()
+
+            if op_code == LIT:
+                self.push(constants[value])
+            elif op_code == OPR:
+                self.perform_operation(value)
+            elif op_code == LOD:
+                base = self.find_base(level)
+                self.push(self.datastore[base + value])
+            elif op_code == STO:
+                base = self.find_base(level)
+                self.datastore[base + value] = self.pop()
+            elif op_code == CAL:
+                self.datastore[self.topstack + 1] = self.find_base(level)
+                self.datastore[self.topstack + 2] = self.base
+                self.datastore[self.topstack + 3] = self.program
+                if self.topstack > self.peak:
+                    self.peak = self.topstack
+                self.base = self.topstack + 1
+                self.program = value
+            elif op_code == INT:
+                self.topstack += value
+            elif op_code == DET:
+                self.topstack -= value
+            elif op_code == JMP:
+                self.program = value
+            elif op_code == JPC:
+                if self.datastore[self.topstack] == 0:
+                    self.program = value
+                self.topstack -= 1
+
+            if self.program == 0:
+                break
+
     def perform_operation(self, operation):
         if operation == OPERATION.RETURN:
             # set the stack pointer to the top of the previous stack frame (pop the stack)
@@ -197,7 +359,9 @@ class VM:
         elif operation == OPERATION.ODD:
             self.push(self.pop() % 2)  # 0 is False 1 is True
         elif operation == OPERATION.WRITE:
-            print(self.datastore[self.topstack])
+            if self.topstack > self.peak:
+                self.peak = self.topstack
+            self.write(self.datastore[self.topstack])
         elif operation == OPERATION.DEBUG:
             self.debug = True
 
@@ -252,3 +416,489 @@ Registers:
         print(output)
         if input("> ").lower() == "q":
             self.debug = False
+
+
+class ThreadedVM(VM):
+    """
+    A direct-threaded execution engine for the PL/0 Virtual Machine.
+
+    Rather than fetching and decoding every instruction as it is
+    executed, the code store is decoded once into a list of handlers,
+    one per instruction, with their operands already bound. A handler
+    executes its instruction and returns the index of the next handler
+    to run, so the interpreter loop is reduced to
+    `program = handlers[program]()`.
+
+    The `topstack` and `base` registers live in closure cells shared by
+    all of the handlers while the program runs and are written back to
+    the VM when it halts. The resulting output and data store are the
+    same as those of `VM`.
+
+    With `superinstructions` enabled common instruction sequences are
+    fused into a single handler (see `fuse`). Every instruction keeps its
+    own handler as well, so jumping into the middle of a fused sequence
+    still works.
+
+    Display
+    -------
+
+    Instead of walking the static links with `find_base`, variables of
+    enclosing procedures are addressed through a display: `display[d]`
+    is the base of the active stack frame at lexical depth `d`.
+
+    The lexical depth of every instruction is known ahead of time (see
+    `static_depths`), so an access `level` levels out from code at
+    depth `d` is a single lookup of `display[d - level]` however deeply
+    the procedures are nested. A CAL saves the display entry of the
+    callee's depth and points it at the new frame, the callee's RETURN
+    restores it. Static links are still stored in every frame, so the
+    data store is unchanged.
+    """
+
+    def __init__(
+        self,
+        code,
+        stack_size=500,
+        debug=False,
+        superinstructions=True,
+        output=None,
+        profiler=None,
+    ):
+        super().__init__(
+            code, stack_size=stack_size, debug=debug, output=output, profiler=profiler
+        )
+        self.superinstructions = superinstructions
+        self.handlers = None
+        self.get_registers = None
+        self.set_registers = None
+        self.display = None
+        self.display_stack = None
+
+    @VM.output.setter
+    def output(self, output):
+        VM.output.fset(self, output)
+        # the handlers are bound to the `write` of the previous sink
+        self.handlers = None
+
+    def interpret(self):
+        if self.debug or self.profiler is not None:
+            # stepping through or profiling the program needs the classic loop
+            return super().interpret()
+
+        if self.handlers is None:
+            self.handlers = self.decode()
+
+        handlers = self.handlers
+        self.set_registers(-1, 0, self.peak)
+        self.display[0] = 0
+        self.display_stack.clear()
+        self.datastore[0] = 0
+        self.datastore[1] = 0
+        self.datastore[2] = 0
+
+        try:
+            try:
+                program = handlers[0]()
+                while program > 0:
+                    program = handlers[program]()
+            finally:
+                # kept when the program fails as well, so the VM can be reset
+                self.topstack, self.base, self.peak = self.get_registers()
+
+            if program < 0:
+                # a DEBUG instruction was executed, hand over to the stepper
+                self.program = -program
+                self.run()
+            else:
+                self.program = program
+        finally:
+            self.flush()
+
+    @staticmethod
+    def static_depths(code):
+        """
+        Find the lexical depth of every reachable instruction by
+        following the control flow from the entry point at depth 0. The
+        procedure called by `CAL level, address` from depth `d` has depth
+        `d - level + 1`. Unreachable instructions have a depth of None.
+        """
+        depths = [None] * len(code)
+        pending = [(0, 0)]
+        while pending:
+            index, depth = pending.pop()
+            while index < len(code) and depths[index] is None:
+                depths[index] = depth
+                op_code, level, value = code[index]
+                if op_code in (OP_CODE.JMP, OP_CODE.JPC):
+                    pending.append((value, depth))
+                elif op_code == OP_CODE.CAL:
+                    pending.append((value, depth - level + 1))
+
+                if op_code == OP_CODE.JMP or (
+                    op_code == OP_CODE.OPR and value == OPERATION.RETURN
+                ):
+                    break
+                index += 1
+        return depths
+
+    def decode(self):
+        """
+        Decode the code store into a list of handlers. Each handler is
+        a closure with the instruction's operands, the index of the
+        following instruction and the display slots it uses bound to it.
+        """
+        datastore = self.datastore
+        write = self.write
+        topstack = -1
+        base = 0
+        peak = 0
+
+        code = [tuple(instruction) for instruction in self.code]
+        depths = self.static_depths(code)
+        display = [0] * (max((d for d in depths if d is not None), default=0) + 1)
+        display_stack = []
+
+        def get_registers():
+            return topstack, base, peak
+
+        def set_registers(new_topstack, new_base, new_peak):
+            nonlocal topstack, base, peak
+            topstack = new_topstack
+            base = new_base
+            peak = new_peak
+
+        def find_base(level):
+            frame = base
+            while level > 0:
+                frame = datastore[frame]
+                level -= 1
+            return frame
+
+        def lit(level, value, next, depth):
+            def handler():
+                nonlocal topstack
+                topstack += 1
+                datastore[topstack] = value
+                return next
+
+            return handler
+
+        def lod(level, value, next, depth):
+            if level == 0:
+
+                def handler():
+                    nonlocal topstack
+                    topstack += 1
+                    datastore[topstack] = datastore[base + value]
+                    return next
+
+            elif depth is not None:
+                slot = depth - level
+
+                def handler():
+                    nonlocal topstack
+                    topstack += 1
+                    datastore[topstack] = datastore[display[slot] + value]
+                    return next
+
+            else:
+
+                def handler():
+                    nonlocal topstack
+                    topstack += 1
+                    datastore[topstack] = datastore[find_base(level) + value]
+                    return next
+
+            return handler
+
+        def sto(level, value, next, depth):
+            if level == 0:
+
+                def handler():
+                    nonlocal topstack
+                    datastore[base + value] = datastore[topstack]
+                    topstack -= 1
+                    return next
+
+            elif depth is not None:
+                slot = depth - level
+
+                def handler():
+                    nonlocal topstack
+                    datastore[display[slot] + value] = datastore[topstack]
+                    topstack -= 1
+                    return next
+
+            else:
+
+                def handler():
+                    nonlocal topstack
+                    datastore[find_base(level) + value] = datastore[topstack]
+                    topstack -= 1
+                    return next
+
+            return handler
+
+        def cal(level, value, next, depth):
+            if depth is not None:
+                # the depth of the called procedure
+                callee = depth - level + 1
+
+                def handler():
+                    nonlocal base, peak
+                    datastore[topstack + 1] = display[callee - 1]
+                    datastore[topstack + 2] = base
+                    datastore[topstack + 3] = next
+                    if topstack > peak:
+                        peak = topstack
+                    base = topstack + 1
+                    display_stack.append(display[callee])
+                    display[callee] = base
+                    return value
+
+            else:
+
+                def handler():
+                    nonlocal base, peak
+                    datastore[topstack + 1] = find_base(level)
+                    datastore[topstack + 2] = base
+                    datastore[topstack + 3] = next
+                    if topstack > peak:
+                        peak = topstack
+                    base = topstack + 1
+                    return value
+
+            return handler
+
+        def int_(level, value, next, depth):
+            def handler():
+                nonlocal topstack
+                topstack += value
+                return next
+
+            return handler
+
+        def det(level, value, next, depth):
+            def handler():
+                nonlocal topstack
+                topstack -= value
+                return next
+
+            return handler
+
+        def jmp(level, value, next, depth):
+            def handler():
+                return value
+
+            return handler
+
+        def jpc(level, value, next, depth):
+            def handler():
+                nonlocal topstack
+                topstack -= 1
+                if datastore[topstack + 1] == 0:
+                    return value
+                return next
+
+            return handler
+
+        def opr(level, value, next, depth):
+            if value == OPERATION.RETURN and depth:
+
+                def handler():
+                    nonlocal topstack, base
+                    topstack = base - 1
+                    base = datastore[topstack + 2]
+                    display[depth] = display_stack.pop()
+                    return datastore[topstack + 3]
+
+            elif value == OPERATION.RETURN:
+
+                def handler():
+                    nonlocal topstack, base
+                    topstack = base - 1
+                    base = datastore[topstack + 2]
+                    return datastore[topstack + 3]
+
+            elif value in self.OPERATION_MAP:
+                operation = self.OPERATION_MAP[value]
+
+                def handler():
+                    nonlocal topstack
+                    topstack -= 1
+                    datastore[topstack] = operation(
+                        datastore[topstack], datastore[topstack + 1]
+                    )
+                    return next
+
+            elif value == OPERATION.NEGATE:
+
+                def handler():
+                    datastore[topstack] = -datastore[topstack]
+                    return next
+
+            elif value == OPERATION.ODD:
+
+                def handler():
+                    datastore[topstack] = datastore[topstack] % 2
+                    return next
+
+            elif value == OPERATION.WRITE:
+
+                def handler():
+                    nonlocal peak
+                    if topstack > peak:
+                        peak = topstack
+                    write(datastore[topstack])
+                    return next
+
+            elif value == OPERATION.DEBUG:
+
+                def handler():
+                    self.debug = True
+                    return -next
+
+            else:
+                handler = nop(level, value, next, depth)
+            return handler
+
+        def nop(level, value, next, depth):
+            def handler():
+                return next
+
+            return handler
+
+        def fuse(index):
+            """
+            Return a handler executing the sequence of instructions
+            starting at `index` in one go, or None if there is no
+            superinstruction for it:
+
+            LOD a; LOD b; OPR op [; JPC t]  - load, load, operate
+            LOD a; LIT c; OPR op [; JPC t]  - load, literal, operate
+            LOD a; LIT c; OPR op; STO a     - update a variable in place
+            LIT c; STO a                    - store a literal
+            LOD a; STO b                    - move a variable
+
+            The temporaries the separate instructions would have left
+            above the top of the stack are written as well, so the data
+            store ends up exactly the same.
+            """
+            depth = depths[index]
+            if depth is None:
+                return None
+
+            window = code[index : index + 4] + [(None, 0, 0)] * 3
+            (op1, level1, value1), (op2, level2, value2) = window[0], window[1]
+            op3, _, operation = window[2]
+            op4, level4, value4 = window[3]
+            # the display slots of the operands, only used for level > 0
+            slot1 = depth - level1
+            slot2 = depth - level2
+
+            if op1 == OP_CODE.LIT and op2 == OP_CODE.STO:
+                next = index + 2
+
+                def handler():
+                    datastore[topstack + 1] = value1
+                    frame = base if level2 == 0 else display[slot2]
+                    datastore[frame + value2] = value1
+                    return next
+
+                return handler
+
+            if op1 != OP_CODE.LOD:
+                return None
+
+            if op2 == OP_CODE.STO:
+                next = index + 2
+
+                def handler():
+                    frame = base if level1 == 0 else display[slot1]
+                    value = datastore[topstack + 1] = datastore[frame + value1]
+                    frame = base if level2 == 0 else display[slot2]
+                    datastore[frame + value2] = value
+                    return next
+
+                return handler
+
+            if (
+                op2 not in (OP_CODE.LOD, OP_CODE.LIT)
+                or op3 != OP_CODE.OPR
+                or operation not in self.OPERATION_MAP
+            ):
+                return None
+
+            apply = self.OPERATION_MAP[operation]
+            literal = op2 == OP_CODE.LIT
+
+            if literal and op4 == OP_CODE.STO and (level4, value4) == (level1, value1):
+                next = index + 4
+
+                def handler():
+                    frame = base if level1 == 0 else display[slot1]
+                    result = datastore[topstack + 1] = apply(
+                        datastore[frame + value1], value2
+                    )
+                    datastore[topstack + 2] = value2
+                    datastore[frame + value1] = result
+                    return next
+
+                return handler
+
+            if op4 == OP_CODE.JPC:
+                next = index + 4
+
+                def handler():
+                    frame = base if level1 == 0 else display[slot1]
+                    if literal:
+                        rhs = value2
+                    else:
+                        rhs = datastore[(base if level2 == 0 else display[slot2]) + value2]
+                    result = datastore[topstack + 1] = apply(datastore[frame + value1], rhs)
+                    datastore[topstack + 2] = rhs
+                    return next if result else value4
+
+                return handler
+
+            next = index + 3
+
+            def handler():
+                nonlocal topstack
+                frame = base if level1 == 0 else display[slot1]
+                if literal:
+                    rhs = value2
+                else:
+                    rhs = datastore[(base if level2 == 0 else display[slot2]) + value2]
+                topstack += 1
+                datastore[topstack] = apply(datastore[frame + value1], rhs)
+                datastore[topstack + 1] = rhs
+                return next
+
+            return handler
+
+        factories = {
+            OP_CODE.LIT: lit,
+            OP_CODE.OPR: opr,
+            OP_CODE.LOD: lod,
+            OP_CODE.STO: sto,
+            OP_CODE.CAL: cal,
+            OP_CODE.INT: int_,
+            OP_CODE.DET: det,
+            OP_CODE.JMP: jmp,
+            OP_CODE.JPC: jpc,
+        }
+
+        handlers = [
+            factories.get(op_code, nop)(level, value, index + 1, depths[index])
+            for index, (op_code, level, value) in enumerate(code)
+        ]
+        if self.superinstructions:
+            for index in range(len(code)):
+                handlers[index] = fuse(index) or handlers[index]
+
+        self.get_registers = get_registers
+        self.set_registers = set_registers
+        self.display = display
+        self.display_stack = display_stack
+        return handlers
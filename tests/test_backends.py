@@ -0,0 +1,20 @@
+from unittest import TestCase
+
+from pl0 import AST_BACKENDS, VM, ASTOptimizer, Generator, Parser
+
+from .test_peephole import CONSTANTS
+from .test_python_backend import OUTER
+from .test_snapshots import PROGRAMS, interpret
+from .test_vm import NESTED
+
+
+class ASTBackendsTestCases(TestCase):
+    def test_matches_stack_vm(self):
+        programs = [("nested", NESTED), ("constants", CONSTANTS), ("outer", OUTER)]
+        for name, program in PROGRAMS + programs:
+            ast = Parser.parse(program)
+            expected = interpret(VM(Generator.generate_code(ast), stack_size=5000))
+            for tree in (ast, ASTOptimizer.generate_code(ast)):
+                for backend, engine in AST_BACKENDS.items():
+                    output = interpret(engine.from_ast(tree))
+                    self.assertEqual(output, expected, f"{backend} {name}")
@@ -0,0 +1,62 @@
+from unittest import TestCase
+
+from pl0.batch import run_batch, run_program
+
+PROGRAM = """\
+var i;
+begin
+    i := 0;
+    while i < {count} do
+    begin
+        write i * i;
+        i := i + 1
+    end
+end.
+"""
+
+
+def programs(count):
+    return [(f"program{n}", PROGRAM.format(count=n)) for n in range(count)]
+
+
+class BatchTestCases(TestCase):
+    def test_run_program(self):
+        result = run_program(3, "squares", PROGRAM.format(count=4))
+        self.assertEqual(result.index, 3)
+        self.assertEqual(result.name, "squares")
+        self.assertEqual(result.values, [0, 1, 4, 9])
+        self.assertEqual(result.output, "0\n1\n4\n9\n")
+        self.assertIsNone(result.error)
+        self.assertGreater(result.elapsed, 0)
+
+    def test_errors(self):
+        result = run_program(0, "syntax", "var ;")
+        self.assertIn("must be followed by an identifier", result.error)
+        self.assertEqual(result.values, [])
+
+        result = run_program(0, "division", "begin write 1; write 1 / 0 end.")
+        self.assertEqual(result.values, [1])
+        self.assertTrue(result.error.startswith("ZeroDivisionError"))
+
+    def test_ordered(self):
+        for jobs in (1, 2):
+            for backend in ("vm", "closures"):
+                results = list(run_batch(programs(12), jobs=jobs, backend=backend))
+                self.assertEqual([result.index for result in results], list(range(12)))
+                for n, result in enumerate(results):
+                    self.assertEqual(result.name, f"program{n}")
+                    self.assertEqual(result.values, [i * i for i in range(n)])
+
+    def test_unordered(self):
+        results = list(run_batch(programs(12), jobs=2, ordered=False, chunk_size=1))
+        results.sort(key=lambda result: result.index)
+        self.assertEqual([result.index for result in results], list(range(12)))
+        for n, result in enumerate(results):
+            self.assertEqual(result.values, [i * i for i in range(n)])
+
+    def test_failures_are_isolated(self):
+        batch = programs(3) + [("bad", "begin write 1 / 0 end.")] + programs(2)
+        results = list(run_batch(batch, jobs=2, optimize=1, chunk_size=1))
+        failed = [result.name for result in results if result.error is not None]
+        self.assertEqual(failed, ["bad"])
+        self.assertEqual(results[5].values, [0])
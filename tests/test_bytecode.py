@@ -0,0 +1,111 @@
+import os
+import tempfile
+import tracemalloc
+from unittest import TestCase
+
+from pl0 import BytecodeGenerator, Generator, Parser
+from pl0.bytecode import HEADER, BytecodeException, CodeObject
+
+from .test_snapshots import PROGRAMS
+
+
+class CodeObjectTestCases(TestCase):
+    def test_from_instructions(self):
+        for _, program in PROGRAMS:
+            ast = Parser.parse(program)
+            instructions = Generator.generate_code(ast)
+            code = CodeObject.from_instructions(instructions)
+
+            self.assertEqual(code, BytecodeGenerator.generate_code(ast))
+            self.assertEqual(code.disassemble(), instructions)
+            self.assertEqual(len(code), len(instructions))
+            self.assertEqual(list(code[-1]), instructions[-1])
+
+    def test_constants(self):
+        code = CodeObject.from_instructions(
+            [["LIT", 0, 10], ["LIT", 0, 2 ** 80], ["LIT", 0, 10], ["LIT", 0, -5]]
+        )
+        self.assertEqual(code.constants, [10, 2 ** 80, -5])
+        self.assertEqual(list(code.code), [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 2])
+
+    def test_encoding_roundtrip(self):
+        instructions = [
+            ["INT", 0, 2 ** 40],
+            ["LOD", 3, -1],
+            ["STO", 0, -(2 ** 63)],
+            ["LIT", 0, -(2 ** 100)],
+            ["LIT", 0, 2 ** 63 - 1],
+            ["CAL", 2 ** 31, 2 ** 63 - 1],
+            ["JMP", 0, 0],
+        ]
+        code = CodeObject.from_instructions(instructions)
+        self.assertEqual(code.disassemble(), instructions)
+        self.assertEqual([list(code[i]) for i in range(-7, 7)], instructions * 2)
+        self.assertEqual(CodeObject.from_buffer(code.to_bytes()), code)
+
+    def test_size(self):
+        ast = Parser.parse(PROGRAMS[0][1])
+        instructions = Generator.generate_code(ast) * 20
+
+        tracemalloc.start()
+        try:
+            listed = [list(instruction) for instruction in instructions]
+            list_size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.clear_traces()
+            encoded = CodeObject.from_instructions(listed)
+            code_size = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+        # three machine words per instruction instead of a list of three objects
+        self.assertEqual(encoded.code.itemsize * len(encoded.code), 24 * len(listed))
+        self.assertLess(code_size * 3, list_size)
+
+    def test_object_file_roundtrip(self):
+        for _, program in PROGRAMS:
+            code = BytecodeGenerator.generate_code(Parser.parse(program))
+            code.add_constant(-(2 ** 70))
+            self.assertEqual(CodeObject.from_buffer(code.to_bytes()), code)
+
+    def test_load(self):
+        code = BytecodeGenerator.generate_code(Parser.parse(PROGRAMS[0][1]))
+        fd, path = tempfile.mkstemp(suffix=".pl0c")
+        os.close(fd)
+        try:
+            code.dump(path)
+            self.assertTrue(CodeObject.is_object_file(path))
+            loaded = CodeObject.load(path)
+            self.assertIsInstance(loaded.code, memoryview)
+            self.assertEqual(loaded.disassemble(), code.disassemble())
+        finally:
+            os.remove(path)
+
+    def test_invalid_object_files(self):
+        data = CodeObject.from_instructions([["JMP", 0, 1]]).to_bytes()
+
+        with self.assertRaises(BytecodeException):
+            CodeObject.from_buffer(b"PL0")
+        with self.assertRaises(BytecodeException):
+            CodeObject.from_buffer(b"NOPE" + data[4:])
+        with self.assertRaises(BytecodeException):
+            CodeObject.from_buffer(data[:4] + b"\xff\xff" + data[6:])
+        with self.assertRaises(BytecodeException):
+            CodeObject.from_buffer(data[: HEADER.size + 8])
+
+    def test_truncated_constants(self):
+        data = CodeObject.from_instructions([["LIT", 0, 2 ** 80]]).to_bytes()
+        end = HEADER.size + 3 * 8
+
+        for size in (end, end + 2, end + 4, len(data) - 1):
+            with self.assertRaises(BytecodeException):
+                CodeObject.from_buffer(data[:size])
+        self.assertEqual(CodeObject.from_buffer(data).constants, [2 ** 80])
+
+    def test_load_empty_file(self):
+        fd, path = tempfile.mkstemp(suffix=".pl0c")
+        os.close(fd)
+        try:
+            with self.assertRaises(BytecodeException):
+                CodeObject.load(path)
+        finally:
+            os.remove(path)
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import tempfile
+from unittest import TestCase
+
+from pl0 import (
+    CompilationCache,
+    ListSink,
+    PeepholeOptimizer,
+    compile_code,
+    run,
+    transpile,
+)
+from pl0.constants import COMPILER_VERSION
+
+from .test_snapshots import PROGRAMS
+
+# A digest of the compiler's output by COMPILER_VERSION. When the output
+# changes COMPILER_VERSION has to be bumped, so cached entries of the
+# old compiler aren't used, and the digest recorded for the new version.
+FINGERPRINTS = {
+    "3": "5e05a1e73a56b0021a9be4070fda5e65956956b535f969557c55e3d08416ca16",
+}
+
+
+def fingerprint():
+    digest = hashlib.sha256()
+    for _, program in PROGRAMS:
+        for level in sorted(PeepholeOptimizer.LEVELS):
+            code = compile_code(program, optimize=level)
+            digest.update(repr(code.disassemble()).encode("utf8"))
+        for optimize in (0, 1):
+            output = transpile(program, "python", optimize=optimize)
+            digest.update(output.encode("utf8"))
+    return digest.hexdigest()
+
+
+class CompilationCacheTestCases(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = CompilationCache(directory=self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_key(self):
+        key = self.cache.key("var x;.", "pl0c")
+        self.assertEqual(key, self.cache.key("var x;.", "pl0c"))
+        self.assertNotEqual(key, self.cache.key("var y;.", "pl0c"))
+        self.assertNotEqual(key, self.cache.key("var x;.", "py"))
+        self.assertNotEqual(key, self.cache.key("var x;.", "pl0c", "-O1"))
+
+    def test_get_put(self):
+        self.assertIsNone(self.cache.get("missing"))
+        self.cache.put("present", b"data")
+        self.assertEqual(self.cache.get("present"), b"data")
+
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual((stats["entries"], stats["size"]), (1, 4))
+        self.assertEqual(os.listdir(self.directory.name), ["present"])
+
+    def test_unwritable_directory(self):
+        # a directory below a regular file can neither be created nor read
+        blocker = os.path.join(self.directory.name, "file")
+        with open(blocker, "wb"):
+            pass
+        cache = CompilationCache(directory=os.path.join(blocker, "cache"))
+
+        cache.put("key", b"data")
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+        program = PROGRAMS[0][1]
+        self.assertEqual(compile_code(program, cache=cache), compile_code(program))
+        self.assertEqual(
+            transpile(program, "python", cache=cache), transpile(program, "python")
+        )
+
+    def test_corrupt_entries(self):
+        program = PROGRAMS[0][1]
+        code = compile_code(program)
+        values = ListSink()
+        run(program, backend="python", output=values)
+
+        for data in (b"", b"PL0", b"PL0C" + b"\xff" * 40, b"\xff\xfe"):
+            compile_code(program, cache=self.cache)
+            run(program, backend="python", cache=self.cache, output=ListSink())
+            for name in os.listdir(self.directory.name):
+                with open(os.path.join(self.directory.name, name), "wb") as f:
+                    f.write(data)
+            self.cache.hits = self.cache.misses = 0
+
+            self.assertEqual(compile_code(program, cache=self.cache), code)
+            sink = ListSink()
+            run(program, backend="python", cache=self.cache, output=sink)
+            self.assertEqual(sink.values, values.values)
+            self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+
+            # the entries were compiled again and overwritten
+            self.assertEqual(compile_code(program, cache=self.cache), code)
+            run(program, backend="python", cache=self.cache, output=ListSink())
+            self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+
+    def test_compiler_version(self):
+        self.assertEqual(
+            fingerprint(),
+            FINGERPRINTS.get(COMPILER_VERSION),
+            "the compiler's output changed, bump COMPILER_VERSION",
+        )
+
+    def test_evict_least_recently_used(self):
+        self.cache.max_size = 10
+        self.cache.put("a", b"aaaa")
+        self.cache.put("b", b"bbbb")
+        os.utime(self.cache.path("a"), (1, 1))
+        os.utime(self.cache.path("b"), (2, 2))
+
+        # reading "a" makes "b" the least recently used entry
+        self.cache.get("a")
+        self.cache.put("c", b"cccc")
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["a", "c"])
+
+    def test_compile(self):
+        for _, program in PROGRAMS:
+            code = compile_code(program, cache=self.cache)
+            self.assertEqual(compile_code(program, cache=self.cache), code)
+        self.assertEqual(self.cache.hits, len(PROGRAMS))
+        self.assertEqual(self.cache.misses, len(PROGRAMS))
+
+    def test_transpile(self):
+        for _, program in PROGRAMS:
+            output = transpile(program, "python", cache=self.cache)
+            self.assertEqual(transpile(program, "python", cache=self.cache), output)
+        self.assertEqual(self.cache.hits, len(PROGRAMS))
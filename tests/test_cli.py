@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+
+from pl0 import Parser, RegisterGenerator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROGRAM = "var x;\nbegin x := 3; write x end.\n"
+
+
+def main(*args):
+    """
+    Run `python -m pl0` on `PROGRAM` with `args`, returning the exit
+    status, stdout and stderr.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "prog.pl0")
+        with open(path, "w", encoding="utf8") as f:
+            f.write(PROGRAM)
+        result = subprocess.run(
+            [sys.executable, "-m", "pl0", "--no-cache", *args, path],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+        )
+    return result.returncode, result.stdout, result.stderr
+
+
+class CommandTestCases(TestCase):
+    def test_run(self):
+        self.assertEqual(main(), (0, "3\n", ""))
+
+    def test_register_codegen(self):
+        status, output, _ = main("--backend", "register", "--codegen")
+        self.assertEqual(status, 0)
+        code = RegisterGenerator.generate_code(Parser.parse(PROGRAM))
+        self.assertEqual(output, f"{code}\n")
+
+    def test_closures_codegen(self):
+        status, output, error = main("--backend", "closures", "--codegen")
+        self.assertEqual((status, output), (2, ""))
+        self.assertIn("--codegen isn't supported by the closures backend", error)
@@ -0,0 +1,31 @@
+from unittest import TestCase
+
+from pl0 import ClosureBackend, Parser
+
+from .test_snapshots import interpret
+
+
+class ClosureBackendTestCases(TestCase):
+    def test_parameters_are_passed_by_value(self):
+        program = """\
+var a, b;
+
+procedure p(x);
+    var y;
+begin
+    x := x + 1;
+    y := x;
+    b := y
+end;
+
+begin
+    a := 1;
+    call p(a);
+    write a;
+    write b
+end.
+"""
+        backend = ClosureBackend.from_ast(Parser.parse(program))
+        self.assertEqual(interpret(backend), "1\n2\n")
+        # static link, a and b
+        self.assertEqual(backend.frame, [0, 1, 2])
@@ -0,0 +1,142 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from pl0 import VM, CodeObject, Generator, ListSink, Parser, PeepholeOptimizer
+from pl0.jit import TracingVM
+
+from .test_snapshots import PROGRAMS
+
+LOOPS = """\
+var i, j, odds, total;
+procedure count(n);
+    var k;
+begin
+    k := 0;
+    while k < n do
+    begin
+        total := total + k;
+        k := k + 1
+    end;
+    if n > 0 then
+        call count(n - 1)
+end;
+begin
+    i := 0;
+    while i < 100 do
+    begin
+        if odd i then
+            odds := odds + 1;
+        j := 0;
+        while j < i do
+            j := j + 2;
+        i := i + 1
+    end;
+    call count(30);
+    write odds;
+    write total;
+    i := 0;
+    while i < 60 do
+    begin
+        write -i;
+        i := i + 1
+    end
+end.
+"""
+
+DIVISION = """\
+var i, x;
+begin
+    i := 80;
+    while 1 = 1 do
+    begin
+        x := x + 1000 / i;
+        i := i - 1
+    end
+end.
+"""
+
+
+def generate(program, optimize=0):
+    code = Generator.generate_code(Parser.parse(program))
+    if optimize:
+        code = PeepholeOptimizer.for_level(optimize).optimize(code)
+    return code
+
+
+def execute(engine, code, **kwargs):
+    output = ListSink()
+    vm = engine(code, output=output, stack_size=1000, **kwargs)
+    vm.interpret()
+    return vm, output.values
+
+
+class TracingVMTestCases(TestCase):
+    def test_matches_vm(self):
+        for name, program in [*PROGRAMS, ("loops", LOOPS)]:
+            for optimize in (0, 2):
+                code = generate(program, optimize)
+                expected, values = execute(VM, code)
+                for code in (code, CodeObject.from_instructions(code)):
+                    for threshold in (1, 3, 50):
+                        vm, output = execute(TracingVM, code, threshold=threshold)
+                        self.assertEqual(output, values, name)
+                        self.assertEqual(vm.datastore, expected.datastore, name)
+                        self.assertEqual(vm.topstack, expected.topstack, name)
+
+    def test_decoded_once(self):
+        code = CodeObject.from_instructions(generate(LOOPS))
+        expected, values = execute(VM, code)
+        vm = TracingVM(code, threshold=5, output=ListSink(), stack_size=1000)
+        # the instructions are decoded up front, not fetched from the code object
+        with patch.object(CodeObject, "__getitem__", side_effect=AssertionError):
+            vm.interpret()
+        self.assertEqual(vm.output.values, values)
+        self.assertEqual(vm.datastore, expected.datastore)
+
+    def test_traces(self):
+        code = generate(LOOPS)
+        vm, _ = execute(TracingVM, code, threshold=5)
+        compiled = {head for head, trace in vm.traces.items() if trace is not None}
+        # the inner loop, the loop in count, but not the outer loop which
+        # contains the inner one or the loop writing values
+        self.assertEqual(len(compiled), 2)
+        self.assertEqual(len(vm.traces), 4)
+        for head in compiled:
+            trace = vm.traces[head]
+            self.assertEqual(trace.steps[0][0], head)
+            self.assertEqual(trace.steps[-1][1], "JMP")
+
+        # count's loop is run in the frames of all its recursive calls
+        loop = max(compiled, key=lambda head: vm.traces[head].levels)
+        self.assertEqual(vm.traces[loop].levels, [0, 1])
+
+    def test_guards(self):
+        program = """\
+var i, evens, odds;
+begin
+    i := 0;
+    while i < 200 do
+    begin
+        if odd i then odds := odds + i;
+        if odd i + 1 then evens := evens + i;
+        i := i + 1
+    end;
+    write evens;
+    write odds
+end.
+"""
+        vm, values = execute(TracingVM, generate(program), threshold=2)
+        self.assertEqual(values, [9900, 10000])
+        (trace,) = vm.traces.values()
+        self.assertEqual(trace.source.count("return"), 3)
+
+    def test_error_in_trace(self):
+        code = generate(DIVISION)
+        expected = VM(code)
+        with self.assertRaises(ZeroDivisionError):
+            expected.interpret()
+        vm = TracingVM(code, threshold=2)
+        with self.assertRaises(ZeroDivisionError):
+            vm.interpret()
+        self.assertEqual(vm.datastore, expected.datastore)
+        self.assertIsNotNone(vm.traces[next(iter(vm.traces))])
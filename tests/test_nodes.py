@@ -0,0 +1,57 @@
+import pickle
+from unittest import TestCase
+
+from pl0.nodes import Binary, Number, Var, from_dicts, node
+from pl0.parser import Parser
+
+
+class NodeTestCases(TestCase):
+    def test_dict_compatibility(self):
+        var = Var(name="x")
+        self.assertEqual(var.type, "Var")
+        self.assertEqual(var["type"], "Var")
+        self.assertEqual(var["name"], "x")
+        self.assertEqual(dict(var), {"type": "Var", "name": "x"})
+        self.assertEqual(var, {"type": "Var", "name": "x"})
+        self.assertEqual({"type": "Var", "name": "x"}, var)
+        self.assertNotEqual(var, {"type": "Var", "name": "y"})
+        self.assertEqual(repr(var), "{'type': 'Var', 'name': 'x'}")
+        self.assertNotIn("line", var)
+        self.assertIsNone(var.get("line"))
+        with self.assertRaises(KeyError):
+            var["value"]
+
+        var["line"] = 3
+        self.assertIn("line", var)
+        self.assertEqual(var, {"type": "Var", "name": "x", "line": 3})
+        with self.assertRaises(KeyError):
+            var["value"] = 1
+
+    def test_nested(self):
+        binary = node(
+            "Binary", left=Number(value=1), right=Number(value=2), operator="PLUS"
+        )
+        self.assertIsInstance(binary, Binary)
+        self.assertEqual(binary.left.value, 1)
+        self.assertEqual(binary["right"]["value"], 2)
+
+    def test_from_dicts(self):
+        dicts = [
+            {"type": "Var", "name": "a", "line": 1},
+            {
+                "type": "Output",
+                "value": {
+                    "type": "Unary",
+                    "operator": "MINUS",
+                    "right": {"type": "Identifier", "name": "a"},
+                },
+            },
+        ]
+        ast = from_dicts(dicts)
+        self.assertEqual(ast, dicts)
+        self.assertEqual(ast[0].line, 1)
+        self.assertEqual(ast[1].value.right.name, "a")
+
+    def test_pickle(self):
+        ast = Parser.parse("var a; begin a := 2 * (a + 1); write a end.")
+        self.assertEqual(pickle.loads(pickle.dumps(ast)), ast)
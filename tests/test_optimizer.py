@@ -0,0 +1,119 @@
+from unittest import TestCase
+
+from pl0 import ASTOptimizer, Generator, Parser, PythonTranspiler
+
+from .test_peephole import CONSTANTS, execute
+from .test_snapshots import PROGRAMS
+
+
+def optimize(program):
+    return ASTOptimizer.generate_code(Parser.parse(program))
+
+
+class ASTOptimizerTestCases(TestCase):
+    maxDiff = None
+
+    def test_fold_expressions(self):
+        self.assertEqual(
+            optimize("const a = 3; var x; x := -a + 2 * (a - 1) - 10 / (a + 2)."),
+            [
+                {"type": "Const", "name": "a", "value": 3},
+                {"type": "Var", "name": "x"},
+                {"type": "Assignment", "name": "x", "value": {"type": "Number", "value": -1}},
+            ],
+        )
+        # division by zero is left for run time
+        self.assertEqual(
+            optimize("var x; x := 1 / 0.")[1]["value"]["type"], "Binary"
+        )
+
+    def test_scopes(self):
+        ast = optimize(
+            """\
+            const a = 1;
+            procedure p;
+                var a;
+                a := a + 1;
+            write a.
+            """
+        )
+        self.assertEqual(
+            ast[1]["blocks"][1]["value"]["left"], {"type": "Identifier", "name": "a"}
+        )
+        self.assertEqual(ast[2]["value"], {"type": "Number", "value": 1})
+
+    def test_dead_branches(self):
+        ast = optimize(
+            """\
+            var x;
+            begin
+                if 1 > 2 then write 1;
+                if odd 3 then write 2;
+                while 0 = 1 do write 3;
+                while x < 1 do if 0 = 1 then write 4;
+                if x < 1 then if 1 = 0 then write 5
+            end.
+            """
+        )
+        self.assertEqual(
+            ast[1]["statements"],
+            [
+                {"type": "Output", "value": {"type": "Number", "value": 2}},
+                {
+                    "type": "Loop",
+                    "condition": {
+                        "type": "Binary",
+                        "left": {"type": "Identifier", "name": "x"},
+                        "right": {"type": "Number", "value": 1},
+                        "operator": "LESS",
+                    },
+                    "body": {"type": "Block", "statements": []},
+                },
+            ],
+        )
+        # a procedure always keeps a statement
+        self.assertEqual(
+            optimize("procedure p; if 0 = 1 then write 1; call p.")[0]["blocks"],
+            [{"type": "Block", "statements": []}],
+        )
+
+    def test_groupings(self):
+        ast = optimize(
+            """\
+            var a, b, c;
+            begin
+                a := ((b + c));
+                a := (b + c) * (a);
+                a := (a * b) + (b - c);
+                a := a - (b - c);
+                write -(a + b);
+                if (a) < (b + 1) then write a;
+                if odd (a + 1) then write (b)
+            end.
+            """
+        )
+        self.assertEqual(
+            PythonTranspiler.generate_code(ast),
+            """\
+a = 0
+b = 0
+c = 0
+a = b + c
+a = (b + c) * a
+a = a * b + (b - c)
+a = a - (b - c)
+print(-(a + b))
+if a < b + 1:
+    print(a)
+if (a + 1) % 2 == 1:
+    print(b)
+""",
+        )
+
+    def test_programs(self):
+        for program in [program for _, program in PROGRAMS] + [CONSTANTS]:
+            ast = Parser.parse(program)
+            self.assertEqual(
+                execute(Generator.generate_code(ASTOptimizer.generate_code(ast))),
+                execute(Generator.generate_code(ast)),
+            )
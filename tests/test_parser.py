@@ -1,6 +1,9 @@
+import os
+import tempfile
+from io import StringIO
 from unittest import TestCase
 
-from pl0.parser import Lexer, Parser, ParserException, Symbol
+from pl0.parser import BytesScanner, Lexer, Parser, ParserException, Scanner, Symbol
 
 
 class LexerTestCases(TestCase):
@@ -103,6 +106,116 @@ class LexerTestCases(TestCase):
             self.assertEqual(token, expected_symbol, msg=index)
             self.assertEqual(token.value, expected_value, msg=index)
 
+    def test_tokens(self):
+        prog = "var a, b;\nbegin\n  a := 10;\n  b := a <= 99\nend."
+        expected = [repr(token) for token in Lexer(prog).tokens()]
+        self.assertEqual(len(expected), 17)
+        self.assertEqual(expected[-1], "5:4 PERIOD None")
+
+        # token boundaries don't have to line up with chunk boundaries
+        for size in (1, 2, 3, 7):
+            chunks = [prog[i : i + size] for i in range(0, len(prog), size)]
+            tokens = [repr(token) for token in Lexer(iter(chunks)).tokens()]
+            self.assertEqual(tokens, expected)
+            stream = Lexer(StringIO(prog), chunk_size=size).tokens()
+            self.assertEqual([repr(token) for token in stream], expected)
+
+    def test_bounded_memory(self):
+        line = "a := a + 1;\n"
+        lexer = Lexer((line * 100 for _ in range(100)), chunk_size=len(line) * 100)
+        held = 0
+        for token in lexer.tokens():
+            held = max(held, len(lexer.input))
+        self.assertEqual(lexer.line, 10001)
+        # at most a chunk and the two lines before it
+        self.assertLessEqual(held, len(line) * 102)
+
+    def test_long_line(self):
+        prog = "var a;\nbegin " + "a := a + 1; " * 10000 + "a := ; write a end."
+        chunks = [prog[i : i + 100] for i in range(0, len(prog), 100)]
+        for lexer in (Lexer(iter(chunks)), Scanner(iter(chunks))):
+            held = 0
+            for token in lexer.tokens():
+                held = max(held, len(lexer.input))
+            self.assertEqual(lexer.line, 2)
+            # at most a chunk and the end of the line before the cursor
+            self.assertLessEqual(held, Lexer.CONTEXT_SIZE + 200)
+
+        for source in (prog, iter(chunks), StringIO(prog)):
+            with self.assertRaises(ParserException) as context:
+                Parser(source).program()
+            line, caret = context.exception.message.split("\n")[-2:]
+            self.assertTrue(line.endswith("a := ; write a end."))
+            self.assertEqual(line[: caret.index("^") + 1][-6:], "a := ;")
+
+    def test_error_context(self):
+        prog = "var a;\nbegin\n  a := 1;\n  a := ;\n  write a\nend."
+        messages = []
+        for source in (prog, (prog[i : i + 3] for i in range(0, len(prog), 3))):
+            with self.assertRaises(ParserException) as context:
+                Parser(source).program()
+            messages.append(context.exception.message)
+        self.assertEqual(messages[0], messages[1])
+        self.assertTrue(messages[0].endswith("  a := 1;\n  a := ;\n       ^\n  write a"))
+
+    def test_scanner(self):
+        def scan(lexer):
+            tokens = [repr(token) for token in lexer.tokens()]
+            return tokens, lexer.line, lexer.column
+
+        sources = [
+            "var a, b;\nbegin\n  a := 10;\n  b := a <= 99\nend.",
+            "\n\n  const c = 3;\twrite c # 2.\n",
+            "a:b !x != 12ab <>>=",
+            "x := 1:",
+            "x := 1:!",
+            "",
+        ]
+        for source in sources:
+            expected = scan(Lexer(source))
+            self.assertEqual(scan(Scanner(source)), expected, msg=source)
+            for size in (1, 2, 3):
+                chunks = [source[i : i + size] for i in range(0, len(source), size)]
+                self.assertEqual(scan(Scanner(iter(chunks))), expected, msg=source)
+            stream = Scanner(StringIO(source), chunk_size=2)
+            self.assertEqual(scan(stream), expected, msg=source)
+            for buffer in (source.encode(), memoryview(source.encode())):
+                self.assertEqual(scan(BytesScanner(buffer)), expected, msg=source)
+
+    def test_source_tokens(self):
+        source = b"Var abc; BEGIN abc := 42; write Abc1 end."
+        tokens = list(BytesScanner(memoryview(source)).tokens())
+        self.assertEqual(tokens[0], Symbol.VAR)
+        self.assertEqual((tokens[1].start, tokens[1].end), (4, 7))
+        self.assertEqual(tokens[1].value, "abc")
+        self.assertIs(tokens[1].value, tokens[4].value)
+        self.assertEqual(tokens[6].value, 42)
+        self.assertEqual(tokens[9].value, "Abc1")
+        self.assertIsNone(tokens[3].value)
+
+    def test_parse_file(self):
+        progs = [
+            "const max = 10;\nvar i;\nbegin\n  i := 0;\n"
+            "  while i < max do\n  begin\n    write i;\n    i := i + 1\n  end\nend.\n",
+            "var a;\nbegin\n  a := 1;\n  a := ;\n  write a\nend.",
+            "",
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "prog.pl0")
+            for prog in progs:
+                with open(path, "w", encoding="utf8") as f:
+                    f.write(prog)
+                try:
+                    expected = Parser(prog, positions=True).program()
+                except ParserException as e:
+                    with self.assertRaises(ParserException) as context:
+                        with open(path, "rb") as f:
+                            Parser(BytesScanner(f.read())).program()
+                    self.assertEqual(context.exception.message, e.message)
+                else:
+                    ast = Parser.parse_file(path, positions=True)
+                    self.assertEqual(ast, expected)
+
 
 class ParserTestCases(TestCase):
     maxDiff = None
@@ -0,0 +1,130 @@
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import TestCase
+
+from pl0 import VM, Generator, Parser
+from pl0.peephole import (
+    PeepholeOptimizer,
+    constant_branches,
+    fold_constants,
+    merge_stack_adjustments,
+    remove_unreachable,
+    thread_jumps,
+)
+
+from .test_snapshots import PROGRAMS
+
+CONSTANTS = """\
+const a = 3;
+var x;
+
+procedure p(u, v);
+begin
+    write u + v;
+    if 0 = 1 then write 9;
+    if 2 > 1 then write -(a * 2 + 1)
+end;
+
+begin
+    x := -a + 2 * 3 - 10 / (a - 1);
+    write x;
+    call p(x, 2);
+    call p(1, 1);
+    while 1 = 0 do x := 1;
+    if odd 3 then write 3;
+    if odd 4 then write 5
+end.
+"""
+
+
+def execute(code):
+    vm = VM(code)
+    output = StringIO()
+    with redirect_stdout(output):
+        vm.interpret()
+    return output.getvalue(), vm.topstack
+
+
+class PeepholeOptimizerTestCases(TestCase):
+    def optimize(self, passes, code):
+        return PeepholeOptimizer(passes).optimize(code)
+
+    def test_fold_constants(self):
+        self.assertEqual(
+            self.optimize(
+                [fold_constants],
+                [["LIT", 0, 2], ["LIT", 0, 3], ["OPR", 0, 4], ["LIT", 0, 1],
+                 ["OPR", 0, 2], ["OPR", 0, 1], ["OPR", 0, 14]],
+            ),
+            [["LIT", 0, -7], ["OPR", 0, 14]],
+        )
+        # division by zero is left for the VM
+        code = [["LIT", 0, 2], ["LIT", 0, 0], ["OPR", 0, 5]]
+        self.assertEqual(self.optimize([fold_constants], code), code)
+        # never fold across a jump target
+        code = [["LIT", 0, 2], ["LIT", 0, 3], ["OPR", 0, 2], ["JMP", 0, 1]]
+        self.assertEqual(self.optimize([fold_constants], code), code)
+
+    def test_merge_stack_adjustments(self):
+        self.assertEqual(
+            self.optimize(
+                [merge_stack_adjustments],
+                [["CAL", 0, 0], ["DET", 0, 1], ["DET", 0, 1], ["INT", 0, 0],
+                 ["DET", 0, 1], ["INT", 0, 4], ["OPR", 0, 0]],
+            ),
+            [["CAL", 0, 0], ["INT", 0, 1], ["OPR", 0, 0]],
+        )
+
+    def test_constant_branches(self):
+        self.assertEqual(
+            self.optimize(
+                [constant_branches],
+                [["LIT", 0, 0], ["JPC", 0, 3], ["LIT", 0, 1], ["LIT", 0, 1],
+                 ["JPC", 0, 0]],
+            ),
+            [["JMP", 0, 2], ["LIT", 0, 1]],
+        )
+
+    def test_thread_jumps(self):
+        self.assertEqual(
+            self.optimize(
+                [thread_jumps],
+                [["JMP", 0, 2], ["JPC", 0, 2], ["JMP", 0, 3], ["JMP", 0, 5],
+                 ["OPR", 0, 14], ["OPR", 0, 0]],
+            ),
+            [["JMP", 0, 5], ["JPC", 0, 5], ["JMP", 0, 5], ["JMP", 0, 5],
+             ["OPR", 0, 14], ["OPR", 0, 0]],
+        )
+        self.assertEqual(
+            self.optimize([thread_jumps], [["JMP", 0, 1], ["JMP", 0, 2], ["OPR", 0, 0]]),
+            [["JMP", 0, 1], ["OPR", 0, 0]],
+        )
+        self.assertEqual(
+            self.optimize([thread_jumps], [["JPC", 0, 1], ["OPR", 0, 0]]),
+            [["DET", 0, 1], ["OPR", 0, 0]],
+        )
+
+    def test_remove_unreachable(self):
+        self.assertEqual(
+            self.optimize(
+                [remove_unreachable],
+                [["JMP", 0, 4], ["INT", 0, 3], ["OPR", 0, 0], ["LIT", 0, 1],
+                 ["INT", 0, 3], ["CAL", 0, 1], ["OPR", 0, 0], ["OPR", 0, 14]],
+            ),
+            [["JMP", 0, 3], ["INT", 0, 3], ["OPR", 0, 0], ["INT", 0, 3],
+             ["CAL", 0, 1], ["OPR", 0, 0]],
+        )
+
+    def test_optimize_programs(self):
+        for program in [program for _, program in PROGRAMS] + [CONSTANTS]:
+            code = Generator.generate_code(Parser.parse(program))
+            expected = execute(code)
+
+            for level in PeepholeOptimizer.LEVELS:
+                optimizer = PeepholeOptimizer.for_level(level)
+                optimized = optimizer.optimize(code)
+                self.assertEqual(execute(optimized), expected)
+                self.assertEqual(optimizer.removed, len(code) - len(optimized))
+
+        self.assertEqual(optimizer.total, 69)
+        self.assertEqual(optimizer.removed, 44)
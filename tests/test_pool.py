@@ -0,0 +1,108 @@
+from unittest import TestCase
+
+from pl0 import VM, CodeObject, Generator, ListSink, Parser, ThreadedVM, VMPool
+from pl0.jit import TracingVM
+
+# writes in a loop, which leaves the values on the stack, and recursion
+PROGRAM = """\
+var n, i;
+procedure count(k);
+    var j;
+begin
+    j := k;
+    write j;
+    if k > 0 then
+        call count(k - 1)
+end;
+begin
+    i := 0;
+    while i < n do
+    begin
+        write i * i;
+        i := i + 1
+    end;
+    call count(n)
+end.
+"""
+
+ENGINES = (
+    (VM, {}),
+    (ThreadedVM, {}),
+    (ThreadedVM, {"superinstructions": False}),
+    (TracingVM, {}),
+)
+
+
+def generate(program, compact=False):
+    code = Generator.generate_code(Parser.parse(program))
+    return CodeObject.from_instructions(code) if compact else code
+
+
+def expected(n):
+    return [i * i for i in range(n)] + list(range(n, -1, -1))
+
+
+class VMPoolTestCases(TestCase):
+    def test_reset_clears_the_data_store(self):
+        for compact in (False, True):
+            for engine, kwargs in ENGINES:
+                vm = engine(generate(PROGRAM, compact), output=ListSink(), **kwargs)
+                vm.reset({3: 12})
+                vm.interpret()
+                self.assertEqual(vm.output.values, expected(12))
+                vm.reset()
+                self.assertEqual(vm.datastore, [0] * vm.stack_size)
+                self.assertEqual((vm.program, vm.base, vm.topstack), (0, 0, -1))
+
+    def test_reset_after_an_error(self):
+        program = "procedure p(k); begin write 1 / k; call p(k - 1) end; call p(40)."
+        for engine, kwargs in ENGINES:
+            vm = engine(generate(program), output=ListSink(), **kwargs)
+            with self.assertRaises(ZeroDivisionError):
+                vm.interpret()
+            vm.reset()
+            self.assertEqual(vm.datastore, [0] * vm.stack_size)
+
+    def test_runs_match_a_new_vm(self):
+        code = generate(PROGRAM)
+        for engine, kwargs in ENGINES:
+            sink = ListSink()
+            pool = VMPool(code, engine=engine, output=sink, **kwargs)
+            for n in (5, 0, 9, 3):
+                pool.run({3: n})
+            self.assertEqual(
+                sink.values, expected(5) + expected(0) + expected(9) + expected(3)
+            )
+            # every run reused the one VM
+            self.assertEqual(len(pool.idle), 1)
+
+    def test_uninitialized_variables(self):
+        sink = ListSink()
+        pool = VMPool(generate("var a; begin write a; a := 7 end."), output=sink)
+        for _ in range(3):
+            pool.run()
+        self.assertEqual(sink.values, [0, 0, 0])
+
+    def test_acquire(self):
+        pool = VMPool(generate(PROGRAM), engine=ThreadedVM, output=ListSink())
+        with pool.vm({3: 2}) as first:
+            with pool.vm({3: 4}) as second:
+                self.assertIsNot(first, second)
+                second.interpret()
+            first.interpret()
+        self.assertEqual(first.output.values, expected(4) + expected(2))
+        self.assertEqual(len(pool.idle), 2)
+        self.assertIs(pool.acquire(), first)
+
+    def test_output_of_a_pooled_vm(self):
+        for engine, kwargs in ENGINES:
+            pool = VMPool(generate(PROGRAM), engine=engine, output=ListSink(), **kwargs)
+            with pool.vm({3: 2}) as vm:
+                vm.interpret()
+            first = vm.output
+            with pool.vm({3: 3}) as vm:
+                # each run can write to a sink of its own
+                vm.output = ListSink()
+                vm.interpret()
+            self.assertEqual(first.values, expected(2), engine.__name__)
+            self.assertEqual(vm.output.values, expected(3), engine.__name__)
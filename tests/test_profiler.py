@@ -0,0 +1,135 @@
+from unittest import TestCase
+
+from pl0 import (
+    VM,
+    CodeObject,
+    Generator,
+    ListSink,
+    Parser,
+    PeepholeOptimizer,
+    Profiler,
+    SymbolTable,
+    ThreadedVM,
+)
+from pl0.constants import OP_CODE
+
+PROGRAM = """\
+var i, r;
+procedure fib(n);
+    var a;
+    procedure nothing;
+        a := a;
+begin
+    call nothing;
+    r := n;
+    if n >= 2 then
+    begin
+        call fib(n - 1);
+        a := r;
+        call fib(n - 2);
+        r := a + r
+    end
+end;
+begin
+    i := 0;
+    while i < 3 do
+    begin
+        call fib(6);
+        write r;
+        i := i + 1
+    end
+end.
+"""
+
+
+def generate(program, optimize=0):
+    symbols = SymbolTable()
+    code = Generator.generate_code(Parser.parse(program), symbols=symbols)
+    if optimize:
+        code = PeepholeOptimizer.for_level(optimize).optimize(code, symbols)
+    return code, symbols
+
+
+def profile(code, symbols, engine=VM):
+    profiler = Profiler(symbols)
+    sink = ListSink()
+    engine(code, output=sink, profiler=profiler).interpret()
+    return profiler, sink.values
+
+
+class SymbolTableTestCases(TestCase):
+    def test_procedures(self):
+        for optimize in (0, 1, 2):
+            code, symbols = generate(PROGRAM, optimize)
+            self.assertEqual(
+                sorted(symbols.procedures.values()), ["<main>", "fib", "fib.nothing"]
+            )
+            # every procedure is entered at the address it is called at
+            called = {value for op_code, _, value in code if op_code == OP_CODE.CAL}
+            names = {symbols.name(address) for address in called}
+            self.assertEqual(names, {"fib", "fib.nothing"})
+            for address, name in symbols.procedures.items():
+                self.assertEqual(code[address][0], OP_CODE.INT)
+                self.assertEqual(symbols.procedure_at(address), name)
+            self.assertEqual(symbols.procedure_at(len(code) - 1), "<main>")
+
+
+class ProfilerTestCases(TestCase):
+    def test_counts(self):
+        code, symbols = generate(PROGRAM)
+        profiler, values = profile(code, symbols)
+        self.assertEqual(values, [8, 8, 8])
+        self.assertEqual(profiler.executed, sum(profiler.counts.values()))
+
+        stats = {stats.name: stats for stats in profiler.procedures.values()}
+        # fib(6) makes 25 calls
+        self.assertEqual(stats["fib"].calls, 75)
+        self.assertEqual(stats["fib.nothing"].calls, 75)
+        self.assertEqual(stats["<main>"].calls, 1)
+        self.assertEqual(
+            sum(stats.instructions for stats in stats.values()), profiler.executed
+        )
+        self.assertAlmostEqual(stats["<main>"].time, sum(s.own for s in stats.values()))
+        self.assertLessEqual(stats["fib"].time, stats["<main>"].time)
+        self.assertEqual(profiler.stack, [])
+
+        # the while loop is the only one
+        ((jump, target), count), = profiler.back_edges.items()
+        self.assertEqual(count, 3)
+        self.assertLess(target, jump)
+        self.assertEqual(symbols.procedure_at(jump), "<main>")
+
+    def test_engines_agree(self):
+        code, symbols = generate(PROGRAM, optimize=2)
+        profiler, values = profile(code, symbols)
+        for engine, code in (
+            (ThreadedVM, code),
+            (VM, CodeObject.from_instructions(code)),
+        ):
+            other, other_values = profile(code, symbols, engine)
+            self.assertEqual(other_values, values)
+            self.assertEqual(other.counts, profiler.counts)
+            self.assertEqual(other.back_edges, profiler.back_edges)
+
+    def test_failing_program(self):
+        program = "procedure p(k); begin write 1 / k; call p(k - 1) end; call p(3)."
+        code, symbols = generate(program)
+        profiler = Profiler(symbols)
+        with self.assertRaises(ZeroDivisionError):
+            VM(code, output=ListSink(), profiler=profiler).interpret()
+        self.assertEqual(profiler.stack, [])
+        stats = {stats.name: stats for stats in profiler.procedures.values()}
+        self.assertEqual(stats["p"].calls, 4)
+
+    def test_report(self):
+        code, symbols = generate(PROGRAM)
+        profiler, _ = profile(code, symbols)
+        for sort in ("time", "own", "calls", "instructions", "name"):
+            report = profiler.report(sort=sort, limit=3)
+            self.assertIn("fib.nothing", report)
+        procedures = profiler.report(sort="name").split("\n\n")[1].splitlines()[1:]
+        self.assertEqual(
+            [line.split()[-1] for line in procedures], ["<main>", "fib", "fib.nothing"]
+        )
+        with self.assertRaises(ValueError):
+            profiler.report(sort="size")
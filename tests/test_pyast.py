@@ -0,0 +1,64 @@
+import ast
+import tempfile
+import traceback
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import TestCase
+
+from pl0 import (
+    CompilationCache,
+    Parser,
+    PythonASTGenerator,
+    PythonBackend,
+    PythonTranspiler,
+    run,
+)
+
+from .test_peephole import CONSTANTS
+from .test_python_backend import OUTER
+from .test_snapshots import PROGRAMS
+from .test_vm import NESTED
+
+DIVIDE = """\
+
+var a, b;
+
+procedure divide;
+begin
+    a := 1;
+    write a / b
+end;
+
+call divide.
+"""
+
+
+class PythonASTGeneratorTestCases(TestCase):
+    def test_matches_transpiler(self):
+        programs = PROGRAMS + [("nested", NESTED), ("constants", CONSTANTS), ("outer", OUTER)]
+        for name, program in programs:
+            tree = Parser.parse(program, positions=True)
+            for fast_locals in (False, True):
+                source = PythonTranspiler.generate_code(tree, fast_locals=fast_locals)
+                module = PythonASTGenerator.generate_code(tree, fast_locals=fast_locals)
+                self.assertEqual(ast.dump(module), ast.dump(ast.parse(source)), name)
+
+    def test_line_numbers(self):
+        backend = PythonBackend.from_ast(Parser.parse(DIVIDE, positions=True))
+        try:
+            backend.interpret()
+        except ZeroDivisionError as e:
+            frames = traceback.extract_tb(e.__traceback__)
+        else:
+            self.fail("ZeroDivisionError not raised")
+        self.assertEqual([frame.lineno for frame in frames[-2:]], [10, 7])
+
+    def test_run_cached(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = CompilationCache(directory=directory)
+            for optimize in (0, 1, 0):
+                output = StringIO()
+                with redirect_stdout(output):
+                    run(OUTER, backend="python", cache=cache, optimize=optimize)
+                self.assertEqual(output.getvalue(), "1\n2\n3\n5\n1\n-3\n")
+            self.assertEqual(cache.stats()["hits"], 1)
@@ -0,0 +1,117 @@
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import TestCase
+
+from pl0 import VM, Generator, Parser, PythonBackend, PythonTranspiler, run
+
+from .test_peephole import CONSTANTS
+from .test_snapshots import PROGRAMS, interpret
+from .test_vm import NESTED
+
+OUTER = """\
+var a, b;
+
+procedure outer;
+    var x;
+    procedure inner;
+    begin
+        write x;
+        x := x + 1;
+        a := a + x
+    end;
+begin
+    x := 1;
+    call inner;
+    call inner;
+    write x
+end;
+
+begin
+    a := 0;
+    call outer;
+    write a;
+    if a <= 5 then write 1;
+    if odd a - 1 then write 2;
+    b := -7 / 2;
+    write b
+end.
+"""
+
+
+def execute(program):
+    code = Generator.generate_code(Parser.parse(program))
+    return interpret(VM(code, stack_size=5000))
+
+
+class PythonBackendTestCases(TestCase):
+    def test_fast_locals_matches_stack_vm(self):
+        programs = PROGRAMS + [("nested", NESTED), ("constants", CONSTANTS), ("outer", OUTER)]
+        for name, program in programs:
+            source = PythonTranspiler.generate_code(Parser.parse(program), fast_locals=True)
+            output = StringIO()
+            PythonBackend(source, output=output).interpret()
+            self.assertEqual(output.getvalue(), execute(program), name)
+
+    def test_fast_locals(self):
+        source = PythonTranspiler.generate_code(
+            Parser.parse(
+                """\
+const limit = 10;
+var a;
+
+procedure p;
+    const limit = 3;
+    var b;
+begin
+    b := limit;
+    if odd b then a := a + b
+end;
+
+begin
+    a := limit;
+    call p;
+    write a
+end.
+"""
+            ),
+            fast_locals=True,
+        )
+        self.assertEqual(
+            source,
+            """\
+def main(print=print):
+    a = 0
+
+    def p():
+        nonlocal a
+        b = 0
+        b = 3
+        if b % 2:
+            a = a + b
+
+    a = 10
+    p()
+    print(a)
+
+main()
+""",
+        )
+
+    def test_nonlocal(self):
+        source = PythonTranspiler.generate_code(Parser.parse(OUTER))
+        self.assertIn("    def inner():\n        nonlocal x\n        global a\n", source)
+
+    def test_run(self):
+        output = StringIO()
+        with redirect_stdout(output):
+            run(OUTER, backend="python")
+        self.assertEqual(output.getvalue(), "1\n2\n3\n5\n1\n-3\n")
+
+    def test_code_objects_are_cached(self):
+        source = PythonTranspiler.generate_code(Parser.parse(OUTER))
+        self.assertIs(PythonBackend(source).code, PythonBackend(source).code)
+
+    def test_namespace(self):
+        backend = PythonBackend.from_ast(Parser.parse(OUTER), output=StringIO())
+        backend.interpret()
+        self.assertEqual(backend.namespace["a"], 5)
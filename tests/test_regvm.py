@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+from pl0 import Parser, RegisterGenerator, RegisterVM
+from pl0.constants import REG_OP_CODE
+
+from .test_snapshots import interpret
+from .test_vm import NESTED
+
+
+class RegisterVMTestCases(TestCase):
+    def test_three_address_code(self):
+        code = RegisterGenerator.generate_code(
+            Parser.parse(
+                """\
+var a, b;
+begin
+    a := 1;
+    b := a + 2;
+    while a < 10 do a := a * b;
+    if odd a then write a
+end.
+"""
+            )
+        )
+        self.assertEqual(
+            code,
+            [
+                [REG_OP_CODE.JMP, 0, 0, 1],
+                # a, b and the constants 1, 2 and 10
+                [REG_OP_CODE.ENT, (0, 0, 1, 2, 10), 0, 0],
+                [REG_OP_CODE.MOV, 1, 3, 0],
+                [REG_OP_CODE.ADD, 2, 1, 4],
+                [REG_OP_CODE.JMP, 0, 0, 6],
+                [REG_OP_CODE.MUL, 1, 1, 2],
+                [REG_OP_CODE.JLT, 1, 5, 5],
+                [REG_OP_CODE.JEVEN, 1, 0, 9],
+                [REG_OP_CODE.WRT, 1, 0, 0],
+                [REG_OP_CODE.RET, 0, 0, 0],
+            ],
+        )
+
+    def test_outer_variables_and_parameters(self):
+        vm = RegisterVM.from_ast(Parser.parse(NESTED))
+        output = interpret(vm)
+        # the global frame is left with the final value of `total`
+        self.assertEqual(vm.frames, [])
+        self.assertEqual(str(vm.frame[1]), output.split()[-1])
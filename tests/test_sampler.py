@@ -0,0 +1,178 @@
+import os
+import signal
+import threading
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import TestCase, skipUnless
+
+from pl0 import (
+    VM,
+    CodeObject,
+    Generator,
+    OutputSink,
+    Parser,
+    PeepholeOptimizer,
+    SymbolTable,
+    ThreadedVM,
+)
+from pl0.constants import OP_CODE
+from pl0.sampler import Sampler
+
+PROGRAM = """\
+var i;
+procedure outer(n);
+    procedure inner;
+        write n;
+    call inner;
+begin
+    i := 0;
+    while i < 3 do
+    begin
+        call outer(i);
+        i := i + 1
+    end;
+    write i
+end.
+"""
+
+HOT = """\
+var i;
+procedure work;
+    var k;
+begin
+    k := 0;
+    while k < 100 do k := k + 1
+end;
+begin
+    i := 0;
+    while i < 1000 do
+    begin
+        call work;
+        write i;
+        i := i + 1
+    end
+end.
+"""
+
+
+def generate(program, optimize=0):
+    symbols = SymbolTable()
+    code = Generator.generate_code(Parser.parse(program, positions=True), symbols)
+    if optimize:
+        code = PeepholeOptimizer.for_level(optimize).optimize(code, symbols)
+    return code, symbols
+
+
+class SamplingSink(OutputSink):
+    """
+    Samples the VM whenever it writes, from the VM's own thread.
+    """
+
+    def __init__(self):
+        self.sampler = None
+
+    def write(self, value):
+        self.sampler.samples[self.sampler.sample()] += 1
+
+
+class WaitingSink(OutputSink):
+    """
+    Waits for the sampler's thread to take a sample whenever the VM
+    writes, so that the sample falls on the WRITE.
+    """
+
+    def __init__(self):
+        self.sampler = None
+
+    def write(self, value):
+        self.sampler.taken.clear()
+        self.sampler.taken.wait(10)
+
+
+class SignallingSampler(Sampler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.taken = threading.Event()
+
+    def take(self, frame=None):
+        super().take(frame)
+        self.taken.set()
+
+
+class SamplerTestCases(TestCase):
+    def test_lines(self):
+        for optimize in (0, 2):
+            code, symbols = generate(PROGRAM, optimize)
+            self.assertEqual(len(symbols.lines), len(code))
+            for index, (op_code, _, value) in enumerate(code):
+                if op_code == OP_CODE.CAL:
+                    self.assertIn(symbols.line_at(index), (5, 10))
+                if op_code == OP_CODE.OPR and value == 14:
+                    self.assertIn(symbols.line_at(index), (4, 13))
+            self.assertIsNone(symbols.line_at(len(code)))
+
+    def test_sample(self):
+        for optimize in (0, 2):
+            code, symbols = generate(PROGRAM, optimize)
+            for engine, code in (
+                (VM, code),
+                (VM, CodeObject.from_instructions(code)),
+                (ThreadedVM, code),
+            ):
+                sink = SamplingSink()
+                vm = engine(code, output=sink)
+                sink.sampler = Sampler(vm, symbols)
+                vm.interpret()
+
+                output = StringIO()
+                sink.sampler.write_collapsed(output)
+                self.assertEqual(
+                    output.getvalue(),
+                    "<main>:10;outer:5;outer.inner:4 3\n<main>:13 1\n",
+                )
+                self.assertIn("outer.inner:4", sink.sampler.report())
+
+    def test_not_running(self):
+        code, symbols = generate(PROGRAM)
+        sampler = Sampler(VM(code), symbols)
+        sampler.thread_id = 0
+        self.assertEqual(sampler.sample(), ())
+
+    @skipUnless(hasattr(signal, "setitimer"), "needs the profiling timer")
+    def test_sampling_timer(self):
+        code, symbols = generate(HOT)
+        for engine in (VM, ThreadedVM):
+            vm = engine(code, stack_size=5000)
+            # printing to a file lets go of the GIL on every line
+            with open(os.devnull, "w", buffering=1) as stream:
+                with redirect_stdout(stream):
+                    with Sampler(vm, symbols, interval=0.001) as sampler:
+                        vm.interpret()
+            self.assertIs(signal.getsignal(signal.SIGPROF), signal.SIG_DFL)
+            total = sum(sampler.samples.values())
+            work = sum(
+                count
+                for stack, count in sampler.collapsed().items()
+                if ";work:" in stack
+            )
+            self.assertGreater(total, 10)
+            self.assertGreater(work, 0.8 * total)
+
+    def test_sampling_thread(self):
+        code, symbols = generate(PROGRAM)
+        for engine in (VM, ThreadedVM):
+            sink = WaitingSink()
+            vm = engine(code, output=sink)
+            sampler = sink.sampler = SignallingSampler(vm, symbols, interval=0.001)
+
+            def run():
+                # away from the main thread, a background thread samples
+                with sampler:
+                    vm.interpret()
+
+            thread = threading.Thread(target=run)
+            thread.start()
+            thread.join()
+            stacks = sampler.collapsed()
+            self.assertIn("<main>:10;outer:5;outer.inner:4", stacks)
+            self.assertIn("<main>:13", stacks)
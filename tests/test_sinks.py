@@ -0,0 +1,61 @@
+from contextlib import redirect_stdout
+from io import BytesIO, StringIO
+from unittest import TestCase
+
+from pl0 import AST_BACKENDS, BACKENDS, run
+from pl0.sinks import BinarySink, BufferedTextSink, ListSink, read_binary
+
+PROGRAM = """\
+var i;
+begin
+    i := -2;
+    while i < 5 do
+    begin
+        write i * 1000;
+        i := i + 1
+    end
+end.
+"""
+
+VALUES = [-2000, -1000, 0, 1000, 2000, 3000, 4000]
+
+
+class SinkTestCases(TestCase):
+    def test_list_sink(self):
+        for backend in sorted([*BACKENDS, *AST_BACKENDS]):
+            for optimize in (0, 1):
+                sink = ListSink()
+                output = StringIO()
+                with redirect_stdout(output):
+                    run(PROGRAM, backend=backend, optimize=optimize, output=sink)
+                self.assertEqual(sink.values, VALUES, msg=backend)
+                self.assertEqual(output.getvalue(), "", msg=backend)
+
+    def test_buffered_text_sink(self):
+        stream = StringIO()
+        sink = BufferedTextSink(stream, flush_size=3)
+        for value in VALUES[:4]:
+            sink.write(value)
+        # only complete buffers are written before the flush
+        self.assertEqual(stream.getvalue(), "-2000\n-1000\n0\n")
+        sink.flush()
+        self.assertEqual(stream.getvalue(), "-2000\n-1000\n0\n1000\n")
+
+        stream = StringIO()
+        run(PROGRAM, backend="threaded", output=BufferedTextSink(stream, flush_size=2))
+        self.assertEqual(stream.getvalue(), "".join(f"{value}\n" for value in VALUES))
+
+    def test_binary_sink(self):
+        stream = BytesIO()
+        run(PROGRAM, output=BinarySink(stream, flush_size=4))
+        self.assertEqual(len(stream.getvalue()), 8 * len(VALUES))
+        self.assertEqual(stream.getvalue()[:8], (-2000).to_bytes(8, "little", signed=True))
+        self.assertEqual(read_binary(stream.getvalue()), VALUES)
+
+    def test_flushed_on_error(self):
+        program = "var a; begin write 1; write 2; a := 1 / 0 end."
+        for backend in ("vm", "closures", "python"):
+            stream = StringIO()
+            with self.assertRaises(ZeroDivisionError):
+                run(program, backend=backend, output=BufferedTextSink(stream))
+            self.assertEqual(stream.getvalue(), "1\n2\n", msg=backend)
@@ -2,7 +2,7 @@ from contextlib import redirect_stdout
 from io import StringIO
 from unittest import TestCase
 
-from pl0 import VM, Generator, Parser
+from pl0 import VM, BytecodeGenerator, Generator, Parser, ThreadedVM
 
 from .snapshot import assert_matches_snapshot
 
@@ -96,6 +96,17 @@ call primes
 PROGRAMS = [("scope", SCOPE), ("square", SQUARE), ("primes", PRIMES)]
 
 
+def interpret(engine):
+    """
+    Run a VM, or any engine printing the values the program writes, and
+    return what it printed.
+    """
+    output = StringIO()
+    with redirect_stdout(output):
+        engine.interpret()
+    return output.getvalue()
+
+
 class SnapshotTestCases(TestCase):
     def test_parser_snapshots(self):
         for name, program in PROGRAMS:
@@ -110,10 +121,26 @@ class SnapshotTestCases(TestCase):
         for name, program in PROGRAMS:
             ast = Parser.parse(program)
             vm = VM(Generator.generate_code(ast))
-            output = StringIO()
+            assert_matches_snapshot(f"vm_{name}_output", interpret(vm))
+            assert_matches_snapshot(f"vm_{name}_stack", vm.datastore)
 
-            with redirect_stdout(output):
-                vm.interpret()
+    def test_threaded_vm_snapshots(self):
+        for name, program in PROGRAMS:
+            for superinstructions in (False, True):
+                ast = Parser.parse(program)
+                vm = ThreadedVM(
+                    Generator.generate_code(ast), superinstructions=superinstructions
+                )
+                assert_matches_snapshot(f"vm_{name}_output", interpret(vm))
+                assert_matches_snapshot(f"vm_{name}_stack", vm.datastore)
+
+    def test_bytecode_snapshots(self):
+        for name, program in PROGRAMS:
+            ast = Parser.parse(program)
+            code = BytecodeGenerator.generate_code(ast)
+            assert_matches_snapshot(f"codegen_{name}", code.disassemble())
 
-            assert_matches_snapshot(f"vm_{name}_output", output.getvalue())
-            assert_matches_snapshot(f"vm_{name}_stack", vm.datastore)
+            for engine in (VM, ThreadedVM):
+                vm = engine(code)
+                assert_matches_snapshot(f"vm_{name}_output", interpret(vm))
+                assert_matches_snapshot(f"vm_{name}_stack", vm.datastore)
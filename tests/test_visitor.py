@@ -0,0 +1,150 @@
+import ast
+import sys
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import TestCase
+
+from pl0 import (
+    VM,
+    ASTOptimizer,
+    BytecodeGenerator,
+    ClosureBackend,
+    Generator,
+    ListSink,
+    Parser,
+    PythonASTGenerator,
+    PythonTranspiler,
+    RegisterGenerator,
+)
+from pl0.generators.visitor import Visitor
+from pl0.nodes import NODE_TYPES, Node
+
+from .test_snapshots import PROGRAMS
+
+
+def to_dicts(tree):
+    if isinstance(tree, list):
+        return [to_dicts(item) for item in tree]
+    if isinstance(tree, Node):
+        return {key: to_dicts(value) for key, value in tree.items()}
+    return tree
+
+
+class Counter(Visitor):
+    """
+    Counts the nodes of each type, visiting children by yielding them.
+    """
+
+    def __init__(self):
+        self.counts = {}
+
+    def count(self, node):
+        self.counts[node.type] = self.counts.get(node.type, 0) + 1
+
+    def visit_var(self, node):
+        self.count(node)
+
+    def visit_block(self, node):
+        self.count(node)
+        for statement in node.statements:
+            yield statement
+
+    def visit_assignment(self, node):
+        self.count(node)
+        return (yield node.value)
+
+    def visit_output(self, node):
+        self.count(node)
+        return (yield node.value)
+
+    def visit_binary(self, node):
+        self.count(node)
+        left = yield node.left
+        right = yield node.right
+        return max(left, right) + 1
+
+    def visit_identifier(self, node):
+        self.count(node)
+        return 1
+
+    def visit_number(self, node):
+        self.count(node)
+        return 1
+
+
+class VisitorTestCases(TestCase):
+    def test_dispatch(self):
+        self.assertEqual(len(Counter.dispatch), len(NODE_TYPES))
+        for node_type in NODE_TYPES:
+            handler = Counter.dispatch[node_type.kind]
+            self.assertEqual(handler.__name__, f"visit_{node_type.type.lower()}")
+        self.assertIs(Counter.dispatch[NODE_TYPES[0].kind], Visitor.visit_const)
+
+    def test_generator_methods(self):
+        ast = Parser.parse("var a; begin a := 1 + 2 * a; write a end.")
+        counter = Counter()
+        for node in ast:
+            counter.visit(node)
+        self.assertEqual(
+            counter.counts,
+            {
+                "Var": 1,
+                "Block": 1,
+                "Assignment": 1,
+                "Binary": 2,
+                "Number": 2,
+                "Identifier": 2,
+                "Output": 1,
+            },
+        )
+        # the result of a method is sent back to the method that yielded its node
+        self.assertEqual(counter.visit(ast[1].statements[0]), 3)
+
+    def test_deep_ast(self):
+        depth = sys.getrecursionlimit() * 2
+        program = f"var a; begin a := {' + '.join(['1'] * depth)}; write a end."
+        ast = Parser.parse(program)
+        self.assertEqual(Counter().visit(ast[1].statements[0]), depth)
+
+        for tree in (ast, ASTOptimizer.generate_code(ast)):
+            output = StringIO()
+            with redirect_stdout(output):
+                VM(Generator.generate_code(tree)).interpret()
+            self.assertEqual(output.getvalue(), f"{depth}\n")
+
+    def test_visit_dicts(self):
+        ast = Parser.parse("var a; begin a := 1 + 2 * a; write a end.")
+        counter = Counter()
+        for node in to_dicts(ast):
+            self.assertIs(type(node), dict)
+            counter.visit(node)
+        self.assertEqual(counter.counts["Binary"], 2)
+        self.assertEqual(counter.visit(to_dicts(ast[1].statements[0])), 3)
+
+    def test_dict_ast(self):
+        for _, program in PROGRAMS:
+            nodes = Parser.parse(program)
+            dicts = to_dicts(nodes)
+            self.assertIs(type(dicts[0]), dict)
+
+            for generator in (
+                Generator,
+                BytecodeGenerator,
+                ASTOptimizer,
+                PythonTranspiler,
+                RegisterGenerator,
+            ):
+                self.assertEqual(
+                    generator.generate_code(dicts), generator.generate_code(nodes)
+                )
+            self.assertEqual(
+                ast.dump(PythonASTGenerator.generate_code(dicts)),
+                ast.dump(PythonASTGenerator.generate_code(nodes)),
+            )
+
+            outputs = []
+            for tree in (dicts, nodes):
+                output = ListSink()
+                ClosureBackend.from_ast(tree, output=output).interpret()
+                outputs.append(output.values)
+            self.assertEqual(outputs[0], outputs[1])
@@ -0,0 +1,204 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from pl0 import VM, Generator, Parser, ThreadedVM
+from pl0.constants import OP_CODE, OPERATION
+
+from .test_snapshots import interpret
+
+# hand written code with every sequence of instructions the threaded VM fuses
+SEQUENCES = [
+    [OP_CODE.INT, 0, 6],
+    [OP_CODE.LIT, 0, 7],  # LIT; STO
+    [OP_CODE.STO, 0, 3],
+    [OP_CODE.LOD, 0, 3],  # LOD; STO
+    [OP_CODE.STO, 0, 4],
+    [OP_CODE.LOD, 0, 3],  # LOD; LIT; OPR; STO in place
+    [OP_CODE.LIT, 0, 2],
+    [OP_CODE.OPR, 0, OPERATION.MULT],
+    [OP_CODE.STO, 0, 3],
+    [OP_CODE.LOD, 0, 3],  # LOD; LOD; OPR
+    [OP_CODE.LOD, 0, 4],
+    [OP_CODE.OPR, 0, OPERATION.SUB],
+    [OP_CODE.OPR, 0, OPERATION.NEGATE],
+    [OP_CODE.STO, 0, 5],
+    [OP_CODE.LOD, 0, 5],
+    [OP_CODE.OPR, 0, OPERATION.ODD],
+    [OP_CODE.JPC, 0, 20],
+    [OP_CODE.LOD, 0, 5],
+    [OP_CODE.OPR, 0, OPERATION.WRITE],
+    [OP_CODE.DET, 0, 1],
+    [OP_CODE.LOD, 0, 4],  # LOD; LIT; OPR; JPC
+    [OP_CODE.LIT, 0, 0],
+    [OP_CODE.OPR, 0, OPERATION.GREATER],
+    [OP_CODE.JPC, 0, 29],
+    [OP_CODE.LOD, 0, 4],
+    [OP_CODE.LIT, 0, 1],
+    [OP_CODE.OPR, 0, OPERATION.SUB],
+    [OP_CODE.STO, 0, 4],
+    [OP_CODE.JMP, 0, 20],
+    [OP_CODE.LOD, 0, 3],  # LOD; LOD; OPR; JPC
+    [OP_CODE.LOD, 0, 4],
+    [OP_CODE.OPR, 0, OPERATION.EQUAL],
+    [OP_CODE.JPC, 0, 36],
+    [OP_CODE.LIT, 0, 1],
+    [OP_CODE.OPR, 0, OPERATION.WRITE],
+    [OP_CODE.DET, 0, 1],
+    [OP_CODE.LOD, 0, 3],
+    [OP_CODE.OPR, 0, OPERATION.WRITE],
+    [OP_CODE.DET, 0, 1],
+    [OP_CODE.OPR, 0, OPERATION.RETURN],
+]
+
+
+NESTED = """\
+var total;
+
+procedure a(n);
+    var x;
+    procedure b(m);
+        var y;
+        procedure c(k);
+        begin
+            total := total + k * x + y;
+            if k > 0 then call c(k - 1);
+            write total
+        end;
+    begin
+        y := m + n;
+        call c(m);
+        if m > 0 then call b(m - 1)
+    end;
+begin
+    x := n;
+    call b(n);
+    if n > 0 then call a(n - 1)
+end;
+
+begin
+    total := 0;
+    call a(3);
+    write total
+end.
+"""
+
+
+def execute(engine, program, **kwargs):
+    vm = engine(Generator.generate_code(Parser.parse(program)), **kwargs)
+    return vm, interpret(vm)
+
+
+class ThreadedVMTestCases(TestCase):
+    def test_superinstructions(self):
+        expected = VM(SEQUENCES)
+        self.assertEqual(interpret(expected), "-7\n14\n")
+        for superinstructions in (False, True):
+            vm = ThreadedVM(SEQUENCES, superinstructions=superinstructions)
+            self.assertEqual(interpret(vm), "-7\n14\n")
+            # fused handlers leave the same temporaries above the stack
+            self.assertEqual(vm.datastore, expected.datastore)
+            self.assertEqual(vm.topstack, expected.topstack)
+
+    def test_fused_handlers(self):
+        fused = ThreadedVM(SEQUENCES)
+        plain = ThreadedVM(SEQUENCES, superinstructions=False)
+        interpret(fused)
+        interpret(plain)
+        changed = [
+            index
+            for index, (a, b) in enumerate(zip(fused.handlers, plain.handlers))
+            if a.__code__ is not b.__code__
+        ]
+        self.assertEqual(changed, [1, 3, 5, 9, 20, 24, 29])
+
+    def test_static_depths(self):
+        code = Generator.generate_code(Parser.parse(NESTED))
+        depths = ThreadedVM.static_depths(code)
+        # a, b and c are nested at depths 1, 2 and 3 below the main program
+        self.assertEqual([depths[i] for i in (4, 25, 43, 59)], [3, 2, 1, 0])
+        # the jumps over the procedure bodies are never executed
+        self.assertEqual(depths[1:4], [None, None, None])
+
+    def test_display_matches_static_links(self):
+        expected, expected_output = execute(VM, NESTED, stack_size=5000)
+        for superinstructions in (False, True):
+            vm, output = execute(
+                ThreadedVM,
+                NESTED,
+                stack_size=5000,
+                superinstructions=superinstructions,
+            )
+            self.assertEqual(output, expected_output)
+            self.assertEqual(vm.datastore, expected.datastore)
+            self.assertEqual(vm.display_stack, [])
+            self.assertEqual(vm.display[0], 0)
+
+    def test_interpret_twice(self):
+        vm, output = execute(ThreadedVM, NESTED, stack_size=5000)
+        self.assertEqual(interpret(vm), output)
+
+    def test_fast_paths(self):
+        expected = VM(SEQUENCES)
+        self.assertEqual(interpret(expected), "-7\n14\n")
+        # a handler per instruction, NEGATE, ODD, JPC and DET included
+        vm = ThreadedVM(SEQUENCES, superinstructions=False)
+        self.assertEqual(interpret(vm), "-7\n14\n")
+        self.assertEqual(vm.datastore, expected.datastore)
+        self.assertEqual(
+            (vm.topstack, vm.base, vm.program, vm.peak),
+            (expected.topstack, expected.base, expected.program, expected.peak),
+        )
+
+    def test_decoded_once(self):
+        vm = ThreadedVM(SEQUENCES)
+        interpret(vm)
+        handlers = vm.handlers
+        self.assertEqual(interpret(vm), "-7\n14\n")
+        self.assertIs(vm.handlers, handlers)
+
+    def test_debug_handover(self):
+        code = [
+            [OP_CODE.INT, 0, 4],
+            [OP_CODE.LIT, 0, 5],
+            [OP_CODE.OPR, 0, OPERATION.DEBUG],
+            [OP_CODE.STO, 0, 3],
+            [OP_CODE.LOD, 0, 3],
+            [OP_CODE.OPR, 0, OPERATION.WRITE],
+            [OP_CODE.OPR, 0, OPERATION.RETURN],
+        ]
+        vm = ThreadedVM(code)
+        with patch("builtins.input", return_value="q") as prompt:
+            output = interpret(vm)
+        # the stepper takes over at the STO following the DEBUG
+        prompt.assert_called_once()
+        self.assertIn("program: 3\n", output)
+        self.assertTrue(output.endswith("5\n"))
+        self.assertEqual(vm.datastore[3], 5)
+        self.assertEqual(vm.program, 0)
+
+
+class GeneratorTestCases(TestCase):
+    def test_many_declarations(self):
+        count = 3000
+        names = ", ".join(f"v{n}" for n in range(count))
+        program = f"""\
+var {names};
+procedure p(a, b);
+var {names};
+begin
+    v0 := a;
+    v{count - 1} := v0 + b;
+    write v{count - 1}
+end;
+begin
+    v{count - 1} := 5;
+    call p(v{count - 1}, 2);
+    write v{count - 1}
+end.
+"""
+        code = Generator.generate_code(Parser.parse(program))
+        frames = [value for op, level, value in code if op == OP_CODE.INT]
+        # the procedure's frame also has room for its two parameters
+        self.assertEqual(frames, [count + 5, count + 3])
+        _, output = execute(VM, program, stack_size=2 * count + 100)
+        self.assertEqual(output, "7\n5\n")